@@ -1 +1,72 @@
 MAX_ATTEMPTS = 6
+# Candidatos pedidos a la vez en cada ronda de corrección de validar_restriccion (1 = secuencial)
+VALIDATION_CANDIDATES = 3
+
+# Mantener el modelo Gurobi entre optimizaciones y activar/desactivar
+# restricciones en sitio en lugar de reconstruirlo entero
+PERSISTENT_MODEL = True
+
+# Caché de traducciones NL → código (LRU en memoria + nivel persistente)
+TRANSLATION_CACHE_SIZE = 512                  # entradas en memoria
+TRANSLATION_CACHE_MAX_PERSISTENT = 10000      # entradas en disco / MongoDB
+TRANSLATION_CACHE_TTL = 30 * 24 * 3600        # segundos
+TRANSLATION_CACHE_DIR = ".cache/traducciones"
+
+# Prompt de traducción: resumen del esquema en lugar de las specs completas
+PROMPT_TOKEN_BUDGET = 2500                    # tokens estimados por prompt
+PROMPT_SAMPLES = 3                            # elementos de muestra por lista
+PROMPT_SUMMARY_CACHE_SIZE = 128               # resúmenes en memoria (uno por specs)
+
+# Cliente LLM (compartido por todo el proceso)
+LLM_MODEL = "o3-mini"
+LLM_BASE_URL = None             # p. ej. "http://localhost:8001/v1" para usar utils.llm_stub
+LLM_TIMEOUT = 120.0             # segundos por petición
+LLM_CONNECT_TIMEOUT = 10.0
+LLM_MAX_RETRIES = 4             # reintentos ante timeouts, 429 y 5xx
+LLM_BACKOFF_BASE = 0.5          # segundos
+LLM_BACKOFF_MAX = 30.0
+TRANSLATION_CONCURRENCY = 8     # traducciones simultáneas en /api/convert_batch
+
+# Hilos dedicados a trabajos de optimización en segundo plano (/api/jobs)
+JOB_WORKERS = 4
+
+# Segundos mínimos entre eventos de progreso publicados durante un solve
+PROGRESS_INTERVAL = 0.5
+
+# Registro de optimizadores vivos (uno por proyecto abierto)
+OPTIMIZER_CACHE_MAX = 32              # proyectos en memoria como máximo
+OPTIMIZER_MEMORY_BUDGET_MB = 2048     # presupuesto estimado de memoria
+
+# Perfiles de solver (parámetros Gurobi). Method: 3 = concurrente, 4 = concurrente determinista.
+SOLVER_PROFILES = {
+    "fast-feasible": {"Threads": 0, "Presolve": -1, "MIPFocus": 1, "TimeLimit": 30, "MIPGap": 0.05,
+                      "Method": 3},
+    "balanced": {"Threads": 0, "Presolve": -1, "MIPFocus": 0, "TimeLimit": 300, "MIPGap": 1e-4,
+                 "Method": 4},
+    "prove-optimal": {"Threads": 0, "Presolve": 2, "MIPFocus": 2, "TimeLimit": 3600, "MIPGap": 0.0,
+                      "Method": 4},
+    # configuración histórica (un hilo, sin presolve), para reproducir resultados antiguos
+    "legacy": {"Threads": 1, "Presolve": 0},
+}
+DEFAULT_SOLVER_PROFILE = "balanced"
+
+# Usar la última solución del proyecto como MIP start tras editar/activar restricciones
+WARM_START = True
+
+# Artefactos de resultados por ejecución (<dir>/<proyecto>/<solve_id>/)
+ARTIFACTS_DIR = ".cache/artefactos"
+ARTIFACTS_MAX_PER_PROJECT = 20        # ejecuciones guardadas por proyecto
+ARTIFACTS_TTL = 7 * 24 * 3600         # segundos
+
+# Caché de resultados de optimización: (specs, código de las restricciones activas, perfil)
+SOLVE_CACHE_SIZE = 128                # resultados en memoria
+SOLVE_CACHE_MAX_PERSISTENT = 2000     # resultados en MongoDB
+SOLVE_CACHE_TTL = 7 * 24 * 3600       # segundos
+
+# Escenarios what-if en paralelo: procesos como máximo (None = núcleos de la máquina)
+SCENARIO_WORKERS = None
+SCENARIO_MAX = 32                     # escenarios por petición
+
+# Lista de proyectos paginada (/api/projects)
+PROJECTS_PAGE_SIZE = 50
+PROJECTS_PAGE_MAX = 200
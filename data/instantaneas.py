@@ -0,0 +1,49 @@
+""" Instantáneas del modelo compilado de cada proyecto, guardadas en GridFS """
+import gridfs
+
+COLECCION = "instantaneas"
+
+
+def _fs(db) -> gridfs.GridFS:
+    return gridfs.GridFS(db, collection=COLECCION)
+
+
+def cargar_instantanea(db, pid: str, clave: str) -> bytes | None:
+    """Bytes de la instantánea del proyecto si su clave coincide; None si no hay o está obsoleta."""
+    try:
+        fichero = _fs(db).find_one({"metadata.project_id": pid, "metadata.clave": clave},
+                                   sort=[("uploadDate", -1)])
+        return fichero.read() if fichero is not None else None
+    except Exception as e:
+        print(f"⚠️  No se pudo leer la instantánea de {pid}: {e}")
+        return None
+
+
+def clave_guardada(db, pid: str) -> str | None:
+    """Clave de la instantánea guardada del proyecto, sin leer su contenido."""
+    try:
+        fichero = _fs(db).find_one({"metadata.project_id": pid}, sort=[("uploadDate", -1)])
+        return fichero.metadata.get("clave") if fichero is not None else None
+    except Exception as e:
+        print(f"⚠️  No se pudo leer la instantánea de {pid}: {e}")
+        return None
+
+
+def guardar_instantanea(db, pid: str, clave: str, datos: bytes):
+    """Guarda la instantánea y borra las anteriores del mismo proyecto."""
+    try:
+        fs = _fs(db)
+        nuevo = fs.put(datos, filename=f"{pid}.json.gz", metadata={"project_id": pid, "clave": clave})
+        for viejo in fs.find({"metadata.project_id": pid, "_id": {"$ne": nuevo}}):
+            fs.delete(viejo._id)
+    except Exception as e:
+        print(f"⚠️  No se pudo guardar la instantánea de {pid}: {e}")
+
+
+def borrar_instantanea(db, pid: str):
+    try:
+        fs = _fs(db)
+        for fichero in fs.find({"metadata.project_id": pid}):
+            fs.delete(fichero._id)
+    except Exception as e:
+        print(f"⚠️  No se pudo borrar la instantánea de {pid}: {e}")
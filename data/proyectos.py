@@ -0,0 +1,165 @@
+""" Acceso a la colección de proyectos: índices, resumen paginado, detalle y restricciones """
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+# Lo que necesita la lista lateral; nada de specs, código ni gurobiState
+CAMPOS_RESUMEN = {"_id": 1, "id": 1, "name": 1, "createdAt": 1, "updatedAt": 1}
+# Campos que se pueden pedir en el detalle (?fields=...)
+CAMPOS_DETALLE = ("id", "name", "context", "detectedConstraints", "manualConstraints", "variables",
+                  "validatedConstraints", "gurobiState", "solverProfile", "createdAt", "updatedAt")
+
+_indices_creados = set()
+_lock = threading.Lock()
+
+
+def ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def asegurar_indices(coleccion):
+    """
+    Crea (una vez por proceso) el índice único sobre `id` y el de nombre. La
+    lista se pagina por _id, que ya tiene índice: no se indexa updatedAt
+    porque ninguna consulta ordena ni filtra por él. Si Mongo no responde se
+    reintenta en la siguiente llamada en lugar de tumbar la petición.
+    """
+    clave = (coleccion.database.name, coleccion.name)
+    if clave in _indices_creados:
+        return
+    with _lock:
+        if clave in _indices_creados:
+            return
+        try:
+            coleccion.create_index([("id", ASCENDING)], unique=True, name="id_unico")
+            coleccion.create_index([("name", ASCENDING)], name="nombre")
+            _indices_creados.add(clave)
+        except PyMongoError as e:
+            print(f"⚠️  No se pudieron crear los índices de proyectos: {e}")
+
+
+def listar_resumen(coleccion, cursor: str | None = None, limite: int = 50, nombre: str | None = None):
+    """
+    Página de resúmenes de proyecto, del más reciente al más antiguo (orden de
+    _id). Devuelve (proyectos, siguiente_cursor); el cursor es el _id del
+    último elemento y es None cuando no quedan más. Lanza ValueError si el
+    cursor no es válido.
+    """
+    asegurar_indices(coleccion)
+    filtro = {}
+    if cursor:
+        try:
+            filtro["_id"] = {"$lt": ObjectId(cursor)}
+        except (InvalidId, TypeError):
+            raise ValueError(f"Cursor no válido: {cursor!r}")
+    if nombre is not None:
+        filtro["name"] = nombre
+
+    # se pide uno de más para saber si hay otra página sin un count()
+    docs = list(coleccion.find(filtro, CAMPOS_RESUMEN).sort("_id", DESCENDING).limit(limite + 1))
+    siguiente = str(docs[limite - 1]["_id"]) if len(docs) > limite else None
+    proyectos = []
+    for doc in docs[:limite]:
+        oid = doc.pop("_id")
+        # los proyectos anteriores a createdAt usan la fecha del ObjectId
+        doc.setdefault("createdAt", oid.generation_time)
+        proyectos.append(doc)
+    return proyectos, siguiente
+
+
+def obtener_detalle(coleccion, pid: str, campos: list[str] | None = None):
+    """Documento del proyecto (solo `campos` si se indican), o None si no existe."""
+    proyeccion = {"_id": 0}
+    if campos:
+        desconocidos = set(campos) - set(CAMPOS_DETALLE)
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+        proyeccion.update({c: 1 for c in set(campos) | {"id"}})
+    return coleccion.find_one({"id": pid}, proyeccion)
+
+
+# ─────────────────────────── restricciones validadas (deltas) ───────────────
+# Cada entrada de validatedConstraints es {texto, code, activa, version}. Los
+# cambios tocan solo la entrada afectada; `version` sube cada vez que se
+# escribe su código y permite detectar que otra sesión la ha modificado
+# entretanto. Activar o desactivar no cambia la versión.
+
+def guardar_restriccion(coleccion, pid: str, texto: str, code: str, activa: bool,
+                        version: int | None = None) -> int | None:
+    """
+    Inserta o actualiza la entrada `texto`. Con version=None no se comprueba
+    nada; con version=N solo se escribe si la guardada sigue siendo N; con
+    version=0 solo si aún no existe. Devuelve la nueva versión, o None si hay
+    conflicto (o el proyecto no existe).
+    """
+    cambios = {"$set": {"validatedConstraints.$.code": code,
+                        "validatedConstraints.$.activa": activa,
+                        "updatedAt": ahora()},
+               "$inc": {"validatedConstraints.$.version": 1}}
+    if version:
+        res = coleccion.update_one(
+            {"id": pid, "validatedConstraints": {"$elemMatch": {"texto": texto, "version": version}}}, cambios
+        )
+        return version + 1 if res.matched_count else None
+
+    for _ in range(2):
+        if version is None:
+            doc = coleccion.find_one_and_update(
+                {"id": pid, "validatedConstraints.texto": texto}, cambios,
+                projection={"_id": 0, "validatedConstraints.texto": 1, "validatedConstraints.version": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc:
+                return next(e["version"] for e in doc["validatedConstraints"] if e["texto"] == texto)
+
+        res = coleccion.update_one(
+            {"id": pid, "validatedConstraints.texto": {"$ne": texto}},
+            {"$push": {"validatedConstraints": {"texto": texto, "code": code, "activa": activa, "version": 1}},
+             "$set": {"updatedAt": ahora()}},
+        )
+        if res.matched_count:
+            return 1
+        if version == 0:
+            return None
+        # otra sesión la insertó entre las dos operaciones: se actualiza
+    return None
+
+
+def eliminar_restriccion(coleccion, pid: str, texto: str, version: int | None = None) -> bool:
+    """Quita la entrada `texto` (y su frase manual). False si no estaba o la versión no coincide."""
+    condicion = {"texto": texto}
+    if version:
+        condicion["version"] = version
+    res = coleccion.update_one(
+        {"id": pid, "validatedConstraints": {"$elemMatch": condicion}},
+        {"$pull": {"validatedConstraints": condicion, "manualConstraints": {"texto": texto}},
+         "$set": {"updatedAt": ahora()}},
+    )
+    return res.modified_count > 0
+
+
+def guardar_manual(coleccion, pid: str, texto: str, activa: bool = True):
+    """Añade la frase a manualConstraints si no estaba ya."""
+    coleccion.update_one(
+        {"id": pid, "manualConstraints.texto": {"$ne": texto}},
+        {"$push": {"manualConstraints": {"texto": texto, "activa": activa}}, "$set": {"updatedAt": ahora()}},
+    )
+
+
+def guardar_activas(coleccion, pid: str, activas: dict[str, bool]):
+    """
+    Actualiza solo el flag `activa` de cada entrada, en una única ida y vuelta.
+    No sube la versión: el optimizador vivo guarda la que leyó y, si cambiara
+    aquí, su próxima escritura de código se tomaría por un conflicto.
+    """
+    if not activas:
+        return
+    coleccion.bulk_write([
+        UpdateOne({"id": pid, "validatedConstraints": {"$elemMatch": {"texto": texto, "activa": {"$ne": activa}}}},
+                  {"$set": {"validatedConstraints.$.activa": activa, "updatedAt": ahora()}})
+        for texto, activa in activas.items()
+    ], ordered=False)
@@ -2,6 +2,13 @@
 from flask import Flask
 from flask_pymongo import PyMongo
 from web.routes import routes
+from utils.cache import AlmacenMongo
+from utils.constraint_translator import translation_cache
+from utils.job_manager import JobManager
+from utils.artefactos import AlmacenArtefactos
+from models.optimizer_registry import OptimizerRegistry, optimizador_desde_proyecto
+from models.shift_optimizer import solve_cache
+import config
 
 # Inicializamos la aplicación Flask
 app = Flask(__name__, template_folder="web/templates", static_folder="web/static")
@@ -14,6 +21,27 @@ mongo = PyMongo(app)
 # Hacemos que Mongo esté disponible en todas las rutas
 app.mongo = mongo
 
+# Nivel persistente de la caché de traducciones en MongoDB
+translation_cache.persistente = AlmacenMongo(
+    mongo.db.translation_cache, config.TRANSLATION_CACHE_MAX_PERSISTENT, config.TRANSLATION_CACHE_TTL
+)
+
+# Nivel persistente de la caché de resultados de optimización
+solve_cache.persistente = AlmacenMongo(
+    mongo.db.solve_cache, config.SOLVE_CACHE_MAX_PERSISTENT, config.SOLVE_CACHE_TTL
+)
+
+# Optimizadores vivos por proyecto; si uno no está en memoria se rehidrata desde MongoDB
+app.optimizers = OptimizerRegistry(
+    lambda pid: optimizador_desde_proyecto(mongo.db.projects.find_one({"id": pid}, {"_id": 0}), mongo.db)
+)
+
+# Pool de trabajos de optimización; su estado y resultados viven en MongoDB
+app.jobs = JobManager(mongo.db.jobs, config.JOB_WORKERS)
+
+# Resultados por ejecución (proyecto + solve_id); el Excel se genera al descargar
+app.artefactos = AlmacenArtefactos(config.ARTIFACTS_DIR, config.ARTIFACTS_MAX_PER_PROJECT, config.ARTIFACTS_TTL)
+
 # Registramos las rutas que definimos en el archivo routes.py
 app.register_blueprint(routes)
 
@@ -0,0 +1,218 @@
+"""
+Especificación estructurada de las variables de decisión.
+
+En lugar del bloque de código que genera el LLM (un dict comprehension con
+un model.addVar y un f-string de nombre por tupla), cada familia se describe
+con sus conjuntos de índices y su tipo, y se crea con una sola llamada a
+model.addMVar sobre el producto cartesiano de los índices:
+
+    {
+        "x_retenes": {
+            "indices": ["lista_retenes", "dias", "franjas"],
+            "vtype": "B",
+        }
+    }
+
+Cada índice puede ser el nombre de una entrada de specs["variables"] o
+specs["resources"] (lista → sus elementos, entero → range), un entero o una
+lista literal. vtype admite "B"/"I"/"C" o BINARY/INTEGER/CONTINUOUS; lb y ub
+son opcionales. Los nombres de las variables salen de `plantilla` (un
+str.format con un hueco posicional por índice, p. ej. "x_{0}_{1}_{2}") o, si
+no la hay, de `nombre`: "<nombre>_<índice>_<índice>…". Sin ninguna de las
+dos Gurobi usa sus nombres por defecto (C0, C1…), que es lo más rápido: las
+variables se localizan por clave, no por nombre.
+
+desde_codigo() reconoce el patrón habitual del código generado y lo traduce
+a esta forma, conservando el f-string del nombre como plantilla; si el
+código hace cualquier otra cosa devuelve None y el optimizador lo ejecuta
+tal cual.
+"""
+import ast
+import itertools
+
+from gurobipy import GRB, tupledict
+
+TIPOS = {
+    "B": GRB.BINARY, "BINARY": GRB.BINARY,
+    "I": GRB.INTEGER, "INTEGER": GRB.INTEGER,
+    "C": GRB.CONTINUOUS, "CONTINUOUS": GRB.CONTINUOUS,
+}
+# contenedores de specs a los que puede referirse el código: variables['x'], resources['x']
+_CONTENEDORES = {"variables", "resources", "data", "specs"}
+
+
+def _conjunto(indice, contexto: dict) -> list:
+    """Resuelve un índice de la especificación a la lista de sus valores."""
+    valor = contexto[indice] if isinstance(indice, str) else indice
+    if isinstance(valor, bool):
+        raise ValueError(f"Índice no válido: {indice!r}")
+    if isinstance(valor, int):
+        return list(range(valor))
+    if isinstance(valor, (list, tuple)):
+        return list(valor)
+    raise ValueError(f"El índice {indice!r} no es una lista ni un entero")
+
+
+def construir_familias(model, estructura: dict, contexto: dict) -> dict[str, tupledict]:
+    """
+    Crea en `model` las familias de `estructura`, una llamada a addMVar por
+    familia, y devuelve {nombre: tupledict} con las mismas claves (y en el
+    mismo orden) que daría el dict comprehension equivalente. `contexto` da
+    los valores de los índices por nombre (el contexto base del optimizador).
+    """
+    familias = {}
+    for nombre, familia in estructura.items():
+        conjuntos = [_conjunto(i, contexto) for i in familia["indices"]]
+        # con un solo conjunto las claves son escalares, como en addVars
+        claves = conjuntos[0] if len(conjuntos) == 1 else list(itertools.product(*conjuntos))
+        if len(set(claves)) != len(claves):
+            raise ValueError(f"Claves repetidas en la familia {nombre}")
+        vtype = familia.get("vtype", "C")
+        opciones = {"vtype": TIPOS[vtype.upper()] if isinstance(vtype, str) and vtype.upper() in TIPOS else vtype}
+        for limite in ("lb", "ub"):
+            if familia.get(limite) is not None:
+                opciones[limite] = familia[limite]
+        if familia.get("plantilla") is not None:
+            opciones["name"] = [familia["plantilla"].format(*(k if isinstance(k, tuple) else (k,))) for k in claves]
+        elif familia.get("nombre"):
+            opciones["name"] = [
+                "_".join(map(str, (familia["nombre"], *(k if isinstance(k, tuple) else (k,))))) for k in claves
+            ]
+        variables = model.addMVar(len(claves), **opciones).tolist() if claves else []
+        familias[nombre] = tupledict(zip(claves, variables))
+    return familias
+
+
+# ───────────────────────────────── reconocimiento del código ──────────────
+def _nombre_indice(nodo):
+    """variables['x'] / x → 'x'; literal entero → int; otra cosa → None."""
+    if isinstance(nodo, ast.Name):
+        return nodo.id
+    if (isinstance(nodo, ast.Subscript) and isinstance(nodo.value, ast.Name)
+            and nodo.value.id in _CONTENEDORES
+            and isinstance(nodo.slice, ast.Constant) and isinstance(nodo.slice.value, str)):
+        return nodo.slice.value
+    if isinstance(nodo, ast.Constant) and isinstance(nodo.value, int) and not isinstance(nodo.value, bool):
+        return nodo.value
+    return None
+
+
+def _iterable(nodo):
+    """Índice de un `for ... in <nodo>`: range(n) con un solo argumento o el conjunto directamente."""
+    if isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Name) and nodo.func.id == "range":
+        if len(nodo.args) != 1 or nodo.keywords:
+            return None
+        return _nombre_indice(nodo.args[0])
+    return _nombre_indice(nodo)
+
+
+def _es_addvar(nodo) -> bool:
+    return (isinstance(nodo, ast.Call) and not nodo.args and isinstance(nodo.func, ast.Attribute)
+            and nodo.func.attr == "addVar" and isinstance(nodo.func.value, ast.Name)
+            and nodo.func.value.id == "model")
+
+
+def _plantilla(nodo, objetivos: list[str]) -> str | None:
+    """name=f"x_{r}_{d}" → "x_{0}_{1}" (huecos por posición del índice); None si no se puede."""
+    if isinstance(nodo, ast.Constant) and isinstance(nodo.value, str):
+        return nodo.value.replace("{", "{{").replace("}", "}}")
+    if not isinstance(nodo, ast.JoinedStr):
+        return None
+    partes = []
+    for parte in nodo.values:
+        if isinstance(parte, ast.Constant) and isinstance(parte.value, str):
+            partes.append(parte.value.replace("{", "{{").replace("}", "}}"))
+        elif (isinstance(parte, ast.FormattedValue) and parte.conversion == -1 and parte.format_spec is None
+              and isinstance(parte.value, ast.Name) and parte.value.id in objetivos):
+            partes.append(f"{{{objetivos.index(parte.value.id)}}}")
+        else:
+            return None
+    return "".join(partes)
+
+
+def _opciones_addvar(llamada, objetivos: list[str]) -> dict | None:
+    opciones = {"vtype": "C"}
+    for kw in llamada.keywords:
+        if kw.arg == "name":
+            plantilla = _plantilla(kw.value, objetivos)
+            if plantilla is None:
+                return None
+            opciones["plantilla"] = plantilla
+        elif kw.arg == "vtype":
+            v = kw.value
+            if isinstance(v, ast.Attribute) and isinstance(v.value, ast.Name) and v.value.id == "GRB":
+                v = v.attr
+            elif isinstance(v, ast.Constant) and isinstance(v.value, str):
+                v = v.value
+            else:
+                return None
+            if v.upper() not in TIPOS:
+                return None
+            opciones["vtype"] = v.upper()
+        elif kw.arg in ("lb", "ub"):
+            try:
+                opciones[kw.arg] = float(ast.literal_eval(kw.value))
+            except (ValueError, TypeError, SyntaxError):
+                return None
+        else:
+            return None
+    return opciones
+
+
+def _familia(asignacion) -> tuple[str, dict] | None:
+    """`x_algo = {(a, b): model.addVar(...) for a in A for b in range(B)}` → (nombre, familia)."""
+    if len(asignacion.targets) != 1 or not isinstance(asignacion.value, ast.DictComp):
+        return None
+    destino, comp = asignacion.targets[0], asignacion.value
+    if isinstance(destino, ast.Attribute) and isinstance(destino.value, ast.Name) and destino.value.id == "self":
+        nombre = destino.attr
+    elif isinstance(destino, ast.Name):
+        nombre = destino.id
+    else:
+        return None
+    if not nombre.startswith("x_") or not _es_addvar(comp.value):
+        return None
+
+    objetivos, indices = [], []
+    for gen in comp.generators:
+        if gen.ifs or gen.is_async or not isinstance(gen.target, ast.Name):
+            return None
+        indice = _iterable(gen.iter)
+        # un conjunto que dependa de un bucle anterior no es un producto cartesiano
+        if indice is None or indice in objetivos:
+            return None
+        objetivos.append(gen.target.id)
+        indices.append(indice)
+
+    clave = comp.key
+    if isinstance(clave, ast.Tuple):
+        # con addVars un solo conjunto da claves escalares, no tuplas de uno
+        if len(clave.elts) < 2 or [e.id if isinstance(e, ast.Name) else None for e in clave.elts] != objetivos:
+            return None
+    elif not (isinstance(clave, ast.Name) and objetivos == [clave.id]):
+        return None
+
+    opciones = _opciones_addvar(comp.value, objetivos)
+    if opciones is None:
+        return None
+    return nombre, {"indices": indices, **opciones}
+
+
+def desde_codigo(codigo: str) -> dict | None:
+    """
+    Traduce el bloque decision_variables a la forma estructurada si todas sus
+    sentencias son familias x_* creadas con el patrón habitual. None si no.
+    """
+    try:
+        arbol = ast.parse(codigo)
+    except SyntaxError:
+        return None
+    estructura = {}
+    for sentencia in arbol.body:
+        if not isinstance(sentencia, ast.Assign):
+            return None
+        familia = _familia(sentencia)
+        if familia is None:
+            return None
+        estructura[familia[0]] = familia[1]
+    return estructura or None
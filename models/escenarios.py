@@ -0,0 +1,121 @@
+import copy
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gurobipy as gp
+
+import config
+from models.shift_optimizer import ShiftOptimizer
+from models.solver_profiles import resolver_perfil
+
+
+def aplicar_overrides(specs: dict, overrides: dict | None) -> dict:
+    """
+    Copia de specs con `overrides` fusionado encima, de forma recursiva:
+    {"resources": {"retenes": 3}} solo cambia ese recurso.
+    """
+    resultado = copy.deepcopy(specs)
+
+    def fusionar(destino, origen):
+        for clave, valor in origen.items():
+            if isinstance(valor, dict) and isinstance(destino.get(clave), dict):
+                fusionar(destino[clave], valor)
+            else:
+                destino[clave] = copy.deepcopy(valor)
+
+    fusionar(resultado, overrides or {})
+    return resultado
+
+
+def reparto_hilos(n_escenarios: int, max_procesos: int | None = None) -> tuple[int, int]:
+    """
+    (procesos, hilos Gurobi por proceso) para un trabajo de escenarios. Como
+    puede haber hasta config.JOB_WORKERS trabajos a la vez, cada uno dispone
+    de núcleos ÷ JOB_WORKERS y procesos × hilos no supera esa parte: con
+    todos los trabajos en marcha no se sobresuscribe la máquina.
+    """
+    nucleos = max(1, (os.cpu_count() or 1) // max(1, config.JOB_WORKERS))
+    limite = max_procesos or config.SCENARIO_WORKERS or nucleos
+    procesos = max(1, min(n_escenarios, limite, nucleos))
+    return procesos, max(1, nucleos // procesos)
+
+
+def resolver_escenario(specs: dict, restricciones: dict, escenario: dict, perfil, hilos: int) -> dict:
+    """
+    Construye y resuelve un escenario en el proceso actual, con su propio
+    entorno Gurobi. Se ejecuta dentro de los procesos del pool, así que todo
+    lo que recibe y devuelve es serializable.
+    """
+    nombre = escenario.get("name")
+    inicio = time.time()
+    try:
+        activas = escenario.get("active_constraints")
+        activas = set(restricciones if activas is None else activas)
+        desconocidas = activas - set(restricciones)
+        if desconocidas:
+            raise ValueError(f"Restricciones no validadas: {', '.join(sorted(desconocidas))}")
+
+        perfil = resolver_perfil(escenario.get("profile", perfil))
+        # aplicar_perfil hace resetParams, así que el silencio del log va en el propio perfil
+        perfil = {"nombre": perfil["nombre"], "params": {**perfil["params"], "Threads": hilos, "OutputFlag": 0}}
+
+        with gp.Env(params={"OutputFlag": 0}) as env:
+            optimizer = ShiftOptimizer(aplicar_overrides(specs, escenario.get("overrides")),
+                                       persistente=True, env=env)
+            optimizer.restricciones_validadas = {
+                nl: {"code": code, "activa": nl in activas} for nl, code in restricciones.items()
+            }
+            info = optimizer.optimizar(perfil=perfil) or {}
+            modelo = optimizer.model
+            fila = {
+                "name": nombre,
+                "status": modelo.status,
+                "objective": modelo.ObjVal if modelo.SolCount > 0 else None,
+                "mip_gap": modelo.MIPGap if modelo.SolCount > 0 and modelo.IsMIP else None,
+                "relaxed_constraints": info.get("relaxed_constraints", []),
+                "active_constraints": sorted(activas),
+                "threads": hilos,
+            }
+            modelo.dispose()
+    except Exception as e:
+        fila = {"name": nombre, "status": None, "objective": None, "error": str(e)}
+    fila["solve_time"] = round(time.time() - inicio, 3)
+    return fila
+
+
+def resolver_escenarios(specs: dict, restricciones: dict, escenarios: list[dict], perfil=None,
+                        trabajo=None, max_procesos: int | None = None) -> list[dict]:
+    """
+    Resuelve los escenarios en paralelo, un proceso por escenario hasta llenar
+    la parte de núcleos del trabajo (ver reparto_hilos), y devuelve la tabla comparativa en el orden de entrada.
+
+    restricciones: {frase NL: código} ya validado del proyecto.
+    escenarios: [{"name", "active_constraints", "overrides", "profile"}], todos opcionales.
+    trabajo: si se pasa, se publica un evento por escenario terminado y
+    cancelarlo descarta los que aún no han empezado.
+    """
+    escenarios = [{**e, "name": e.get("name") or f"Escenario {i + 1}"} for i, e in enumerate(escenarios)]
+    procesos, hilos = reparto_hilos(len(escenarios), max_procesos)
+    print(f"🧪 {len(escenarios)} escenarios en {procesos} procesos × {hilos} hilos")
+
+    tabla = [None] * len(escenarios)
+    # spawn: los procesos no heredan hilos ni entornos Gurobi del servidor
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        futuros = {
+            pool.submit(resolver_escenario, specs, restricciones, e, perfil, hilos): i
+            for i, e in enumerate(escenarios)
+        }
+        if trabajo is not None:
+            trabajo.al_cancelar(lambda: [f.cancel() for f in futuros])
+        for hechos, futuro in enumerate(as_completed(futuros), start=1):
+            i = futuros[futuro]
+            if futuro.cancelled():
+                tabla[i] = {"name": escenarios[i]["name"], "status": None, "error": "cancelado"}
+                continue
+            tabla[i] = futuro.result()
+            if trabajo is not None:
+                trabajo.canal.publicar({"escenario": tabla[i]["name"], "hechos": hechos, "total": len(escenarios)})
+    return tabla
@@ -0,0 +1,256 @@
+"""
+Helpers de restricciones para el código generado.
+
+Cada helper recibe el modelo y una familia de variables de decisión
+(x_<entidad>, con claves (entidad…, día, franja)) y crea todas sus filas de
+una vez: las filas se calculan con NumPy sobre las posiciones de las
+variables y se añaden con una sola llamada a model.addMConstr cuando scipy
+está disponible, o con addLConstr fila a fila sobre expresiones ya
+construidas si no lo está. Así una regla como "nadie trabaja más de dos
+días seguidos" no genera un quicksum por entidad y ventana.
+
+`por` elige qué posiciones de la parte de entidades agrupan las filas: None
+es la clave de entidades completa, () suma sobre todas las entidades y,
+p. ej., (0,) agrupa por la primera (el profesor en (profesor, curso, día,
+franja)). Días y franjas consecutivos son los de sus valores ordenados.
+
+Se inyectan en el contexto de ejecución (ShiftOptimizer._contexto_base) y
+el prompt de traducción los anuncia. Todos devuelven el número de filas
+creadas.
+"""
+import gurobipy as gp
+import numpy as np
+from gurobipy import GRB
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # sin scipy se añaden fila a fila
+    sp = None
+
+
+class _Familia:
+    """Posiciones de una familia de variables codificadas por grupo, día y franja."""
+
+    def __init__(self, x, por=None):
+        claves = list(x.keys())
+        if not claves or not all(isinstance(k, tuple) and len(k) >= 2 for k in claves):
+            raise ValueError("La familia debe tener claves (entidad…, día, franja)")
+        self.variables = list(x.values())
+        entidades = [k[:-2] for k in claves]
+        if por is not None:
+            por = (por,) if isinstance(por, int) else tuple(por)
+            entidades = [tuple(e[p] for p in por) for e in entidades]
+        self.grupos, self.grupo = self._codigos(entidades)
+        self.dias, self.dia = self._codigos([k[-2] for k in claves])
+        self.franjas, self.franja = self._codigos([k[-1] for k in claves])
+
+    @staticmethod
+    def _codigos(valores):
+        """(valores distintos ordenados, código de cada valor)."""
+        distintos = sorted(set(valores), key=lambda v: (str(type(v)), v))
+        pos = {v: i for i, v in enumerate(distintos)}
+        return distintos, np.fromiter((pos[v] for v in valores), dtype=np.int64, count=len(valores))
+
+    def bloques(self, por_franja: bool):
+        """
+        Ordena las variables por (grupo, instante) y devuelve (orden, clave
+        ordenada, nº de instantes). El instante es el día o, con por_franja,
+        la franja dentro de la línea temporal día × franja.
+        """
+        n_t = len(self.dias) * len(self.franjas) if por_franja else len(self.dias)
+        instante = self.dia * len(self.franjas) + self.franja if por_franja else self.dia
+        clave = self.grupo * n_t + instante
+        orden = np.argsort(clave, kind="stable")
+        return orden, clave[orden], n_t
+
+    def ventanas(self, ancho: int, por_franja: bool):
+        """
+        Filas de una ventana deslizante de `ancho` instantes por grupo: como
+        las variables están ordenadas por (grupo, instante), cada ventana es
+        un tramo contiguo [inicio, fin) de `orden`.
+        """
+        orden, clave, n_t = self.bloques(por_franja)
+        if ancho > n_t:
+            return orden, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        g = np.repeat(np.arange(len(self.grupos)), n_t - ancho + 1)
+        t = np.tile(np.arange(n_t - ancho + 1), len(self.grupos))
+        inicio = np.searchsorted(clave, g * n_t + t, side="left")
+        fin = np.searchsorted(clave, g * n_t + t + ancho - 1, side="right")
+        return orden, inicio, fin
+
+
+def _tramos(orden, inicio, fin):
+    """Índices de las filas [inicio, fin) de `orden` concatenados, y su longitud."""
+    longitudes = fin - inicio
+    total = int(longitudes.sum())
+    desplazamiento = np.repeat(inicio - np.concatenate(([0], np.cumsum(longitudes)[:-1])), longitudes)
+    return orden[desplazamiento + np.arange(total)], longitudes
+
+
+def _agregar_filas(model, variables, indices, longitudes, sentido, rhs, nombre, coefs=None) -> int:
+    """
+    Añade una fila por tramo de `indices` (longitudes consecutivas) sobre
+    `variables`, con coeficiente 1 salvo que se pase `coefs`.
+    """
+    no_vacias = longitudes > 0
+    rhs = np.broadcast_to(np.asarray(rhs, dtype=float), longitudes.shape)[no_vacias]
+    longitudes = longitudes[no_vacias]
+    n = len(longitudes)
+    if n == 0:
+        return 0
+    coefs = np.ones(len(indices)) if coefs is None else np.asarray(coefs, dtype=float)
+    limites = np.concatenate(([0], np.cumsum(longitudes)))
+
+    if sp is not None:
+        A = sp.csr_matrix((coefs, indices, limites), shape=(n, len(variables)))
+        model.addMConstr(A, gp.MVar.fromlist(variables), sentido, np.ascontiguousarray(rhs), name=nombre)
+        return n
+
+    columnas = [variables[j] for j in indices.tolist()]
+    coefs = coefs.tolist()
+    for i, (a, b) in enumerate(zip(limites[:-1].tolist(), limites[1:].tolist())):
+        model.addLConstr(gp.LinExpr(coefs[a:b], columnas[a:b]), sentido, float(rhs[i]), name=f"{nombre}[{i}]")
+    return n
+
+
+# ───────────────────────────────── helpers ──────────────────────────────
+def cobertura(model, x, minimo=None, maximo=None, por=(), nombre="cobertura") -> int:
+    """
+    Asignaciones por franja (día, franja) y grupo entre `minimo` y `maximo`.
+    Con el `por` por defecto suma todas las entidades: "al menos 2 retenes
+    por turno" es cobertura(model, x_retenes, minimo=2). minimo/maximo
+    pueden ser un número o un dict {(día, franja): valor}.
+    """
+    familia = _Familia(x, por)
+    orden, inicio, fin = familia.ventanas(1, por_franja=True)
+    indices, longitudes = _tramos(orden, inicio, fin)
+    n_franjas = len(familia.franjas)
+    celdas = [(familia.dias[t // n_franjas], familia.franjas[t % n_franjas])
+              for t in np.tile(np.arange(len(familia.dias) * n_franjas), len(familia.grupos))]
+
+    filas = 0
+    for limite, sentido, sufijo in ((minimo, GRB.GREATER_EQUAL, "min"), (maximo, GRB.LESS_EQUAL, "max")):
+        if limite is None:
+            continue
+        if isinstance(limite, dict):
+            rhs = np.array([limite.get(c, np.nan) for c in celdas], dtype=float)
+            definidas = ~np.isnan(rhs)
+            sel, lon = _tramos(orden, inicio[definidas], fin[definidas])
+            filas += _agregar_filas(model, familia.variables, sel, lon, sentido, rhs[definidas],
+                                    f"{nombre}_{sufijo}")
+        else:
+            filas += _agregar_filas(model, familia.variables, indices, longitudes, sentido, limite,
+                                    f"{nombre}_{sufijo}")
+    return filas
+
+
+def ventana_maxima(model, x, ventana: int, maximo, por=None, por_franja: bool = False,
+                   dias_trabajados: bool = False, nombre="ventana") -> int:
+    """
+    En cualquier tramo de `ventana` días consecutivos (o franjas, con
+    por_franja) cada grupo suma como mucho `maximo` asignaciones. "No más de
+    dos días seguidos" con una franja al día es ventana_maxima(model, x, 3, 2).
+
+    Con dias_trabajados se cuentan días con algún turno en vez de turnos:
+    se crea un indicador binario por grupo y día (una llamada a addVars) con
+    suma de turnos del día ≤ nº de turnos · indicador, y la ventana se
+    aplica sobre los indicadores.
+    """
+    familia = _Familia(x, por)
+    if not dias_trabajados or por_franja:
+        indices, longitudes = _tramos(*familia.ventanas(ventana, por_franja))
+        return _agregar_filas(model, familia.variables, indices, longitudes, GRB.LESS_EQUAL, maximo, nombre)
+
+    n_g, n_d = len(familia.grupos), len(familia.dias)
+    trabaja = list(model.addVars(n_g * n_d, vtype=GRB.BINARY, name=f"{nombre}_trabaja").values())
+    # turnos de cada (grupo, día) − nº de turnos · indicador ≤ 0
+    orden, inicio, fin = familia.ventanas(1, por_franja=False)
+    indices, longitudes = _tramos(orden, inicio, fin)
+    limites = np.concatenate(([0], np.cumsum(longitudes)))
+    n = len(familia.variables)
+    con_aux = np.insert(indices, limites[1:], n + np.arange(n_g * n_d))
+    coefs = np.insert(np.ones(len(indices)), limites[1:], -longitudes.astype(float))
+    filas = _agregar_filas(model, familia.variables + trabaja, con_aux, longitudes + 1, GRB.LESS_EQUAL, 0.0,
+                           f"{nombre}_dia", coefs)
+
+    if ventana > n_d:
+        return filas
+    # los indicadores están en orden (grupo, día): cada ventana es un tramo contiguo
+    arranques = (np.arange(n_g)[:, None] * n_d + np.arange(n_d - ventana + 1)[None, :]).ravel()
+    indices, longitudes = _tramos(np.arange(n_g * n_d), arranques, arranques + ventana)
+    return filas + _agregar_filas(model, trabaja, indices, longitudes, GRB.LESS_EQUAL, maximo, nombre)
+
+
+def descanso_entre_turnos(model, x, franjas_descanso: int = 1, por=None, nombre="descanso") -> int:
+    """
+    Tras cada turno, al menos `franjas_descanso` franjas libres en la línea
+    temporal día × franja (la noche y la mañana siguiente son consecutivas).
+    """
+    return ventana_maxima(model, x, franjas_descanso + 1, 1, por=por, por_franja=True, nombre=nombre)
+
+
+def banda_equidad(model, x, margen, por=None, nombre="equidad") -> int:
+    """
+    El total de asignaciones de cada grupo queda dentro de una banda de
+    anchura `margen`: dos variables auxiliares (mínimo y máximo del reparto)
+    y 2·grupos + 1 filas, en vez de comparar cada par de entidades.
+    """
+    familia = _Familia(x, por)
+    orden, inicio, fin = familia.ventanas(len(familia.dias), por_franja=False)
+    indices, longitudes = _tramos(orden, inicio, fin)
+    bajo = model.addVar(lb=0.0, name=f"{nombre}_bajo")
+    alto = model.addVar(lb=0.0, name=f"{nombre}_alto")
+    variables = familia.variables + [bajo, alto]
+    n = len(familia.variables)
+
+    filas = 0
+    for aux, sentido, sufijo in ((alto, GRB.LESS_EQUAL, "max"), (bajo, GRB.GREATER_EQUAL, "min")):
+        # total del grupo − aux (≤ | ≥) 0
+        limites = np.concatenate(([0], np.cumsum(longitudes)))
+        con_aux = np.insert(indices, limites[1:], n + (1 if aux is alto else 0))
+        coefs = np.insert(np.ones(len(indices)), limites[1:], -1.0)
+        filas += _agregar_filas(model, variables, con_aux, longitudes + 1, sentido, 0.0, f"{nombre}_{sufijo}",
+                                coefs)
+    model.addLConstr(alto - bajo, GRB.LESS_EQUAL, margen, name=f"{nombre}_margen")
+    return filas + 1
+
+
+def prohibir_patron(model, x, patron, por=None, nombre="patron") -> int:
+    """
+    Prohíbe que un mismo grupo cumpla a la vez todas las casillas de
+    `patron`, una lista de (desplazamiento en días, franja). Noche seguida
+    de mañana: prohibir_patron(model, x, [(0, 1), (1, 0)]).
+    """
+    familia = _Familia(x, por)
+    n_g, n_d, n_f = len(familia.grupos), len(familia.dias), len(familia.franjas)
+    pos_franja = {f: i for i, f in enumerate(familia.franjas)}
+    # variables por (grupo, día, franja); con `por` agrupando entidades puede haber varias
+    orden, clave, _ = familia.bloques(por_franja=True)
+    desplazamientos = [d for d, _ in patron]
+    arranques = range(-min(desplazamientos), n_d - max(desplazamientos))
+    g = np.repeat(np.arange(n_g), len(arranques))
+    d0 = np.tile(np.asarray(arranques, dtype=np.int64), n_g)
+
+    inicios, fines = [], []
+    for desplazamiento, franja in patron:
+        if franja not in pos_franja:
+            return 0
+        celda = g * (n_d * n_f) + (d0 + desplazamiento) * n_f + pos_franja[franja]
+        inicios.append(np.searchsorted(clave, celda, side="left"))
+        fines.append(np.searchsorted(clave, celda, side="right"))
+    inicios, fines = np.stack(inicios, axis=1), np.stack(fines, axis=1)
+    # sólo los arranques en los que todas las casillas existen
+    completos = ((fines - inicios) > 0).all(axis=1)
+    inicios, fines = inicios[completos].ravel(), fines[completos].ravel()
+    indices, longitudes = _tramos(orden, inicios, fines)
+    por_fila = longitudes.reshape(-1, len(patron)).sum(axis=1)
+    return _agregar_filas(model, familia.variables, indices, por_fila, GRB.LESS_EQUAL, len(patron) - 1, nombre)
+
+
+HELPERS = {
+    "cobertura": cobertura,
+    "ventana_maxima": ventana_maxima,
+    "descanso_entre_turnos": descanso_entre_turnos,
+    "banda_equidad": banda_equidad,
+    "prohibir_patron": prohibir_patron,
+}
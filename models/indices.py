@@ -0,0 +1,264 @@
+"""
+Índices compactos del optimizador.
+
+IndiceVariables guarda las claves de las variables de decisión
+(entidades…, día, franja) como códigos enteros en arrays NumPy en lugar de
+una lista de tuplas, y permite filtrar por cualquier dimensión de forma
+vectorizada.
+
+NombresRestricciones es el registro frase NL → constrName; el mapa inverso
+(constrName → frase) es una vista que se calcula sólo cuando se consulta.
+"""
+import sys
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+
+def _codificar(valores, vocabulario: dict) -> np.ndarray:
+    """Códigos enteros de `valores`, ampliando `vocabulario` con los nuevos."""
+    return np.fromiter((vocabulario.setdefault(v, len(vocabulario)) for v in valores),
+                       dtype=np.int32, count=len(valores))
+
+
+class IndiceVariables(Sequence):
+    """
+    Claves de decision_vars, en su orden, codificadas como enteros.
+
+    Siguiendo la convención del resto del código, una clave es
+    (entidad, …, día, franja): los dos últimos elementos son día y franja y
+    los anteriores las entidades. Las entidades de todas las posiciones
+    comparten un vocabulario; días y franjas tienen el suyo. Las claves que
+    no son tuplas se guardan como una sola entidad sin día ni franja (-1).
+    """
+
+    # claves que se decodifican de una vez al recorrer el índice
+    _BLOQUE = 65536
+
+    def __init__(self, claves):
+        claves = list(claves)
+        n = len(claves)
+        self._escalar = np.fromiter((not isinstance(k, tuple) for k in claves), dtype=bool, count=n)
+        tuplas = [k if isinstance(k, tuple) else (k,) for k in claves]
+        con_tiempo = np.fromiter((not e and len(t) >= 2 for t, e in zip(tuplas, self._escalar)),
+                                 dtype=bool, count=n)
+
+        self._vocab_entidades: dict = {}
+        self._vocab_dias: dict = {}
+        self._vocab_franjas: dict = {}
+        self.dia = np.full(n, -1, dtype=np.int32)
+        self.franja = np.full(n, -1, dtype=np.int32)
+        con = np.flatnonzero(con_tiempo)
+        self.dia[con] = _codificar([tuplas[i][-2] for i in con], self._vocab_dias)
+        self.franja[con] = _codificar([tuplas[i][-1] for i in con], self._vocab_franjas)
+
+        entidades = [t[:-2] if c else t for t, c in zip(tuplas, con_tiempo)]
+        ancho = max(map(len, entidades), default=0)
+        self.entidades = np.full((n, ancho), -1, dtype=np.int32)
+        for j in range(ancho):
+            filas = np.fromiter((len(e) > j for e in entidades), dtype=bool, count=n)
+            pos = np.flatnonzero(filas)
+            self.entidades[pos, j] = _codificar([entidades[i][j] for i in pos], self._vocab_entidades)
+
+        # el tipo entero más pequeño que admite cada vocabulario
+        self.entidades = self.entidades.astype(np.min_scalar_type(-len(self._vocab_entidades) - 1))
+        self.dia = self.dia.astype(np.min_scalar_type(-len(self._vocab_dias) - 1))
+        self.franja = self.franja.astype(np.min_scalar_type(-len(self._vocab_franjas) - 1))
+
+        # vocabularios como arrays de objetos para decodificar de una vez
+        self._valores_entidades = np.array(list(self._vocab_entidades) + [None], dtype=object)
+        self._valores_dias = np.array(list(self._vocab_dias) + [None], dtype=object)
+        self._valores_franjas = np.array(list(self._vocab_franjas) + [None], dtype=object)
+
+    # ───────────────────────────────── secuencia de claves ────────────────
+    def __len__(self) -> int:
+        return len(self.dia)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._decodificar(np.arange(*i.indices(len(self))))
+        fila = self.entidades[i]
+        clave = tuple(self._valores_entidades[fila[fila >= 0]])
+        if self.dia[i] >= 0:
+            clave += (self._valores_dias[self.dia[i]], self._valores_franjas[self.franja[i]])
+        return clave[0] if self._escalar[i] else clave
+
+    def __iter__(self):
+        for inicio in range(0, len(self), self._BLOQUE):
+            yield from self._decodificar(np.arange(inicio, min(inicio + self._BLOQUE, len(self))))
+
+    def _decodificar(self, posiciones: np.ndarray, como_listas: bool = False) -> list:
+        """
+        Claves de `posiciones` decodificadas por columnas: cada columna de
+        códigos se traduce de una vez con su vocabulario y las claves se
+        montan con zip, agrupando las posiciones con la misma forma (número
+        de entidades, con o sin día y franja, escalar o tupla).
+        """
+        entidades = self.entidades[posiciones]
+        anchos = (entidades >= 0).sum(axis=1)
+        tiempo = self.dia[posiciones] >= 0
+        escalar = self._escalar[posiciones]
+        formas = (anchos * 2 + tiempo) * 2 + escalar
+        unicas = np.unique(formas)
+        claves = [None] * len(posiciones)
+        for forma in unicas:
+            sel = np.flatnonzero(formas == forma) if len(unicas) > 1 else np.arange(len(posiciones))
+            columnas = [self._valores_entidades[entidades[sel, j]].tolist() for j in range(anchos[sel[0]])]
+            if tiempo[sel[0]]:
+                columnas.append(self._valores_dias[self.dia[posiciones[sel]]].tolist())
+                columnas.append(self._valores_franjas[self.franja[posiciones[sel]]].tolist())
+            if escalar[sel[0]] and not como_listas:
+                grupo = columnas[0]
+            elif not columnas:
+                grupo = [[] if como_listas else ()] * len(sel)
+            else:
+                grupo = list(map(list, zip(*columnas))) if como_listas else list(zip(*columnas))
+            if len(unicas) == 1:
+                return grupo
+            for i, clave in zip(sel.tolist(), grupo):
+                claves[i] = clave
+        return claves
+
+    def como_listas(self) -> list[list]:
+        """Todas las claves como listas (las escalares, de un elemento), para JSON."""
+        return self._decodificar(np.arange(len(self)), como_listas=True)
+
+    def igual(self, otro: "IndiceVariables") -> bool:
+        """True si `otro` tiene exactamente las mismas claves en el mismo orden."""
+        return (isinstance(otro, IndiceVariables)
+                and self._vocab_entidades == otro._vocab_entidades
+                and self._vocab_dias == otro._vocab_dias
+                and self._vocab_franjas == otro._vocab_franjas
+                and np.array_equal(self.entidades, otro.entidades)
+                and np.array_equal(self.dia, otro.dia)
+                and np.array_equal(self.franja, otro.franja)
+                and np.array_equal(self._escalar, otro._escalar))
+
+    # ───────────────────────────────── consultas vectorizadas ─────────────
+    @staticmethod
+    def _codigos(vocabulario: dict, valores) -> np.ndarray:
+        if isinstance(valores, (list, tuple, set, np.ndarray)):
+            return np.array([vocabulario[v] for v in valores if v in vocabulario], dtype=np.int32)
+        return np.array([vocabulario[valores]] if valores in vocabulario else [], dtype=np.int32)
+
+    def mascara(self, entidad=None, dia=None, franja=None) -> np.ndarray:
+        """
+        Máscara booleana de las variables que cumplen todos los filtros. Cada
+        filtro es un valor o una colección de valores; `entidad` se busca en
+        cualquier posición de entidad de la clave.
+        """
+        mascara = np.ones(len(self), dtype=bool)
+        if entidad is not None:
+            codigos = self._codigos(self._vocab_entidades, entidad)
+            mascara &= np.isin(self.entidades, codigos).any(axis=1)
+        if dia is not None:
+            mascara &= np.isin(self.dia, self._codigos(self._vocab_dias, dia))
+        if franja is not None:
+            mascara &= np.isin(self.franja, self._codigos(self._vocab_franjas, franja))
+        return mascara
+
+    def posiciones(self, entidad=None, dia=None, franja=None) -> np.ndarray:
+        """Posiciones (en el orden de decision_vars) que cumplen los filtros de mascara()."""
+        return np.flatnonzero(self.mascara(entidad, dia, franja))
+
+    def valores_dia(self, posiciones=None) -> np.ndarray:
+        """Día de cada posición (todas si no se indican), decodificado."""
+        codigos = self.dia if posiciones is None else self.dia[posiciones]
+        return self._valores_dias[codigos]
+
+    def valores_franja(self, posiciones=None) -> np.ndarray:
+        codigos = self.franja if posiciones is None else self.franja[posiciones]
+        return self._valores_franjas[codigos]
+
+    def textos_entidades(self, posiciones=None, separador: str = " / ") -> list[str]:
+        """
+        Entidades de cada posición unidas por `separador` (ordenadas como
+        texto). Se une una vez por combinación distinta, no por variable.
+        """
+        filas = self.entidades if posiciones is None else self.entidades[posiciones]
+        if filas.shape[1] == 0:
+            return [""] * len(filas)
+        if len(filas) == 0:
+            return []
+        combinaciones, inversa = np.unique(filas, axis=0, return_inverse=True)
+        textos = [
+            separador.join(sorted(str(self._valores_entidades[c]) for c in fila if c >= 0))
+            for fila in combinaciones
+        ]
+        return [textos[i] for i in inversa.reshape(-1)]
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de los arrays de códigos (sin contar los vocabularios)."""
+        return self.entidades.nbytes + self.dia.nbytes + self.franja.nbytes + self._escalar.nbytes
+
+
+class _NombreANl(Mapping):
+    """Vista constrName → frase NL sobre un NombresRestricciones."""
+
+    def __init__(self, registro: "NombresRestricciones"):
+        self._registro = registro
+        self._inverso: dict | None = None
+        self._version = -1
+
+    def _mapa(self) -> dict:
+        # el dict inverso sólo se construye si se consulta por nombre
+        if self._inverso is None or self._version != self._registro.version:
+            self._inverso = {n: nl for nl, nombres in self._registro.items() for n in nombres}
+            self._version = self._registro.version
+        return self._inverso
+
+    def __getitem__(self, nombre):
+        return self._mapa()[nombre]
+
+    def __iter__(self):
+        # recorrer no necesita el dict inverso
+        vistos = set()
+        for nombres in self._registro.values():
+            for n in nombres:
+                if n not in vistos:
+                    vistos.add(n)
+                    yield n
+
+    def __len__(self):
+        return len(self._mapa())
+
+    def items(self):
+        return self._mapa().items()
+
+    def __repr__(self):
+        return repr(self._mapa())
+
+
+class NombresRestricciones(dict):
+    """
+    frase NL → tupla de constrName. Las frases se internan (una sola copia
+    por frase en el proceso) y `inverso` es la vista constrName → frase que
+    usan el IIS, la relajación y la API, sin un segundo dict que mantener.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.version = 0
+        self.inverso = _NombreANl(self)
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, nl, nombres):
+        super().__setitem__(sys.intern(nl), tuple(nombres))
+        self.version += 1
+
+    def __delitem__(self, nl):
+        super().__delitem__(nl)
+        self.version += 1
+
+    def pop(self, nl, *defecto):
+        self.version += 1
+        return super().pop(nl, *defecto)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        for nl, nombres in dict(*args, **kwargs).items():
+            self[nl] = nombres
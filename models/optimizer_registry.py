@@ -0,0 +1,243 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import config
+from models.shift_optimizer import ShiftOptimizer
+from data.instantaneas import cargar_instantanea, clave_guardada, guardar_instantanea
+
+# Estimación grosera de memoria por elemento del modelo (objetos Python de
+# gurobipy + entradas de diccionario + nombres), usada para el presupuesto.
+BYTES_POR_VARIABLE = 600
+BYTES_POR_RESTRICCION = 400
+BYTES_POR_NO_CERO = 24
+
+
+def optimizador_desde_proyecto(project: dict, db=None) -> ShiftOptimizer | None:
+    """
+    Construye el optimizador de un proyecto guardado. Si se pasa `db` y hay una
+    instantánea del modelo compilado con la misma clave (specs + código de las
+    restricciones), se carga de ella; si no, se reinyectan las restricciones
+    activas una a una y se guarda una instantánea nueva para la próxima vez.
+    """
+    if not project:
+        return None
+    specs = project.get('variables', {}) or {}
+    # bloque de código o especificación estructurada (models/decision_spec)
+    if not isinstance(specs.get("decision_variables"), (str, dict)) or not specs["decision_variables"]:
+        return None
+
+    restricciones = {
+        entry["texto"]: {
+            "code": entry["code"],
+            "activa": entry["activa"],
+            # versión guardada en MongoDB, para detectar ediciones concurrentes
+            "version": entry.get("version")
+        }
+        for entry in project.get('validatedConstraints', [])
+    }
+    pid = project.get("id")
+
+    optimizer = None
+    if db is not None and pid:
+        datos = cargar_instantanea(db, pid, ShiftOptimizer.calcular_clave_instantanea(specs, restricciones))
+        if datos is not None:
+            try:
+                optimizer = ShiftOptimizer(specs, instantanea=datos)
+            except Exception as e:
+                print(f"⚠️  Instantánea de {pid} inservible, se reconstruye: {e}")
+
+    if optimizer is not None:
+        optimizer.perfil_solver = project.get('solverProfile')
+        optimizer.restricciones_validadas = restricciones
+        # solo cambia lo activado/desactivado desde que se tomó la instantánea
+        optimizer._sincronizar_restricciones()
+        return optimizer
+
+    optimizer = ShiftOptimizer(specs)
+    optimizer.perfil_solver = project.get('solverProfile')
+    for nl, info in restricciones.items():
+        optimizer.restricciones_validadas[nl] = info
+        print(f"[DEBUG LOAD] Restaurando '{nl}' activa={info['activa']}")
+        if info["activa"]:
+            ok = optimizer.agregar_restriccion(nl)
+            print(f"[DEBUG LOAD] Agregada '{nl}': {ok}")
+    if db is not None and pid:
+        guardar_instantanea_de(db, pid, optimizer)
+    return optimizer
+
+
+def guardar_instantanea_de(db, pid: str, optimizer: ShiftOptimizer):
+    """
+    Guarda la instantánea del modelo vivo del proyecto, si se puede representar.
+    Si la guardada ya tiene la misma clave no se reescribe: activar o
+    desactivar restricciones no la cambia y renombrar tampoco.
+    """
+    clave = optimizer.clave_instantanea()
+    if clave_guardada(db, pid) == clave:
+        return
+    datos = optimizer.instantanea()
+    if datos is not None:
+        guardar_instantanea(db, pid, clave, datos)
+
+
+def memoria_estimada(optimizer: ShiftOptimizer) -> int:
+    m = optimizer.model
+    return (m.NumVars * BYTES_POR_VARIABLE + m.NumConstrs * BYTES_POR_RESTRICCION
+            + m.NumNZs * BYTES_POR_NO_CERO)
+
+
+class BloqueoProyecto:
+    """
+    Cerrojo reentrante de un proyecto que cuenta cuántos hilos lo tienen o
+    están esperándolo. El registro mira ese contador para no expulsar un
+    proyecto en uso; probar el RLock no sirve porque el hilo que lo tiene
+    puede volver a adquirirlo.
+    """
+
+    def __init__(self):
+        self._rlock = threading.RLock()
+        self._contador = threading.Lock()
+        self._en_uso = 0
+
+    @property
+    def en_uso(self) -> int:
+        with self._contador:
+            return self._en_uso
+
+    def _sumar(self, n: int):
+        with self._contador:
+            self._en_uso += n
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        # se cuenta antes de bloquear: quien espera también lo está usando
+        self._sumar(1)
+        if self._rlock.acquire(blocking, timeout):
+            return True
+        self._sumar(-1)
+        return False
+
+    def release(self):
+        self._rlock.release()
+        self._sumar(-1)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class OptimizerRegistry:
+    """
+    Optimizadores vivos por proyecto. Expulsa por LRU cuando se superan
+    `max_proyectos` o el presupuesto de memoria, da un cerrojo por proyecto
+    para serializar convert/optimize concurrentes y, si un proyecto no está en
+    memoria, lo rehidrata con `cargador(pid)` (normalmente desde MongoDB).
+    """
+
+    def __init__(self, cargador, max_proyectos: int = config.OPTIMIZER_CACHE_MAX,
+                 presupuesto_mb: float = config.OPTIMIZER_MEMORY_BUDGET_MB):
+        self.cargador = cargador
+        self.max_proyectos = max_proyectos
+        self.presupuesto = presupuesto_mb * 1024 * 1024
+        self._entradas: OrderedDict[str, ShiftOptimizer] = OrderedDict()
+        self._memoria: dict[str, int] = {}
+        # los cerrojos no se borran al expulsar: alguien puede tener ya la
+        # referencia y, si se creara otro, dos hilos tocarían el mismo modelo
+        self._bloqueos: dict[str, BloqueoProyecto] = {}
+        self._lock = threading.Lock()
+
+    def bloqueo(self, pid: str) -> BloqueoProyecto:
+        """Cerrojo del proyecto: un solo solve/edición a la vez sobre su modelo."""
+        with self._lock:
+            if pid not in self._bloqueos:
+                self._bloqueos[pid] = BloqueoProyecto()
+            return self._bloqueos[pid]
+
+    @contextmanager
+    def bloqueado(self, pid: str, rehidratar: bool = True):
+        """
+        Adquiere el cerrojo del proyecto y da su optimizador (o None) obtenido
+        ya dentro. Si se obtuviera antes, otro hilo podría sustituirlo o
+        descartarlo mientras se espera el cerrojo y se tocaría un modelo que ya
+        no es el del proyecto; con el cerrojo tomado tampoco se expulsa.
+        """
+        with self.bloqueo(pid):
+            yield self.get(pid, rehidratar)
+
+    def get(self, pid: str, rehidratar: bool = True) -> ShiftOptimizer | None:
+        with self._lock:
+            optimizer = self._entradas.get(pid)
+            if optimizer is not None:
+                self._entradas.move_to_end(pid)
+                return optimizer
+        if not rehidratar or self.cargador is None:
+            return None
+
+        with self.bloqueo(pid):
+            # otro hilo pudo rehidratarlo mientras esperábamos el cerrojo
+            with self._lock:
+                if pid in self._entradas:
+                    return self._entradas[pid]
+            try:
+                optimizer = self.cargador(pid)
+            except Exception as e:
+                print(f"⚠️  No se pudo rehidratar el proyecto {pid}: {e}")
+                return None
+            if optimizer is not None:
+                print(f"♻️  Proyecto {pid} rehidratado")
+                self.put(pid, optimizer)
+            return optimizer
+
+    def put(self, pid: str, optimizer: ShiftOptimizer):
+        with self._lock:
+            self._entradas[pid] = optimizer
+            self._entradas.move_to_end(pid)
+            self._memoria[pid] = memoria_estimada(optimizer)
+            self._expulsar()
+
+    def actualizar_memoria(self, pid: str):
+        """Recalcula la memoria estimada tras añadir restricciones."""
+        with self._lock:
+            if pid in self._entradas:
+                self._memoria[pid] = memoria_estimada(self._entradas[pid])
+                self._expulsar()
+
+    def discard(self, pid: str):
+        with self._lock:
+            self._entradas.pop(pid, None)
+            self._memoria.pop(pid, None)
+
+    def renombrar(self, viejo: str, nuevo: str):
+        """Pasa un optimizador de borrador a su id de proyecto definitivo."""
+        with self._lock:
+            optimizer = self._entradas.pop(viejo, None)
+            memoria = self._memoria.pop(viejo, 0)
+            if optimizer is not None:
+                self._entradas[nuevo] = optimizer
+                self._memoria[nuevo] = memoria
+            if viejo in self._bloqueos and nuevo not in self._bloqueos:
+                self._bloqueos[nuevo] = self._bloqueos.pop(viejo)
+
+    def _expulsar(self):
+        """Expulsa los menos usados que no estén en uso (llamar con self._lock)."""
+        for pid in list(self._entradas):
+            if (len(self._entradas) <= self.max_proyectos
+                    and sum(self._memoria.values()) <= self.presupuesto):
+                return
+            if len(self._entradas) == 1:
+                return
+            bloqueo = self._bloqueos.get(pid)
+            if bloqueo is not None and bloqueo.en_uso:
+                continue  # en uso (o esperado) por un solve o una edición
+            del self._entradas[pid]
+            self._memoria.pop(pid, None)
+            print(f"🧹 Optimizador del proyecto {pid} expulsado de memoria")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "proyectos": len(self._entradas),
+                "memoria_estimada_mb": round(sum(self._memoria.values()) / (1024 * 1024), 2),
+            }
@@ -1,28 +1,81 @@
+from collections import ChainMap
 from gurobipy import Model, GRB, quicksum, tupledict
 import gurobipy as gp
+import numpy as np
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import closing
 import config
-from utils.constraint_translator import translate_constraint_to_code
+from utils.cache import CacheLRU
+from utils.constraint_translator import (translate_constraint_to_code, invalidar_traduccion, recordar_traduccion,
+                                         traducir_candidatos)
+from utils.specs_hash import hash_specs
+from utils.progress import CanalProgreso, evento_mip
+from models.solver_profiles import resolver_perfil, aplicar_perfil
+from models.decision_spec import construir_familias, desde_codigo
+from models.indices import IndiceVariables, NombresRestricciones
+from models.helpers_restricciones import HELPERS
 
 
+# Resultados de optimización ya calculados. El nivel persistente (MongoDB) se
+# conecta al arrancar la aplicación en main.py.
+solve_cache = CacheLRU("soluciones", config.SOLVE_CACHE_SIZE, config.SOLVE_CACHE_TTL)
+
 class ShiftOptimizer:
     # ───────────────────────────────────────── constructor ────────────────
-    def __init__(self, specs: dict):
+    def __init__(self, specs: dict, persistente: bool = config.PERSISTENT_MODEL, env: gp.Env | None = None,
+                 instantanea: bytes | None = None):
         self.specs = specs
-        # guardo el bloque raw para re-ejecutar variables
+        # entorno Gurobi propio (p. ej. uno por proceso en models/escenarios); None = el global
+        self.env = env
+        # modo persistente: el modelo no se reconstruye en cada optimizar()
+        self.persistente = persistente
+        # perfil de solver por defecto del proyecto (nombre o dict, ver solver_profiles)
+        self.perfil_solver = None
+        self.ultimo_perfil: dict | None = None
+        # última incumbente (índice de variables, valores) para arrancar en caliente
+        self.arranque_en_caliente = config.WARM_START
+        self._ultima_solucion: tuple[IndiceVariables, np.ndarray] | None = None
+        # grupos inyectados o reactivados desde el último solve (pueden violar la incumbente)
+        self._grupos_cambiados: set[str] = set()
+        # guardo el bloque raw (código o especificación estructurada) para recrear variables
         self._dv_code_str = specs["decision_variables"]
         self._compile_dv_code()
-        # mapas de restricciones
-        self.constraint_descriptions = {}
         self.restricciones_validadas = {}  # nl -> {"code":…, "activa":bool}
         # contexto base (sin modelo aún)
         self._build_base_exec_context()
-        # mapeo de constrName → frase NL
-        self.name_to_nl: dict[str, str] = {}
-        # mapeo de frase NL → lista de constrName
-        self.nl_to_constr_names: dict[str, list[str]] = {}
-        self.reset_model()
+        # mapeo de frase NL → constrName; name_to_nl y constraint_descriptions
+        # son la misma vista inversa (constrName → frase), calculada al consultarla
+        self.nl_to_constr_names = NombresRestricciones()
+        self.name_to_nl = self.constraint_descriptions = self.nl_to_constr_names.inverso
+        # grupos de filas inyectados en el modelo: frase NL → info del grupo
+        self._grupos: dict[str, dict] = {}
+        self._modelo_sucio = False
+        # plantilla "sólo variables" para validar restricciones (ver _plantilla_validacion)
+        self._plantilla = None
+        self._plantilla_hash = None
+        if instantanea is not None:
+            # modelo ya compilado (ver instantanea()): una lectura en vez de re-ejecutar código
+            self._restaurar_instantanea(instantanea)
+        else:
+            self.reset_model()
 
     def _compile_dv_code(self):
+        """
+        Prepara la creación de variables: la especificación estructurada (ver
+        models/decision_spec) si el bloque lo es o se puede reconocer como tal,
+        y el código compilado como alternativa.
+        """
+        if isinstance(self._dv_code_str, dict):
+            self._dv_estructura = self._dv_code_str
+            self._dv_code_compiled = None
+            return
         code = (
             self._dv_code_str
             .replace("\\n", "\n")
@@ -31,41 +84,82 @@ class ShiftOptimizer:
         )
         code = code.replace("model.GRB.", "GRB.").replace("self.GRB.", "GRB.")
         self._dv_code_compiled = compile(code, "<decision_variables>", "exec")
+        self._dv_estructura = desde_codigo(code)
+
+    def _crear_variables(self, modelo: Model, ctx: dict) -> Model:
+        """
+        Crea las variables de decisión en `modelo` y las deja en `ctx`: con un
+        addVars por familia si hay especificación estructurada y, si ésta
+        falla, ejecutando el código. Devuelve el modelo usado, que es uno
+        nuevo si hubo que descartar lo creado a medias.
+        """
+        if self._dv_estructura is not None:
+            try:
+                ctx.update(construir_familias(modelo, self._dv_estructura, ctx))
+                return modelo
+            except Exception as e:
+                if self._dv_code_compiled is None:
+                    raise
+                print(f"⚠️  Especificación de variables no aplicable ({e}); se ejecuta el código.")
+                modelo = Model(modelo.ModelName, env=self.env)
+                ctx["model"] = modelo
+        exec(self._dv_code_compiled, ctx)
+        return modelo
 
     def _build_base_exec_context(self):
-        self.exec_context = {
+        self.exec_context = self._contexto_base()
+
+    def _contexto_base(self) -> dict:
+        """Nombres disponibles para el código generado (sin modelo)."""
+        ctx = {
             "GRB": GRB,
             "quicksum": quicksum,
             "gp": gp,
             "specs": self.specs,
             "data": self.specs,
             "variables": self.specs.get("variables", {}),
-            "resources": self.specs.get("resources", {})
+            "resources": self.specs.get("resources", {}),
+            # helpers vectorizados (cobertura, ventana_maxima…); las specs pueden taparlos
+            **HELPERS,
         }
         for k, v in self.specs.get("variables", {}).items():
-            self.exec_context[k] = v
+            ctx[k] = v
         for k, v in self.specs.get("resources", {}).items():
-            self.exec_context[k] = v
+            ctx[k] = v
+        return ctx
 
     def reset_model(self):
         """Reconstruye el modelo, variables de decisión y contexto."""
-        self.model = Model("General Shift Optimizer (limpio)")
+        self.model = Model("General Shift Optimizer (limpio)", env=self.env)
         self.exec_context["model"] = self.model
 
-        # re-ejecución de creación de variables
-        exec(self._dv_code_compiled, self.exec_context)
+        # re-creación de variables de decisión
+        self.model = self._crear_variables(self.model, self.exec_context)
+        self._registrar_variables()
 
-        # extracción de todas las x_*
-        self.decision_vars = {}
-        for k, v in self.exec_context.items():
-            if k.startswith("x_") and isinstance(v, (dict, tupledict)):
-                self.decision_vars.update(v)
+        self._grupos = {}
+        self._filas = []
+        self._grupos_cambiados = set()
+        self._modelo_sucio = False
+
+        self.model.update()
+        print(f"\n🔄 Modelo reseteado con {len(self.indice)} variables de decisión.")
+
+    def _registrar_variables(self):
+        """Reúne las familias x_* del contexto en decision_vars y fija su orden."""
+        familias = [v for k, v in self.exec_context.items() if k.startswith("x_") and isinstance(v, (dict, tupledict))]
+        # la propia familia si sólo hay una; si hay varias, una vista sobre ellas
+        # en vez de copiarlas (con el orden invertido se consulta e itera igual
+        # que un dict.update() familia a familia)
+        self.decision_vars = familias[0] if len(familias) == 1 else ChainMap(*reversed(familias))
         if not self.decision_vars:
             raise RuntimeError("No se encontraron variables de decisión tras reset_model()")
         self.exec_context["x"] = self.decision_vars
-
-        self.model.update()
-        print(f"\n🔄 Modelo reseteado con {len(self.decision_vars)} variables de decisión.")
+        # orden fijo de las variables de decisión: el vector de solución se alinea con él
+        claves = list(self.decision_vars)
+        self.indice = IndiceVariables(claves)
+        self._dv_lista = [self.decision_vars[k] for k in claves]
+        self.solucion: np.ndarray | None = None
 
     # ───────────────────────────────── agregar restricción ────────────────
     def agregar_restriccion(self, nl: str) -> bool:
@@ -80,24 +174,20 @@ class ShiftOptimizer:
             return False
 
         try:
-            # 1) inyectamos el código al modelo
-            # ① Capturamos el state previo en el modelo principal
-            prev = {c.constrName for c in self.model.getConstrs()}
-            # ② Inyectamos el código y forzamos update()
-            exec(info["code"], self.exec_context)
-            self.model.update()
-            # ③ Recalculamos la diferencia: nuevas restricciones
-            after = {c.constrName for c in self.model.getConstrs()}
-            names = list(after - prev)
-
-            # 3) actualizamos ambos diccionarios con esos nombres
-            self.nl_to_constr_names[nl] = names
+            grupo = self._grupos.get(nl)
+            if grupo and grupo["code"] == info["code"]:
+                # ya está en el modelo: basta con reactivarlo
+                if not grupo["activo"]:
+                    self._activar_grupo(nl)
+                    self.model.update()
+                return True
+            if grupo:
+                self._eliminar_grupo(nl)
 
-            for cname in names:
-                self.name_to_nl[cname] = nl
-                self.constraint_descriptions[cname] = nl
+            # inyectamos el código al modelo y registramos sus filas
+            self._inyectar_grupo(nl, info["code"])
 
-            # 4) impresión final para debug
+            # impresión final para debug
             print("📋 nl_to_constr_names (agregar):", self.nl_to_constr_names)
 
             return True
@@ -105,30 +195,462 @@ class ShiftOptimizer:
             print(f"❌ Error añadiendo restricción '{nl}': {e}")
             return False
 
-    # ───────────────────────────────── optimizar ──────────────────────────
-    def optimizar(self):
-        self.reset_model()
+    # ───────────────────────────────── grupos de restricciones ────────────
+    def _inyectar_grupo(self, nl: str, code: str):
+        """
+        Ejecuta el código de una restricción y registra las filas que crea.
+        Las filas nuevas de Gurobi se añaden al final, así que el grupo es el
+        rango [NumConstrs antes, NumConstrs después): no se recorre el resto
+        del modelo ni se leen sus nombres.
+
+        Si el código toca algo más que sus propias filas (bounds u objetivo de
+        variables existentes, objetivo de variables nuevas) el grupo no se
+        puede desactivar relajando el RHS: se marca como no relajable y
+        desactivarlo o eliminarlo obliga a reconstruir el modelo. Si el código
+        falla a medias se quita lo que llegó a crear.
+        """
+        m = self.model
+        m.update()
+        inicio = m.NumConstrs
+        n_vars, n_q, n_gen, n_sos = m.NumVars, m.NumQConstrs, m.NumGenConstrs, m.NumSOS
+        previas = m.getVars()
+        antes = self._estado_variables(previas)
+        try:
+            exec(code, self.exec_context)
+            m.update()
+        except Exception:
+            self._deshacer_inyeccion(inicio, n_vars, n_q, n_gen, n_sos, previas, antes)
+            raise
+        constrs = m.getConstrs()[inicio:]
+        # solo se piden los nombres de las filas nuevas, en una llamada
+        names = m.getAttr("ConstrName", constrs) if constrs else []
+        nuevas_vars = m.getVars()[n_vars:]
+        relajable = (self._mismo_estado(antes, self._estado_variables(previas))
+                     and not any(m.getAttr("Obj", nuevas_vars) if nuevas_vars else []))
+        if not relajable:
+            print(f"⚠️  '{nl}' cambia bounds u objetivo: desactivarla reconstruirá el modelo.")
+
+        self._grupos[nl] = {
+            "code": code,
+            "activo": True,
+            "relajable": relajable,
+            "constrs": constrs,
+            "sense": m.getAttr("Sense", constrs),
+            "rhs": m.getAttr("RHS", constrs),
+            "vars": nuevas_vars,
+            "qconstrs": m.getQConstrs()[n_q:],
+            "genconstrs": m.getGenConstrs()[n_gen:],
+            "sos": m.getSOSs()[n_sos:],
+        }
+        self._registrar_filas(nl, inicio, inicio + len(constrs))
+
+        self._grupos_cambiados.add(nl)
+
+        # actualizamos el mapeo con esos nombres
+        self.nl_to_constr_names[nl] = names
+        return names
+
+    def _estado_variables(self, variables: list) -> tuple:
+        """LB, UB y coeficiente de objetivo de `variables`, más constante y sentido del objetivo."""
+        m = self.model
+        if not variables:
+            return (), (), (), m.ObjCon, m.ModelSense
+        return (np.asarray(m.getAttr("LB", variables)), np.asarray(m.getAttr("UB", variables)),
+                np.asarray(m.getAttr("Obj", variables)), m.ObjCon, m.ModelSense)
+
+    @staticmethod
+    def _mismo_estado(a: tuple, b: tuple) -> bool:
+        return all(np.array_equal(x, y) for x, y in zip(a[:3], b[:3])) and a[3:] == b[3:]
+
+    def _deshacer_inyeccion(self, inicio: int, n_vars: int, n_q: int, n_gen: int, n_sos: int,
+                            previas: list, antes: tuple):
+        """
+        Quita del modelo lo que creó un código que ha fallado a medias. Si
+        además llegó a cambiar bounds u objetivo, el modelo queda marcado para
+        reconstruirse.
+        """
+        m = self.model
+        m.update()
+        for nuevos in (m.getConstrs()[inicio:], m.getQConstrs()[n_q:], m.getGenConstrs()[n_gen:],
+                       m.getSOSs()[n_sos:], m.getVars()[n_vars:]):
+            if nuevos:
+                m.remove(nuevos)
+        m.update()
+        if not self._mismo_estado(antes, self._estado_variables(previas)):
+            self._modelo_sucio = True
+
+    # ───────────────────────────────── registro de filas ──────────────────
+    def _registrar_filas(self, nl: str, inicio: int, fin: int):
+        """Apunta que las filas [inicio, fin) las creó la restricción `nl`."""
+        if fin > inicio:
+            bisect.insort(self._filas, (inicio, fin, nl))
+
+    def _liberar_filas(self, nl: str):
+        """Quita el rango de `nl` y desplaza los posteriores, como hará Gurobi al eliminar."""
+        for pos, (inicio, fin, propietaria) in enumerate(self._filas):
+            if propietaria == nl:
+                del self._filas[pos]
+                n = fin - inicio
+                self._filas[pos:] = [(a - n, b - n, d) for a, b, d in self._filas[pos:]]
+                return
+
+    def nl_de_fila(self, indice: int) -> str | None:
+        """Frase NL que creó la fila `indice` del modelo, o None si no es de ningún grupo."""
+        pos = bisect.bisect_right(self._filas, (indice, float("inf"))) - 1
+        if pos >= 0:
+            inicio, fin, nl = self._filas[pos]
+            if inicio <= indice < fin:
+                return nl
+        return None
+
+    def _activar_grupo(self, nl: str):
+        """Restaura sentido y RHS originales de las filas del grupo."""
+        grupo = self._grupos[nl]
+        if grupo["constrs"]:
+            self.model.setAttr("Sense", grupo["constrs"], grupo["sense"])
+            self.model.setAttr("RHS", grupo["constrs"], grupo["rhs"])
+        grupo["activo"] = True
+        self._grupos_cambiados.add(nl)
+
+    def _desactivar_grupo(self, nl: str):
+        """
+        Desactiva un grupo sin sacarlo del modelo: las filas lineales se
+        relajan a RHS infinito. Si el grupo tiene filas no lineales (cuadráticas,
+        generales o SOS) no se pueden relajar y se elimina del modelo.
+        """
+        grupo = self._grupos[nl]
+        if grupo["qconstrs"] or grupo["genconstrs"] or grupo["sos"] or not grupo["relajable"]:
+            self._eliminar_grupo(nl)
+            return
+        if grupo["constrs"]:
+            senses, rhs = [], []
+            for s in grupo["sense"]:
+                if s == GRB.GREATER_EQUAL:
+                    senses.append(GRB.GREATER_EQUAL)
+                    rhs.append(-GRB.INFINITY)
+                else:
+                    senses.append(GRB.LESS_EQUAL)
+                    rhs.append(GRB.INFINITY)
+            self.model.setAttr("Sense", grupo["constrs"], senses)
+            self.model.setAttr("RHS", grupo["constrs"], rhs)
+        grupo["activo"] = False
+
+    def _eliminar_grupo(self, nl: str):
+        """
+        Elimina del modelo todas las filas (y variables auxiliares) del grupo.
+        Si el grupo no es relajable sus cambios de bounds u objetivo no se
+        pueden deshacer: el modelo queda marcado para reconstruirse.
+        """
+        grupo = self._grupos.pop(nl)
+        if not grupo["relajable"]:
+            self._modelo_sucio = True
+        self._liberar_filas(nl)
+        for clave in ("constrs", "qconstrs", "genconstrs", "sos", "vars"):
+            if grupo[clave]:
+                self.model.remove(grupo[clave])
+        self.nl_to_constr_names.pop(nl, None)
+
+    def _sincronizar_restricciones(self):
+        """
+        Alinea el modelo persistente con restricciones_validadas: inyecta los
+        grupos nuevos, activa/desactiva los existentes y elimina los que ya no
+        están validados o cuyo código ha cambiado. Si con ello hay que sacar
+        un grupo no relajable, se reconstruye el modelo y se inyectan sólo las
+        activas.
+        """
+        if self._modelo_sucio:
+            self.reset_model()
+        for nl in list(self._grupos):
+            info = self.restricciones_validadas.get(nl)
+            if info is None or info["code"] != self._grupos[nl]["code"]:
+                self._eliminar_grupo(nl)
 
-        # 2) agrego sólo activas (y mapeo constrName→frase NL)
         for nl, info in self.restricciones_validadas.items():
-            if not info["activa"]:
-                continue
+            grupo = self._grupos.get(nl)
+            if info["activa"]:
+                if grupo is None:
+                    self._inyectar_grupo(nl, info["code"])
+                elif not grupo["activo"]:
+                    self._activar_grupo(nl)
+            elif grupo is not None and grupo["activo"]:
+                self._desactivar_grupo(nl)
+        if self._modelo_sucio:
+            self._sincronizar_restricciones()
+            return
+        self.model.update()
 
-            # nombres antes de inyectar
-            prev = {c.constrName for c in self.model.getConstrs()}
-            exec(info["code"], self.exec_context)
-            # nuevas restricciones
-            for c in self.model.getConstrs():
-                if c.constrName not in prev:
-                    self.name_to_nl[c.constrName] = nl
-                    self.constraint_descriptions[c.constrName] = nl
+    # ───────────────────────────────── instantánea del modelo ─────────────
+    @staticmethod
+    def calcular_clave_instantanea(specs: dict, restricciones: dict) -> str:
+        """
+        Hash de (specs, código de cada restricción validada). Activar o
+        desactivar restricciones no la cambia: eso se resuelve al sincronizar.
+        """
+        codigos = sorted((nl, info["code"]) for nl, info in restricciones.items())
+        base = json.dumps([hash_specs(specs), codigos], ensure_ascii=False)
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def clave_instantanea(self) -> str:
+        return self.calcular_clave_instantanea(self.specs, self.restricciones_validadas)
+
+    def instantanea(self) -> bytes | None:
+        """
+        Modelo compilado (MPS) más lo necesario para volver a usarlo sin
+        re-ejecutar código: familias x_* (claves → índice de variable), grupos
+        de restricciones (índices de filas y variables, sentido y RHS
+        originales) y el mapeo nombre → frase. Comprimido con gzip.
+
+        Devuelve None si el modelo no se puede representar fielmente: grupos
+        con filas no lineales o nombres vacíos/repetidos (el MPS los pierde).
+        Los nombres con espacios ("Retén 1") el MPS los cambia por genéricos,
+        así que en ese caso se guardan aparte y se reponen al restaurar.
+        """
+        if self._modelo_sucio:
+            return None
+        if any(g["qconstrs"] or g["genconstrs"] or g["sos"] for g in self._grupos.values()):
+            return None
+        m = self.model
+        m.update()
+        nombres = {"vars": m.getAttr("VarName", m.getVars()), "constrs": m.getAttr("ConstrName", m.getConstrs())}
+        for lista in nombres.values():
+            if len(set(lista)) != len(lista) or "" in lista:
+                return None
+        con_espacios = any(re.search(r"\s", n) for lista in nombres.values() for n in lista)
+
+        familias = {}
+        for k, v in self.exec_context.items():
+            if k.startswith("x_") and isinstance(v, (dict, tupledict)):
+                familias[k] = [
+                    [list(c) if isinstance(c, tuple) else c for c in v.keys()],
+                    [var.index for var in v.values()],
+                ]
+        grupos = {
+            nl: {
+                "code": g["code"],
+                "activo": g["activo"],
+                "relajable": g["relajable"],
+                "constrs": [c.index for c in g["constrs"]],
+                "sense": g["sense"],
+                "rhs": g["rhs"],
+                "vars": [v.index for v in g["vars"]],
+            }
+            for nl, g in self._grupos.items()
+        }
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "modelo.mps")
+            m.write(ruta)
+            with open(ruta, encoding="utf-8") as f:
+                mps = f.read()
+        datos = {
+            "clave": self.clave_instantanea(),
+            "familias": familias,
+            "grupos": grupos,
+            "nl_to_constr_names": {nl: self.nl_to_constr_names.get(nl, []) for nl in self._grupos},
+            "mps": mps,
+        }
+        if con_espacios:
+            datos["nombres"] = nombres
+        return gzip.compress(json.dumps(datos, ensure_ascii=False).encode("utf-8"))
+
+    def _restaurar_instantanea(self, instantanea: bytes):
+        """Carga el modelo de una instantánea en lugar de reconstruirlo (ver instantanea())."""
+        datos = json.loads(gzip.decompress(instantanea).decode("utf-8"))
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "modelo.mps")
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(datos["mps"])
+            self.model = gp.read(ruta, env=self.env)
+        self.exec_context["model"] = self.model
+        vs = self.model.getVars()
+        cs = self.model.getConstrs()
+        if "nombres" in datos:
+            self.model.setAttr("VarName", vs, datos["nombres"]["vars"])
+            self.model.setAttr("ConstrName", cs, datos["nombres"]["constrs"])
+            self.model.update()
 
+        for nombre, (claves, indices) in datos["familias"].items():
+            claves = [tuple(c) if isinstance(c, list) else c for c in claves]
+            self.exec_context[nombre] = tupledict(zip(claves, [vs[i] for i in indices]))
+        self._registrar_variables()
+
+        self._grupos = {}
+        self._filas = []
+        for nl, g in datos["grupos"].items():
+            if g["constrs"]:
+                self._registrar_filas(nl, g["constrs"][0], g["constrs"][-1] + 1)
+            self._grupos[nl] = {
+                "code": g["code"],
+                "activo": g["activo"],
+                "relajable": g.get("relajable", True),
+                "constrs": [cs[i] for i in g["constrs"]],
+                "sense": g["sense"],
+                "rhs": g["rhs"],
+                "vars": [vs[i] for i in g["vars"]],
+                "qconstrs": [],
+                "genconstrs": [],
+                "sos": [],
+            }
+        self.nl_to_constr_names.update(datos["nl_to_constr_names"])
+        self._grupos_cambiados = set()
+        self._modelo_sucio = False
+        print(f"\n📦 Modelo restaurado de instantánea: {self.model.NumVars} variables, "
+              f"{self.model.NumConstrs} restricciones, {len(self._grupos)} grupos.")
+
+    # ───────────────────────────────── solución ───────────────────────────
+    def extraer_solucion(self) -> np.ndarray:
+        """
+        Lee los valores de todas las variables de decisión con una única llamada
+        getAttr("X"). El vector queda en self.solucion, alineado con
+        self.indice, y es lo que reutilizan la API, el Excel y los logs.
+        """
+        self.solucion = np.asarray(self.model.getAttr("X", self._dv_lista), dtype=float)
+        return self.solucion
+
+    def indices_activos(self, umbral: float = 0.5) -> np.ndarray:
+        """Posiciones (en self.indice) de las variables con valor > umbral."""
+        if self.solucion is None:
+            return np.empty(0, dtype=int)
+        return np.flatnonzero(self.solucion > umbral)
+
+    def solucion_activa(self, umbral: float = 0.5) -> dict:
+        """{str(clave): valor} de las variables activas, como lo devuelve la API."""
+        return {str(self.indice[i]): float(self.solucion[i]) for i in self.indices_activos(umbral)}
+
+    def _imprimir_activas(self):
+        idx = self.indices_activos()
+        nombres = self.model.getAttr("VarName", [self._dv_lista[i] for i in idx])
+        for nombre, i in zip(nombres, idx):
+            print(f"  · {nombre} = {self.solucion[i]}")
+
+    # ───────────────────────────────── caché de resultados ────────────────
+    def clave_resultado(self, perfil=None) -> str:
+        """
+        Clave de solve_cache: hash de (specs, código ordenado de las
+        restricciones activas, perfil de solver resuelto).
+        """
+        codigos = sorted(info["code"] for info in self.restricciones_validadas.values() if info.get("activa"))
+        perfil = resolver_perfil(perfil if perfil is not None else self.perfil_solver)
+        base = json.dumps([hash_specs(self.specs), codigos, perfil], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def resultado_para_cache(self) -> dict:
+        """Vector de solución en forma dispersa (posiciones y valores no nulos)."""
+        indices = np.flatnonzero(np.abs(self.solucion) > 1e-9)
+        return {
+            "n": len(self.solucion),
+            "indices": indices.tolist(),
+            "valores": self.solucion[indices].tolist(),
+        }
 
+    def restaurar_resultado(self, entrada: dict) -> bool:
+        """
+        Carga en self.solucion un vector guardado con resultado_para_cache.
+        Devuelve False si no encaja con las variables de decisión actuales.
+        """
+        if entrada.get("n") != len(self.indice):
+            return False
+        solucion = np.zeros(entrada["n"])
+        solucion[np.asarray(entrada["indices"], dtype=int)] = entrada["valores"]
+        self.solucion = solucion
+        self._guardar_incumbente()
+        return True
 
-        # 3) optimizo
-        self.model.setParam("Threads", 1)
-        self.model.setParam("Presolve", 0)
-        self.model.optimize()
+    # ───────────────────────────────── arranque en caliente ───────────────
+    def _guardar_incumbente(self):
+        """Guarda la solución actual de las variables de decisión junto con su índice."""
+        self._ultima_solucion = (self.indice, self.solucion.copy())
+
+    def _cargar_inicio(self):
+        """
+        Carga la última incumbente como MIP start. Reparación: se ajustan los
+        valores a los bounds actuales (redondeando las enteras) y, en las filas
+        nuevas o reactivadas que la incumbente viola, se dejan sin valor sus
+        variables para que Gurobi complete el arranque parcial.
+        """
+        if not self.arranque_en_caliente or not self._ultima_solucion:
+            return
+        dvs = self._dv_lista
+        indice_previo, previos = self._ultima_solucion
+        if indice_previo is self.indice or indice_previo.igual(self.indice):
+            valores = previos.copy()
+        else:
+            # otras variables (p. ej. tras cambiar las specs): se casan por clave
+            por_clave = dict(zip(indice_previo, previos.tolist()))
+            valores = np.array([por_clave.get(k, np.nan) for k in self.indice], dtype=float)
+        lbs = np.asarray(self.model.getAttr("LB", dvs))
+        ubs = np.asarray(self.model.getAttr("UB", dvs))
+        enteras = np.asarray(self.model.getAttr("VType", dvs)) != GRB.CONTINUOUS
+        valores[enteras] = np.round(valores[enteras])
+        valores = np.clip(valores, lbs, ubs)
+
+        conocidas = np.flatnonzero(~np.isnan(valores))
+        inicio: dict[int, float] = dict(zip([dvs[i].index for i in conocidas], valores[conocidas].tolist()))
+
+        liberadas = set()
+        for nl in self._grupos_cambiados:
+            grupo = self._grupos.get(nl)
+            if not grupo or not grupo["activo"]:
+                continue
+            for c, sentido, rhs in zip(grupo["constrs"], grupo["sense"], grupo["rhs"]):
+                fila = self.model.getRow(c)
+                idx = [fila.getVar(i).index for i in range(fila.size())]
+                if any(j not in inicio for j in idx):
+                    continue  # fila ya incompleta: la completará Gurobi
+                actividad = sum(fila.getCoeff(i) * inicio[j] for i, j in enumerate(idx))
+                if ((sentido == GRB.LESS_EQUAL and actividad > rhs + 1e-6)
+                        or (sentido == GRB.GREATER_EQUAL and actividad < rhs - 1e-6)
+                        or (sentido == GRB.EQUAL and abs(actividad - rhs) > 1e-6)):
+                    for j in idx:
+                        inicio.pop(j, None)
+                        liberadas.add(j)
+
+        self.model.setAttr("Start", dvs, [inicio.get(v.index, GRB.UNDEFINED) for v in dvs])
+        print(f"🔥 Arranque en caliente: {len(inicio)} valores, {len(liberadas)} liberados por reparación")
+
+    # ───────────────────────────────── optimizar ──────────────────────────
+    def _callback_progreso(self, canal: CanalProgreso):
+        """
+        Callback de Gurobi que publica incumbente, cota, gap, nodos y tiempo en
+        el canal (como mucho cada config.PROGRESS_INTERVAL segundos, y siempre
+        que hay nueva incumbente) y para el solve si el canal lo pide.
+        """
+        inicio = time.time()
+        ultimo = [0.0]
+
+        def callback(model, where):
+            evento = evento_mip(model, where, inicio)
+            if evento is None:
+                return
+            ahora = time.time()
+            if where == GRB.Callback.MIPSOL or ahora - ultimo[0] >= config.PROGRESS_INTERVAL:
+                ultimo[0] = ahora
+                canal.publicar(evento)
+            if canal.debe_parar(evento["gap"]):
+                print(f"⏹️  Parada anticipada (gap={evento['gap']})")
+                model.terminate()
+
+        return callback
+
+    def optimizar(self, canal: CanalProgreso | None = None, perfil=None):
+        if not self.persistente or self._modelo_sucio:
+            self.reset_model()
+
+        # 2) agrego sólo activas (y mapeo constrName→frase NL); en modo
+        #    persistente sólo se tocan los grupos que han cambiado
+        self._sincronizar_restricciones()
+
+        # 3) optimizo con el perfil pedido (o el del proyecto)
+        self.ultimo_perfil = resolver_perfil(perfil if perfil is not None else self.perfil_solver)
+        aplicar_perfil(self.model, self.ultimo_perfil)
+        print(f"⚙️  Perfil de solver: {self.ultimo_perfil['nombre']} {self.ultimo_perfil['params']}")
+        callback = self._callback_progreso(canal) if canal is not None else None
+        self._cargar_inicio()
+        self.model.optimize(callback)
+        self._grupos_cambiados = set()
+        self.solucion = None
+        if self.model.SolCount > 0:
+            self.extraer_solucion()
+            self._guardar_incumbente()
 
         status = self.model.status
         print("\n═════════ RESULTADO OPTIMIZACIÓN ═════════")
@@ -137,40 +659,43 @@ class ShiftOptimizer:
         if status in (GRB.OPTIMAL, GRB.SUBOPTIMAL):
             print(f"Objetivo: {self.model.ObjVal}")
             print("Variables activadas (>0.5):")
-            for var in self.model.getVars():
-                if var.X > 0.5:
-                    print(f"  · {var.VarName} = {var.X}")
+            self._imprimir_activas()
             print("════════════════════════════════════════")
             return
         # … dentro de ShiftOptimizer.optimizar(), en el bloque infeasible …
         if status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
             print("❌ Modelo inviable. IIS:")
             self.model.computeIIS()
-            for c in self.model.getConstrs():
-                if c.IISConstr:
-                    desc = self.constraint_descriptions.get(c.constrName, "(sin descripción)")
-                    print(f"   ↯ {c.constrName} — {desc}")
+            constrs = self.model.getConstrs()
+            for i in np.flatnonzero(self.model.getAttr("IISConstr", constrs)):
+                c = constrs[i]
+                desc = self.nl_de_fila(int(i)) or self.constraint_descriptions.get(c.constrName, "(sin descripción)")
+                print(f"   ↯ {c.constrName} — {desc}")
 
             print("\n🔄 Intentando relajación automática …")
             orig = self.model.NumVars
+            # la relajación añade variables y cambia el objetivo: el modelo
+            # persistente deberá reconstruirse en la próxima optimización
+            self._modelo_sucio = True
             self.model.feasRelaxS(relaxobjtype=0, minrelax=False, vrelax=False, crelax=True)
-            self.model.optimize()
+            self.model.optimize(callback)
 
             if self.model.status == GRB.OPTIMAL:
                 print("✅ Modelo relajado resuelto. Objetivo:", self.model.ObjVal)
+                self.extraer_solucion()
                 slacks = self.model.getVars()[orig:]
+                valores = self.model.getAttr("X", slacks)
                 relaxed_nls = []
-                for sv in slacks:
-                    if sv.X > 1e-6:
-                        # Quitar los prefijos de slack (ArtP_ o ArtN_)
-                        cname = sv.VarName
-                        if cname.startswith("ArtP_") or cname.startswith("ArtN_"):
-                            cname = cname.split("_", 1)[1]
-                        # Recuperar la frase original
-                        phrase = self.constraint_descriptions.get(cname, f"(sin mapping para {cname})")
-                        relaxed_nls.append(phrase)
-                        relaxed_nls = list(dict.fromkeys(relaxed_nls))
-                        print(f"   · {phrase} (relajada: {sv.X:g})")
+                for i in np.flatnonzero(np.asarray(valores) > 1e-6):
+                    # cada holgura (ArtP_/ArtN_) tiene un único coeficiente, en
+                    # la fila que relaja: su índice da la frase sin pasar por nombres
+                    fila = self.model.getCol(slacks[i]).getConstr(0)
+                    phrase = (self.nl_de_fila(fila.index)
+                              or self.constraint_descriptions.get(fila.constrName,
+                                                                  f"(sin mapping para {fila.constrName})"))
+                    relaxed_nls.append(phrase)
+                    print(f"   · {phrase} (relajada: {valores[i]:g})")
+                relaxed_nls = list(dict.fromkeys(relaxed_nls))
 
                 # Imprimir al final la lista de frases originales
                 if relaxed_nls:
@@ -191,7 +716,9 @@ class ShiftOptimizer:
 
     # ───────────────────────────────── imprimir vars ──────────────────────────
     def _imprimir_decision_vars(self):
-        act = [(k, v.X) for k, v in self.decision_vars.items() if v.X > 0.5]
+        if self.solucion is None:
+            self.extraer_solucion()
+        act = [(self.indice[i], self.solucion[i]) for i in self.indices_activos()]
         if not act:
             print("No hay variables activadas.")
             return
@@ -209,60 +736,148 @@ class ShiftOptimizer:
             turno = horarios[fr] if fr < len(horarios) else f"franja {fr}"
             print(" · ".join(partes) + f" → día {dia}, {turno}")
 
+    # ───────────────────────────────── plantilla de validación ────────────
+    def _plantilla_validacion(self) -> dict:
+        """
+        Devuelve el modelo "sólo variables" cacheado junto con la posición de
+        cada variable de decisión. Se reconstruye únicamente si cambian las specs.
+        """
+        h = hash_specs(self.specs)
+        if self._plantilla is not None and self._plantilla_hash == h:
+            return self._plantilla
+
+        if self.specs["decision_variables"] != self._dv_code_str:
+            self._dv_code_str = self.specs["decision_variables"]
+            self._compile_dv_code()
+
+        ctx = self._contexto_base()
+        modelo = Model("Plantilla variables", env=self.env)
+        ctx["model"] = modelo
+        modelo = self._crear_variables(modelo, ctx)
+        modelo.update()
+
+        # por cada diccionario de Var del contexto guardo claves e índices
+        familias = {}
+        for k, v in ctx.items():
+            if isinstance(v, (dict, tupledict)) and v and all(isinstance(e, gp.Var) for e in v.values()):
+                familias[k] = (list(v.keys()), [e.index for e in v.values()])
+
+        self._plantilla = {"model": modelo, "familias": familias}
+        self._plantilla_hash = h
+        print(f"🧩 Plantilla de validación creada con {modelo.NumVars} variables.")
+        return self._plantilla
+
+    def _contexto_validacion(self, nombre: str) -> dict:
+        """Contexto de exec sobre una copia de la plantilla de variables."""
+        plantilla = self._plantilla_validacion()
+        modelo = plantilla["model"].copy()
+        modelo.ModelName = nombre
+        vs = modelo.getVars()
+
+        ctx = self._contexto_base()
+        ctx["model"] = modelo
+        todas = {}
+        for k, (claves, idx) in plantilla["familias"].items():
+            ctx[k] = tupledict(zip(claves, [vs[i] for i in idx]))
+            if k.startswith("x_"):
+                todas.update(ctx[k])
+        ctx["x"] = todas
+        return ctx
+
     # ───────────────────────────────── validar restricción ─────────────────
-    def validar_restriccion(self, nl: str, code: str, max_attempts: int = config.MAX_ATTEMPTS) -> bool:
+    def _probar_codigo(self, code: str, nombre: str) -> list[str]:
+        """
+        Ejecuta `code` sobre una copia de la plantilla de variables y devuelve
+        los constrName que ha creado. Lanza la excepción del código si falla.
+        """
+        # copia barata de la plantilla en lugar de recrear las variables
+        ctx = self._contexto_validacion(nombre)
+        modelo_temp = ctx["model"]
+        modelo_temp.update()
+        inicio = modelo_temp.NumConstrs
+        exec(code, ctx)
+        modelo_temp.update()
+        # las filas nuevas son las del final: solo se leen sus nombres
+        nuevas = modelo_temp.getConstrs()[inicio:]
+        return modelo_temp.getAttr("ConstrName", nuevas) if nuevas else []
+
+    def _registrar_validada(self, nl: str, code: str, new_constrs: list[str]):
+        # Asocio cada constrName a la frase NL original (name_to_nl es su vista inversa)
+        self.nl_to_constr_names[nl] = new_constrs
+        print("📋 nl_to_constr_names:", self.nl_to_constr_names)
+
+        # Marco la restricción como validada y activa
+        self.restricciones_validadas[nl] = {
+            "code": code,
+            "activa": True,
+            "names": new_constrs
+        }
+
+    def validar_restriccion(self, nl: str, code: str, max_attempts: int = config.MAX_ATTEMPTS,
+                            candidatos: int = config.VALIDATION_CANDIDATES) -> bool:
+        """
+        Valida `code` contra la plantilla de variables. Si falla, pide una
+        corrección al LLM con el error y vuelve a probar, hasta max_attempts
+        traducciones en total. Con candidatos > 1 las correcciones se piden de
+        `candidatos` en `candidatos` a la vez (ver _validar_especulativo).
+        """
         attempt = 0
         current = code
+        nl_actual = nl
         while attempt < max_attempts:
-            modelo_temp = Model(f"Temp_{attempt}")
-            ctx = {
-                "model": modelo_temp, "GRB": GRB, "quicksum": quicksum, "gp": gp,
-                "specs": self.specs, "data": self.specs,
-                "variables": self.specs.get("variables", {}),
-                "resources": self.specs.get("resources", {})
-            }
-            for k, v in self.specs.get("variables", {}).items(): ctx[k] = v
-            for k, v in self.specs.get("resources", {}).items(): ctx[k] = v
-
-            # reconstruyo vars
-            exec(self._dv_code_compiled, ctx)
-
             try:
-                # Ejecuto el código traducido sobre el modelo temporal
-                # ① Capturamos el estado previo
-                prev = {c.constrName for c in modelo_temp.getConstrs()}
-                # ② Ejecutamos la restricción y forzamos update()
-                exec(current, ctx)
-                modelo_temp.update()
-                # ③ Obtenemos el set tras inyectar
-                after = {c.constrName for c in modelo_temp.getConstrs()}
-                # ④ La diferencia son las nuevas constrName
-                new_constrs = list(after - prev)
-                self.nl_to_constr_names[nl] = new_constrs
-                print("📋 nl_to_constr_names:", self.nl_to_constr_names)
-
-                # Para cada una:
-                for cname in new_constrs:
-                    # 1) Asocio el constrName a la frase NL original
-                    self.name_to_nl[cname] = nl
-                print("🔍 Mapeo name_to_nl tras validar:", self.name_to_nl)
-
-                # Marco la restricción como validada y activa
-                self.restricciones_validadas[nl] = {
-                    "code": current,
-                    "activa": True,
-                    "names": new_constrs
-                }
-
+                new_constrs = self._probar_codigo(current, f"Temp_{attempt}")
+                self._registrar_validada(nl, current, new_constrs)
                 print(f"✔️  Restricción validada ({attempt + 1}): '{nl}' → {new_constrs}")
                 return True
 
             except Exception as e:
                 attempt += 1
                 print(f"⚠️  Error validando (intento {attempt}): {e}")
+                # el código que ha fallado no debe volver a salir de la caché
+                invalidar_traduccion(nl_actual, self.specs)
+                if attempt >= max_attempts:
+                    break
+                if candidatos > 1:
+                    return self._validar_especulativo(nl, e, max_attempts - attempt, candidatos)
                 # Reintento traduciendo la restricción al código corrigiendo el error
-                nl_mod = f"{nl}\nError: {e}"
-                current = translate_constraint_to_code(nl_mod, self.specs)
+                nl_actual = f"{nl}\nError: {e}"
+                current = translate_constraint_to_code(nl_actual, self.specs)
+        return False
+
+    def _validar_especulativo(self, nl: str, error: Exception, presupuesto: int, k: int) -> bool:
+        """
+        Rondas de corrección en paralelo: en cada una se piden hasta k
+        traducciones a la vez y se validan según llegan; gana la primera que
+        valida y las demás ya no se esperan. La validación en sí es secuencial
+        (milisegundos frente a segundos del LLM) porque todos los candidatos
+        comparten el entorno Gurobi de la plantilla.
+        """
+        ronda = 0
+        while presupuesto > 0:
+            n = min(k, presupuesto)
+            presupuesto -= n
+            ronda += 1
+            nl_actual = f"{nl}\nError: {error}"
+            print(f"🔀 Ronda {ronda}: {n} candidatos en paralelo para '{nl}'")
+            with closing(traducir_candidatos(nl_actual, self.specs, n)) as llegadas:
+                for i, candidato in enumerate(llegadas):
+                    if isinstance(candidato, Exception):
+                        error = candidato
+                        continue
+                    try:
+                        new_constrs = self._probar_codigo(candidato, f"Temp_r{ronda}_{i}")
+                    except Exception as e:
+                        print(f"⚠️  Candidato {i + 1} de la ronda {ronda} no valida: {e}")
+                        error = e
+                        continue
+                    self._registrar_validada(nl, candidato, new_constrs)
+                    # la próxima traducción de la frase original ya sale de la caché
+                    recordar_traduccion(nl, self.specs, candidato)
+                    print(f"✔️  Restricción validada (ronda {ronda}, candidato {i + 1}): '{nl}' → {new_constrs}")
+                    return True
+            invalidar_traduccion(nl_actual, self.specs)
+        return False
 
     # ───────────────────────────────── editar restricción ─────────────────
     def editar_restriccion(self, nl: str, nuevo_nl: str) -> bool:
@@ -278,6 +893,22 @@ class ShiftOptimizer:
         entry = self.restricciones_validadas.pop(nuevo_nl)
         entry["activa"] = was_active
         del self.restricciones_validadas[nl]
+        if nl in self._grupos:
+            self._eliminar_grupo(nl)
         self.restricciones_validadas[nuevo_nl] = entry
         print(f"✅  '{nl}' → '{nuevo_nl}' (activa={was_active})")
         return True
+
+    # ───────────────────────────────── eliminar restricción ───────────────
+    def eliminar_restriccion(self, nl: str) -> bool:
+        """Elimina una restricción validada y sus filas del modelo."""
+        if nl not in self.restricciones_validadas:
+            print("⚠️  No existe esa restricción.")
+            return False
+        del self.restricciones_validadas[nl]
+        if nl in self._grupos:
+            self._eliminar_grupo(nl)
+            self.model.update()
+        self.nl_to_constr_names.pop(nl, None)
+        print(f"🗑️  Restricción eliminada: '{nl}'")
+        return True
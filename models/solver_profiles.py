@@ -0,0 +1,31 @@
+import config
+
+
+def resolver_perfil(perfil=None) -> dict:
+    """
+    Convierte lo que llega de la API o del proyecto en {"nombre", "params"}.
+    Acepta el nombre de un perfil de config.SOLVER_PROFILES, un dict
+    {"name": <base>, "params": {...}} que sobreescribe parámetros de la base,
+    o None para el perfil por defecto.
+    """
+    if perfil is None:
+        perfil = config.DEFAULT_SOLVER_PROFILE
+    if isinstance(perfil, str):
+        if perfil not in config.SOLVER_PROFILES:
+            raise ValueError(f"Perfil de solver desconocido: '{perfil}'")
+        return {"nombre": perfil, "params": dict(config.SOLVER_PROFILES[perfil])}
+    if isinstance(perfil, dict):
+        base = resolver_perfil(perfil.get("name") or perfil.get("nombre"))
+        extra = perfil.get("params") or {}
+        if extra:
+            base["nombre"] = f"{base['nombre']}+custom"
+            base["params"].update(extra)
+        return base
+    raise ValueError(f"Perfil de solver no válido: {perfil!r}")
+
+
+def aplicar_perfil(model, perfil: dict):
+    """Deja el modelo con los parámetros por defecto de Gurobi más los del perfil."""
+    model.resetParams()
+    for nombre, valor in perfil["params"].items():
+        model.setParam(nombre, valor)
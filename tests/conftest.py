@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture
+def specs_retenes():
+    """Especificación mínima de retenes, sin pasar por la API de OpenAI."""
+    return {
+        "variables": {
+            "dias": 4,
+            "franjas": 2,
+            "horarios": ["08:00–20:00", "20:00–08:00"],
+            "lista_retenes": ["R1", "R2", "R3", "R4", "R5"],
+        },
+        "resources": {"retenes": 5},
+        "decision_variables": (
+            "self.x_retenes = { (r, d, f): model.addVar(vtype=GRB.BINARY, name=f\"x_{r}_{d}_{f}\")\n"
+            "    for r in variables['lista_retenes']\n"
+            "    for d in range(variables['dias'])\n"
+            "    for f in range(variables['franjas']) }"
+        ),
+    }
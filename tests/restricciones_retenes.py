@@ -0,0 +1,11 @@
+""" Código de restricciones de retenes compartido por varios tests """
+MINIMO = (
+    "for d in range(dias):\n"
+    "    for f in range(franjas):\n"
+    "        model.addConstr(quicksum(x_retenes[(r, d, f)] for r in lista_retenes) >= 2, name=f'min_{d}_{f}')\n"
+)
+MAXIMO = (
+    "for d in range(dias):\n"
+    "    for f in range(franjas):\n"
+    "        model.addConstr(quicksum(x_retenes[(r, d, f)] for r in lista_retenes) <= 1, name=f'max_{d}_{f}')\n"
+)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+
+from models.indices import IndiceVariables
+from utils.artefactos import AlmacenArtefactos
+
+SPECS = {"variables": {"dias": 2, "franjas": 1, "horarios": ["08:00–20:00"]}}
+CLAVES = [("R1", 0, 0), ("R1", 1, 0), ("R2", 0, 0), ("R2", 1, 0)]
+
+
+def test_excel_se_genera_al_descargar(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), max_por_proyecto=5, ttl=3600)
+    solve_id = almacen.guardar("p1", CLAVES, np.array([1.0, 0.0, 0.0, 1.0]), SPECS)
+    ruta = os.path.join(str(tmp_path), "p1", solve_id)
+    assert not os.path.exists(os.path.join(ruta, "resultados_turnos.xlsx")), "No debe escribirse Excel al optimizar."
+
+    assert almacen.ultimo("p1") == solve_id
+    xlsx = almacen.archivo("p1", solve_id)
+    assert xlsx == os.path.join(ruta, "resultados_turnos.xlsx") and os.path.getsize(xlsx) > 0
+    mtime = os.path.getmtime(xlsx)
+    assert almacen.archivo("p1", solve_id) == xlsx and os.path.getmtime(xlsx) == mtime, "La segunda descarga reutiliza el fichero."
+
+    assert almacen.archivo("p1", "0" * 32) is None
+    assert almacen.archivo("p1", "../p1") is None
+    assert almacen.archivo("p2", solve_id) is None, "Las ejecuciones de otro proyecto no se sirven."
+
+
+def test_retencion_por_proyecto(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), max_por_proyecto=2, ttl=3600)
+    ids = [almacen.guardar("p1", CLAVES, np.zeros(4), SPECS) for _ in range(3)]
+    otro = almacen.guardar("p2", CLAVES, np.zeros(4), SPECS)
+    assert almacen.localizar(ids[0]) is None
+    assert all(almacen.localizar(i) for i in ids[1:] + [otro])
+
+
+def test_descargar_una_ejecucion_antigua_no_la_hace_la_ultima(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), max_por_proyecto=2, ttl=3600)
+    antigua = almacen.guardar("p1", CLAVES, np.zeros(4), SPECS)
+    reciente = almacen.guardar("p1", CLAVES, np.ones(4), SPECS)
+    # mtimes separados aunque el sistema de ficheros tenga poca resolución
+    meta = os.path.join(str(tmp_path), "p1", antigua, "meta.json")
+    os.utime(meta, (os.path.getmtime(meta) - 10,) * 2)
+
+    almacen.archivo("p1", antigua, "csv")
+    assert almacen.ultimo("p1") == reciente, "Generar un fichero no cambia la antigüedad de la ejecución."
+    nueva = almacen.guardar("p1", CLAVES, np.ones(4), SPECS)
+    assert almacen.localizar(antigua) is None, "La más antigua se expulsa aunque se haya descargado."
+    assert almacen.localizar(reciente) and almacen.localizar(nueva)
+
+
+def test_indice_se_escribe_una_vez_por_specs(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), max_por_proyecto=5, ttl=3600)
+    ids = [almacen.guardar(p, CLAVES, np.array([1.0, 0.0, 0.0, float(i)]), SPECS)
+           for i, p in enumerate(["p1", "p1", "p2"])]
+    indices = list((tmp_path / "_indices").glob("*.json"))
+    assert len(indices) == 1, "Las ejecuciones con las mismas specs comparten índice."
+
+    with open(os.path.join(almacen.localizar(ids[1]), "meta.json"), encoding="utf-8") as f:
+        meta = f.read()
+    assert "R1" not in meta, "Las claves no deben escribirse en cada ejecución."
+    assert np.load(os.path.join(almacen.localizar(ids[1]), "posiciones.npy")).tolist() == [0, 3]
+
+    claves, valores, variables = almacen._leer(almacen.localizar(ids[1]))
+    assert list(claves) == CLAVES and valores.tolist() == [1.0, 0.0, 0.0, 1.0] and variables == SPECS
+
+
+def test_indice_compacto_se_serializa_igual_que_las_claves(tmp_path):
+    almacen = AlmacenArtefactos(str(tmp_path), max_por_proyecto=5, ttl=3600)
+    lista = almacen.guardar("p1", CLAVES, np.ones(4), SPECS)
+    (ruta,) = (tmp_path / "_indices").glob("*.json")
+    escrito = ruta.read_text(encoding="utf-8")
+    ruta.unlink()
+    compacto = almacen.guardar("p1", IndiceVariables(CLAVES), np.ones(4), SPECS)
+    assert ruta.read_text(encoding="utf-8") == escrito
+    assert list(almacen._leer(almacen.localizar(compacto))[0]) == list(almacen._leer(almacen.localizar(lista))[0])
@@ -0,0 +1,82 @@
+import gurobipy as gp
+import pytest
+
+from models.shift_optimizer import ShiftOptimizer
+from utils.constraint_patterns import reconocer
+from utils.constraint_translator import translate_constraint_to_code
+
+
+@pytest.mark.parametrize("nl, esperado", [
+    ("Al menos 2 retenes por turno.", "cobertura(model, x_retenes, minimo=2,"),
+    ("Entre 1 y tres retenes en cada franja", "cobertura(model, x_retenes, minimo=1, maximo=3,"),
+    ("Ningún retén puede trabajar más de 2 días seguidos", "ventana_maxima(model, x_retenes, 3, 2, dias_trabajados=True,"),
+    ("Cada retén puede trabajar como máximo un turno por día", "ventana_maxima(model, x_retenes, 1, 1,"),
+    ("Los retenes no pueden trabajar dos turnos consecutivos", "descanso_entre_turnos(model, x_retenes, 1,"),
+    ("Reparto equitativo de turnos entre los retenes", "banda_equidad(model, x_retenes, 1,"),
+    ("Al menos 1 turno de descanso entre turnos", "descanso_entre_turnos(model, x_retenes, 1,"),
+    ("Cada retén debe tener al menos una franja de descanso entre turnos", "descanso_entre_turnos(model, x_retenes, 1,"),
+])
+def test_formas_reconocidas(specs_retenes, nl, esperado):
+    assert reconocer(nl, specs_retenes).startswith(esperado)
+
+
+@pytest.mark.parametrize("nl", [
+    "Al menos 2 médicos por turno",                       # entidad que no existe
+    "Al menos 2 retenes por turno salvo los domingos",    # matiz adicional
+    "Cada retén puede trabajar más de 2 días seguidos",   # "más de" sin negación
+    "R1 no trabaja el lunes",
+    "Al menos 2 retenes por turno\nError: algo",          # reintento con el error
+])
+def test_lo_demas_va_al_llm(specs_retenes, nl):
+    assert reconocer(nl, specs_retenes) is None
+
+
+def test_traduccion_local_sin_llm(specs_retenes, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    codigo = translate_constraint_to_code("Al menos 2 retenes por turno", specs_retenes)
+
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    assert opt.validar_restriccion("Al menos 2 retenes por turno", codigo, candidatos=1)
+    opt.optimizar()
+    assert opt.model.status == gp.GRB.OPTIMAL
+    assert len(opt.nl_to_constr_names["Al menos 2 retenes por turno"]) == 8
+
+
+@pytest.fixture
+def specs_enfermeras():
+    """Familia con dos entidades en la clave: (enfermera, planta, día, franja)."""
+    return {
+        "variables": {
+            "dias": 3,
+            "franjas": 2,
+            "lista_enfermeras": ["E1", "E2", "E3"],
+            "lista_plantas": ["P1", "P2"],
+        },
+        "decision_variables": (
+            "self.x_enfermeras = { (e, p, d, f): model.addVar(vtype=GRB.BINARY, name=f\"x_{e}_{p}_{d}_{f}\")\n"
+            "    for e in variables['lista_enfermeras']\n"
+            "    for p in variables['lista_plantas']\n"
+            "    for d in range(variables['dias'])\n"
+            "    for f in range(variables['franjas']) }"
+        ),
+    }
+
+
+@pytest.mark.parametrize("nl, esperado", [
+    ("Cada enfermera no puede trabajar más de 2 días seguidos",
+     "ventana_maxima(model, x_enfermeras, 3, 2, dias_trabajados=True, por=(0,),"),
+    ("Ninguna persona puede trabajar dos turnos seguidos", "descanso_entre_turnos(model, x_enfermeras, 1, por=(0,),"),
+    ("Cada planta puede trabajar como máximo un turno por día", "ventana_maxima(model, x_enfermeras, 1, 1, por=(1,),"),
+    ("Al menos 2 enfermeras por turno", "cobertura(model, x_enfermeras, minimo=2,"),
+])
+def test_familia_con_varias_entidades(specs_enfermeras, nl, esperado):
+    assert reconocer(nl, specs_enfermeras).startswith(esperado)
+
+
+def test_genericas_agrupan_por_la_primera_entidad(specs_enfermeras):
+    nl = "Ninguna persona puede trabajar dos turnos seguidos"
+    opt = ShiftOptimizer(specs_enfermeras, persistente=True)
+    assert opt.validar_restriccion(nl, reconocer(nl, specs_enfermeras), candidatos=1)
+    # Una fila por enfermera y par de franjas consecutivas (3 × 5), no por (enfermera, planta).
+    assert len(opt.nl_to_constr_names[nl]) == 15
@@ -0,0 +1,80 @@
+import gurobipy as gp
+import pytest
+
+from models.decision_spec import construir_familias, desde_codigo
+from models.shift_optimizer import ShiftOptimizer
+from tests.restricciones_retenes import MINIMO
+
+
+def test_reconoce_el_patron_generado(specs_retenes):
+    estructura = desde_codigo(specs_retenes["decision_variables"].replace("self.", ""))
+    assert estructura == {
+        "x_retenes": {"indices": ["lista_retenes", "dias", "franjas"], "vtype": "BINARY", "plantilla": "x_{0}_{1}_{2}"}
+    }
+
+
+def test_conserva_los_nombres_del_codigo(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    assert opt._dv_estructura is not None
+    assert opt.decision_vars[("R2", 3, 1)].VarName == "x_R2_3_1"
+    assert desde_codigo("x_a = {(r, d): model.addVar(name=f'a{{{r}}}_{d}') for r in l for d in range(n)}") == {
+        "x_a": {"indices": ["l", "n"], "vtype": "C", "plantilla": "a{{{0}}}_{1}"}}
+
+
+@pytest.mark.parametrize("codigo", [
+    "x_a = {(r, d): model.addVar(vtype=GRB.BINARY) for r in lista for d in range(1, dias)}",
+    "x_a = {(r, d): model.addVar() for r in lista for d in range(dias) if d != r}",
+    "x_a = {(r, d): model.addVar(obj=1) for r in lista for d in range(dias)}",
+    "x_a = {(r,): model.addVar() for r in lista}",
+    "x_a = {(r, d): model.addVar() for r in lista for d in r}",
+    "x_a = {(r, d): model.addVar(name=f'x_{r:>3}_{d}') for r in lista for d in range(dias)}",
+    "x_a = {(r, d): model.addVar(name=nombre(r, d)) for r in lista for d in range(dias)}",
+    "aux = 3",
+])
+def test_lo_demas_se_ejecuta_como_codigo(codigo):
+    assert desde_codigo(codigo) is None
+
+
+def test_mismas_claves_y_orden_que_el_codigo(specs_retenes):
+    estructurado = ShiftOptimizer(specs_retenes, persistente=True)
+    assert estructurado._dv_estructura is not None
+
+    por_codigo = ShiftOptimizer(specs_retenes, persistente=True)
+    por_codigo._dv_estructura = None
+    por_codigo.reset_model()
+    assert list(estructurado.indice) == list(por_codigo.indice)
+    assert all(v.VType == gp.GRB.BINARY for v in estructurado._dv_lista)
+
+    # las restricciones generadas funcionan igual sobre las variables estructuradas
+    estructurado.restricciones_validadas["mínimo"] = {"code": MINIMO, "activa": True}
+    estructurado.optimizar()
+    assert estructurado.model.status == gp.GRB.OPTIMAL
+
+
+def test_especificacion_estructurada_directa(specs_retenes):
+    specs = {**specs_retenes, "decision_variables": {
+        "x_retenes": {"indices": ["lista_retenes", "dias", 2], "vtype": "B", "nombre": "x"},
+    }}
+    opt = ShiftOptimizer(specs, persistente=True)
+    assert len(opt.decision_vars) == 5 * 4 * 2
+    assert opt.decision_vars[("R1", 0, 1)].VarName == "x_R1_0_1"
+
+
+def test_conjunto_no_soportado_vuelve_al_codigo():
+    # iterar un dict recorre sus claves: la especificación no lo resuelve y se ejecuta el código
+    specs = {
+        "variables": {"turnos": {"M": "mañana", "T": "tarde"}, "dias": 3},
+        "resources": {},
+        "decision_variables": "self.x_t = {(t, d): model.addVar(vtype=GRB.BINARY) "
+                              "for t in variables['turnos'] for d in range(variables['dias'])}",
+    }
+    opt = ShiftOptimizer(specs, persistente=True)
+    assert opt._dv_estructura is not None
+    assert list(opt.indice) == [(t, d) for t in ("M", "T") for d in range(3)]
+    assert opt.model.NumVars == 6
+
+
+def test_indice_desconocido_falla():
+    with gp.Env(params={"OutputFlag": 0}) as env, gp.Model(env=env) as modelo:
+        with pytest.raises(KeyError):
+            construir_familias(modelo, {"x_a": {"indices": ["no_existe"]}}, {})
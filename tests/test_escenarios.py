@@ -0,0 +1,40 @@
+import os
+
+import gurobipy as gp
+
+import config
+from models.escenarios import aplicar_overrides, reparto_hilos, resolver_escenario
+from tests.restricciones_retenes import MAXIMO, MINIMO
+
+
+def test_overrides_fusionan_sin_tocar_el_original(specs_retenes):
+    nuevo = aplicar_overrides(specs_retenes, {"resources": {"retenes": 2}, "variables": {"dias": 1}})
+    assert nuevo["resources"]["retenes"] == 2 and nuevo["variables"]["dias"] == 1
+    assert nuevo["variables"]["lista_retenes"] == specs_retenes["variables"]["lista_retenes"]
+    assert specs_retenes["resources"]["retenes"] == 5
+
+
+def test_reparto_no_sobresuscribe(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(config, "JOB_WORKERS", 4)
+    for n in (1, 3, 64):
+        procesos, hilos = reparto_hilos(n)
+        assert 1 <= procesos <= n
+        # con JOB_WORKERS trabajos de escenarios a la vez se usan como mucho los 16 núcleos
+        assert procesos * hilos * config.JOB_WORKERS <= 16
+    assert reparto_hilos(64) == (4, 1) and reparto_hilos(1) == (1, 4)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    assert reparto_hilos(8) == (1, 1), "Siempre al menos un proceso con un hilo."
+
+
+def test_resolver_escenario(specs_retenes):
+    restricciones = {"mínimo": MINIMO, "máximo": MAXIMO}
+    fila = resolver_escenario(specs_retenes, restricciones, {"name": "solo mínimo", "active_constraints": ["mínimo"]},
+                              None, 1)
+    assert fila["status"] == gp.GRB.OPTIMAL and fila["relaxed_constraints"] == []
+
+    fila = resolver_escenario(specs_retenes, restricciones, {"name": "ambas"}, None, 1)
+    assert fila["relaxed_constraints"], "Mínimo 2 y máximo 1 a la vez es inviable: algo debe relajarse."
+
+    fila = resolver_escenario(specs_retenes, restricciones, {"active_constraints": ["otra"]}, None, 1)
+    assert fila["status"] is None and "otra" in fila["error"]
@@ -0,0 +1,82 @@
+import gurobipy as gp
+import pytest
+from gurobipy import GRB
+
+from models.helpers_restricciones import (banda_equidad, cobertura, descanso_entre_turnos, prohibir_patron,
+                                          ventana_maxima)
+from models.shift_optimizer import ShiftOptimizer
+
+RETENES = ["R1", "R2", "R3"]
+
+
+@pytest.fixture
+def modelo():
+    with gp.Env(params={"OutputFlag": 0}) as env, gp.Model(env=env) as m:
+        x = m.addVars(RETENES, range(4), range(2), vtype=GRB.BINARY)
+        yield m, x
+
+
+def _filas(m):
+    """{nombre: (conjunto de claves de variable, sentido, rhs)} de las filas del modelo."""
+    m.update()
+    nombres = {v: k for k, v in m._x.items()}
+    filas = {}
+    for c in m.getConstrs():
+        fila = m.getRow(c)
+        claves = frozenset(nombres.get(fila.getVar(i), fila.getVar(i).VarName) for i in range(fila.size()))
+        filas[c.ConstrName] = (claves, c.Sense, c.RHS)
+    return filas
+
+
+def test_cobertura_suma_todas_las_entidades(modelo):
+    m, x = modelo
+    m._x = x
+    assert cobertura(m, x, minimo=2, maximo={(0, 0): 1}) == 8 + 1
+    filas = _filas(m).values()
+    assert (frozenset((r, 1, 0) for r in RETENES), ">", 2.0) in filas
+    assert (frozenset((r, 0, 0) for r in RETENES), "<", 1.0) in filas
+
+
+def test_ventana_y_descanso(modelo):
+    m, x = modelo
+    m._x = x
+    assert ventana_maxima(m, x, 3, 2) == 3 * 2
+    assert descanso_entre_turnos(m, x) == 3 * 7
+    filas = list(_filas(m).values())
+    assert (frozenset(("R2", d, f) for d in (1, 2, 3) for f in (0, 1)), "<", 2.0) in filas
+    # la noche del día 0 y la mañana del día 1 son consecutivas
+    assert (frozenset({("R3", 0, 1), ("R3", 1, 0)}), "<", 1.0) in filas
+
+
+def test_patron_y_equidad(modelo):
+    m, x = modelo
+    m._x = x
+    assert prohibir_patron(m, x, [(0, 1), (1, 0)]) == 3 * 3
+    assert banda_equidad(m, x, margen=1) == 2 * 3 + 1
+    m.setObjective(x.sum(), GRB.MAXIMIZE)
+    cobertura(m, x, maximo=1, nombre="uno")
+    m.addConstr(x.sum("R1", "*", "*") == 0)
+    m.optimize()
+    totales = [sum(x[r, d, f].X for d in range(4) for f in range(2)) for r in RETENES]
+    assert max(totales) - min(totales) <= 1 + 1e-6
+    assert all(x[r, d, 1].X + x[r, d + 1, 0].X <= 1 + 1e-6 for r in RETENES for d in range(3))
+
+
+def test_disponibles_en_el_codigo_generado(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    opt.restricciones_validadas["mínimo 2"] = {"code": "cobertura(model, x_retenes, minimo=2)", "activa": True}
+    opt.optimizar()
+    assert opt.model.status == GRB.OPTIMAL
+    assert len(opt.nl_to_constr_names["mínimo 2"]) == 8
+
+
+def test_ventana_por_dias_trabajados(modelo):
+    m, x = modelo
+    # como mucho 2 días con algún turno en cualquier tramo de 3 días
+    assert ventana_maxima(m, x, 3, 2, dias_trabajados=True) == 3 * 4 + 3 * 2
+    m.setObjective(x.sum(), GRB.MAXIMIZE)
+    m.optimize()
+    for r in RETENES:
+        dias = [max(x[r, d, f].X for f in range(2)) > 0.5 for d in range(4)]
+        assert all(sum(dias[d:d + 3]) <= 2 for d in range(2))
+    assert m.ObjVal == pytest.approx(3 * 2 * 3)
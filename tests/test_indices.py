@@ -0,0 +1,63 @@
+import numpy as np
+
+from models.indices import IndiceVariables, NombresRestricciones
+from models.shift_optimizer import ShiftOptimizer
+from tests.restricciones_retenes import MINIMO
+
+
+def test_indice_reproduce_las_claves():
+    claves = [("R1", 0, 0), ("R1", 0, 1), ("R2", "B", 1, 0), "suelta", (3, 7)]
+    indice = IndiceVariables(claves)
+    assert list(indice) == claves
+    assert indice[2] == ("R2", "B", 1, 0)
+    assert indice.igual(IndiceVariables(claves))
+    assert not indice.igual(IndiceVariables(claves[:-1]))
+    assert indice[1:4] == claves[1:4]
+    assert indice.como_listas() == [["R1", 0, 0], ["R1", 0, 1], ["R2", "B", 1, 0], ["suelta"], [3, 7]]
+
+
+def test_decodificacion_por_columnas():
+    claves = [(f"R{r}", d, f) for r in range(300) for d in range(30) for f in range(3)]
+    indice = IndiceVariables(claves)
+    assert list(indice) == claves
+    assert indice.como_listas() == [list(k) for k in claves]
+    # recorrer decodifica por bloques, no clave a clave
+    decodificados = []
+    original = indice._decodificar
+    indice._BLOQUE = 10_000
+    indice._decodificar = lambda posiciones, **kw: decodificados.append(len(posiciones)) or original(posiciones, **kw)
+    assert list(indice) == claves
+    assert decodificados == [10_000, 10_000, 7_000]
+
+
+def test_consultas_vectorizadas_por_dimension():
+    claves = [(r, d, f) for r in ("R1", "R2", "R3") for d in range(4) for f in range(2)]
+    indice = IndiceVariables(claves)
+    esperado = [i for i, (r, d, f) in enumerate(claves) if r in ("R1", "R3") and d == 2]
+    assert indice.posiciones(entidad=["R1", "R3"], dia=2).tolist() == esperado
+    assert indice.posiciones(franja=1).size == 12
+    assert indice.posiciones(entidad="no existe").size == 0
+    assert list(indice.valores_dia(np.array([0, 9]))) == [0, 0]
+    assert indice.textos_entidades(np.array([0, 8])) == ["R1", "R2"]
+
+
+def test_nombres_y_vista_inversa():
+    nombres = NombresRestricciones()
+    inverso = nombres.inverso
+    nombres["mínimo"] = ["min_0", "min_1"]
+    assert inverso["min_1"] == "mínimo"
+    nombres["mínimo"] = ["min_2"]
+    assert "min_1" not in inverso and inverso["min_2"] == "mínimo"
+    nombres.pop("mínimo")
+    assert dict(inverso) == {}
+
+
+def test_optimizador_usa_el_indice(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    assert opt.decision_vars is opt.exec_context["x_retenes"], "Con una familia no se copia."
+    assert len(opt.indice) == 5 * 4 * 2
+    opt.restricciones_validadas["mínimo"] = {"code": MINIMO, "activa": True}
+    opt.optimizar()
+    assert opt.name_to_nl["min_0_0"] == "mínimo"
+    activas = opt.indice.posiciones(dia=0, franja=0)
+    assert opt.solucion[activas].sum() >= 2
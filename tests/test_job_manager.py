@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+from utils.job_manager import JobManager, EN_COLA, EJECUTANDO, TERMINADO, FALLIDO, CANCELADO
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def jobs():
+    manager = JobManager(mongomock.MongoClient().db.jobs, max_workers=1)
+    yield manager
+    manager._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _esperar(jobs, job_id, estado, limite=5.0):
+    fin = time.time() + limite
+    while time.time() < fin:
+        if jobs.status(job_id)["estado"] == estado:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"El trabajo no llegó a '{estado}': {jobs.status(job_id)}")
+
+
+def test_trabajo_termina_con_resultado(jobs):
+    job_id = jobs.submit("optimizacion", lambda trabajo, n: {"n": n, "('R1', 0)": 1.0}, 3, project_id="p1")
+    _esperar(jobs, job_id, TERMINADO)
+    estado, resultado = jobs.result(job_id)
+    assert estado == TERMINADO
+    assert resultado == {"n": 3, "('R1', 0)": 1.0}
+    assert jobs.status(job_id)["project_id"] == "p1"
+
+
+def test_estados_en_cola_y_ejecutando(jobs):
+    empezado, liberar = threading.Event(), threading.Event()
+
+    def bloqueante(trabajo):
+        empezado.set()
+        liberar.wait(5)
+        return "ok"
+
+    primero = jobs.submit("optimizacion", bloqueante)
+    segundo = jobs.submit("optimizacion", lambda trabajo: "después")
+    assert empezado.wait(5)
+    assert jobs.status(primero)["estado"] == EJECUTANDO
+    assert jobs.status(segundo)["estado"] == EN_COLA
+    assert jobs.result(segundo) == (EN_COLA, None)
+
+    liberar.set()
+    _esperar(jobs, segundo, TERMINADO)
+    assert jobs.result(primero) == (TERMINADO, "ok")
+
+
+def test_cancelar_en_cola(jobs):
+    liberar = threading.Event()
+    primero = jobs.submit("optimizacion", lambda trabajo: liberar.wait(5))
+    llamado = []
+    segundo = jobs.submit("optimizacion", lambda trabajo: llamado.append(True))
+    canal = jobs.canal(segundo)
+
+    assert jobs.cancel(segundo)
+    assert jobs.status(segundo)["estado"] == CANCELADO
+    assert canal.cerrado, "Quien escucha el canal no debe quedarse esperando."
+    liberar.set()
+    _esperar(jobs, primero, TERMINADO)
+    assert not llamado, "Un trabajo cancelado en cola no debe ejecutarse."
+    estado, resultado = jobs.result(segundo)
+    assert estado == CANCELADO and resultado["error"], "Quien consulta el resultado no debe esperar para siempre."
+    assert not jobs.cancel(segundo), "Ya no se puede cancelar dos veces."
+
+
+def test_cancelar_en_ejecucion(jobs):
+    empezado = threading.Event()
+    terminados = []
+
+    def largo(trabajo):
+        trabajo.al_cancelar(lambda: terminados.append("terminate"))
+        empezado.set()
+        trabajo.cancelado.wait(5)
+        return "parcial"
+
+    job_id = jobs.submit("optimizacion", largo)
+    assert empezado.wait(5)
+    assert jobs.cancel(job_id)
+    _esperar(jobs, job_id, CANCELADO)
+    assert terminados == ["terminate"], "Se deben llamar los callbacks de cancelación."
+    assert jobs.result(job_id) == (CANCELADO, "parcial")
+
+
+def test_trabajo_fallido(jobs):
+    seguir = threading.Event()
+
+    def falla(trabajo):
+        seguir.wait(5)
+        raise RuntimeError("sin licencia")
+
+    job_id = jobs.submit("optimizacion", falla)
+    canal = jobs.canal(job_id)
+    seguir.set()
+    _esperar(jobs, job_id, FALLIDO)
+    assert jobs.result(job_id) == (FALLIDO, {"error": "sin licencia"})
+    eventos = list(canal.escuchar(latido=0.1))
+    assert eventos[-1] == {"fin": True, "estado": FALLIDO}
+    assert jobs.result("no-existe") == (None, None)
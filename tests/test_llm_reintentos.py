@@ -0,0 +1,107 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from openai import RateLimitError, InternalServerError
+import config
+from utils import constraint_translator
+from utils.constraint_translator import _completar, _espera_sugerida
+
+try:
+    import httpx
+except ImportError:  # algunas versiones del cliente usan su propio fork
+    import httpx2 as httpx
+
+
+def _error(clase=RateLimitError, status=429, **headers):
+    respuesta = httpx.Response(status, headers=headers,
+                               request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return clase("rate limit", response=respuesta, body=None)
+
+
+class ClienteFalso:
+    """Cliente con la forma de OpenAI que lanza `errores` en orden y luego responde."""
+
+    def __init__(self, errores):
+        self.errores = list(errores)
+        self.llamadas = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.llamadas += 1
+        if self.errores:
+            raise self.errores.pop(0)
+        mensaje = SimpleNamespace(content=" pass ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=mensaje)])
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    registro = []
+    monkeypatch.setattr(constraint_translator.time, "sleep", registro.append)
+    return registro
+
+
+def _con_cliente(monkeypatch, cliente):
+    monkeypatch.setattr(constraint_translator, "get_openai_client", lambda: cliente)
+    return cliente
+
+
+def test_espera_sugerida_lee_las_cabeceras():
+    assert _espera_sugerida(_error(**{"retry-after-ms": "250"})) == pytest.approx(0.25)
+    assert _espera_sugerida(_error(**{"retry-after": "3"})) == 3
+    fecha = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=20), usegmt=True)
+    assert 15 <= _espera_sugerida(_error(**{"retry-after": fecha})) <= 20
+    assert _espera_sugerida(_error(**{"x-ratelimit-reset-requests": "1m30s"})) == 90
+    assert _espera_sugerida(_error(**{"x-ratelimit-reset-tokens": "250ms"})) == pytest.approx(0.25)
+    assert _espera_sugerida(_error()) is None
+    assert _espera_sugerida(RuntimeError("sin respuesta")) is None
+
+
+def test_reintenta_respetando_retry_after(monkeypatch, esperas):
+    cliente = _con_cliente(monkeypatch, ClienteFalso([_error(**{"retry-after": "2"}),
+                                                      _error(InternalServerError, 503, **{"retry-after": "1"})]))
+    assert _completar("prompt") == "pass"
+    assert cliente.llamadas == 3
+    assert esperas == [2, 1]
+
+
+def test_espera_acotada_por_backoff_max(monkeypatch, esperas):
+    _con_cliente(monkeypatch, ClienteFalso([_error(**{"retry-after": "999"})]))
+    assert _completar("prompt") == "pass"
+    assert esperas == [config.LLM_BACKOFF_MAX]
+
+
+def test_backoff_exponencial_sin_cabeceras(monkeypatch, esperas):
+    # con jitter completo la espera está en [0, base·2^intento]: se fija al máximo
+    monkeypatch.setattr(constraint_translator.random, "uniform", lambda a, b: b)
+    _con_cliente(monkeypatch, ClienteFalso([_error() for _ in range(3)]))
+    assert _completar("prompt") == "pass"
+    assert esperas == [min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** i) for i in range(3)]
+
+
+def test_tope_de_reintentos(monkeypatch, esperas):
+    cliente = _con_cliente(monkeypatch, ClienteFalso([_error() for _ in range(config.LLM_MAX_RETRIES + 5)]))
+    with pytest.raises(RateLimitError):
+        _completar("prompt")
+    assert cliente.llamadas == config.LLM_MAX_RETRIES + 1
+    assert len(esperas) == config.LLM_MAX_RETRIES
+
+
+def test_no_reintenta_si_se_abandona(monkeypatch):
+    import threading
+    from utils.constraint_translator import TraduccionAbandonada
+    parar = threading.Event()
+    esperas = []
+
+    def esperar(segundos):
+        esperas.append(segundos)
+        parar.set()  # otro candidato gana mientras este espera
+        return True
+
+    monkeypatch.setattr(parar, "wait", esperar)
+    cliente = _con_cliente(monkeypatch, ClienteFalso([_error(**{"retry-after": "2"}) for _ in range(3)]))
+    with pytest.raises(TraduccionAbandonada):
+        _completar("prompt", parar=parar)
+    assert cliente.llamadas == 1 and esperas == [2], "Tras abandonar no se vuelve a llamar al LLM."
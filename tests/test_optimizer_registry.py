@@ -0,0 +1,163 @@
+import threading
+import pytest
+from models.optimizer_registry import OptimizerRegistry, optimizador_desde_proyecto
+
+
+@pytest.fixture
+def proyecto():
+    """Documento de proyecto tal y como se guarda en MongoDB."""
+    return {
+        "id": "p1",
+        "variables": {
+            "variables": {"dias": 2, "franjas": 2, "horarios": ["diurno", "nocturno"],
+                          "lista_retenes": ["R1", "R2", "R3"]},
+            "resources": {"retenes": 3},
+            "decision_variables": (
+                "self.x_retenes = { (r, d, f): model.addVar(vtype=GRB.BINARY, name=f\"x_{r}_{d}_{f}\")\n"
+                "    for r in variables['lista_retenes']\n"
+                "    for d in range(variables['dias'])\n"
+                "    for f in range(variables['franjas']) }"
+            ),
+        },
+        "validatedConstraints": [{
+            "texto": "al menos uno por turno",
+            "code": ("for d in range(dias):\n    for f in range(franjas):\n"
+                     "        model.addConstr(quicksum(x_retenes[(r, d, f)] for r in lista_retenes) >= 1)\n"),
+            "activa": True,
+        }],
+    }
+
+
+def test_rehidrata_desde_el_cargador(proyecto):
+    llamadas = []
+
+    def cargador(pid):
+        llamadas.append(pid)
+        return optimizador_desde_proyecto(proyecto) if pid == "p1" else None
+
+    registry = OptimizerRegistry(cargador, max_proyectos=4, presupuesto_mb=100)
+    optimizer = registry.get("p1")
+    assert optimizer is not None and optimizer.model.NumConstrs == 4
+    assert registry.get("p1") is optimizer, "La segunda vez debía servirse desde memoria."
+    assert llamadas == ["p1"]
+    assert registry.get("otro") is None
+
+
+def test_expulsa_lru_sin_tocar_los_bloqueados(proyecto):
+    registry = OptimizerRegistry(None, max_proyectos=2, presupuesto_mb=100)
+    for pid in ("a", "b"):
+        registry.put(pid, optimizador_desde_proyecto(proyecto))
+
+    bloqueado = threading.Event()
+    liberar = threading.Event()
+
+    def usar_a():
+        with registry.bloqueo("a"):
+            bloqueado.set()
+            liberar.wait()
+
+    hilo = threading.Thread(target=usar_a)
+    hilo.start()
+    bloqueado.wait()
+    registry.put("c", optimizador_desde_proyecto(proyecto))
+    liberar.set()
+    hilo.join()
+
+    assert registry.get("a", rehidratar=False) is not None, "'a' estaba en uso y no debía expulsarse."
+    assert registry.get("b", rehidratar=False) is None
+    assert registry.get("c", rehidratar=False) is not None
+
+
+def test_renombrar_borrador(proyecto):
+    registry = OptimizerRegistry(None)
+    optimizer = optimizador_desde_proyecto(proyecto)
+    registry.put("borrador-1", optimizer)
+    registry.renombrar("borrador-1", "p1")
+    assert registry.get("p1", rehidratar=False) is optimizer
+    assert registry.get("borrador-1", rehidratar=False) is None
+
+
+def test_no_expulsa_el_proyecto_del_hilo_que_hace_put(proyecto):
+    registry = OptimizerRegistry(None, max_proyectos=2, presupuesto_mb=100)
+    for pid in ("a", "b"):
+        registry.put(pid, optimizador_desde_proyecto(proyecto))
+    bloqueo_a = registry.bloqueo("a")
+    with bloqueo_a:
+        # el mismo hilo tiene el cerrojo de 'a' (reentrante) y añade otro proyecto
+        registry.put("c", optimizador_desde_proyecto(proyecto))
+        assert registry.get("a", rehidratar=False) is not None, "'a' está en uso por este hilo."
+        assert registry.get("b", rehidratar=False) is None
+    assert bloqueo_a.en_uso == 0
+    assert registry.bloqueo("a") is bloqueo_a, "El cerrojo no debe sustituirse."
+
+
+def test_quien_espera_el_cerrojo_cuenta_como_en_uso(proyecto):
+    registry = OptimizerRegistry(None, max_proyectos=1, presupuesto_mb=100)
+    registry.put("a", optimizador_desde_proyecto(proyecto))
+    bloqueo_a = registry.bloqueo("a")
+    liberar = threading.Event()
+
+    def usar():
+        with bloqueo_a:
+            liberar.wait(5)
+
+    hilos = [threading.Thread(target=usar) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    while bloqueo_a.en_uso < 2:  # uno lo tiene y el otro espera
+        hilos[0].join(0.01)
+    registry.put("b", optimizador_desde_proyecto(proyecto))
+    assert registry.get("a", rehidratar=False) is not None
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert bloqueo_a.en_uso == 0
+    registry.put("c", optimizador_desde_proyecto(proyecto))
+    assert registry.get("a", rehidratar=False) is None, "Libre: ya se puede expulsar."
+    assert registry.bloqueo("a") is bloqueo_a, "Expulsar el optimizador no borra su cerrojo."
+
+
+def test_bloqueado_obtiene_el_optimizador_con_el_cerrojo(proyecto):
+    registry = OptimizerRegistry(None)
+    viejo, nuevo = optimizador_desde_proyecto(proyecto), optimizador_desde_proyecto(proyecto)
+    registry.put("a", viejo)
+    obtenidos = []
+
+    def editar():
+        with registry.bloqueado("a") as optimizer:
+            obtenidos.append(optimizer)
+
+    with registry.bloqueo("a"):
+        hilo = threading.Thread(target=editar)
+        hilo.start()
+        while registry.bloqueo("a").en_uso < 2:  # el otro hilo ya espera el cerrojo
+            hilo.join(0.01)
+        # mientras espera, el proyecto se recarga con otro optimizador
+        registry.put("a", nuevo)
+    hilo.join(5)
+
+    assert obtenidos == [nuevo], "Se debe modificar el optimizador vigente, no el de antes de esperar."
+
+
+def test_instantanea_no_se_reescribe_si_no_cambia_la_clave(proyecto, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import mongomock.gridfs
+    from models.optimizer_registry import guardar_instantanea_de
+    mongomock.gridfs.enable_gridfs_integration()
+    db = mongomock.MongoClient().db
+    optimizer = optimizador_desde_proyecto(proyecto, db)
+    assert db.instantaneas.files.count_documents({}) == 1
+
+    serializadas = []
+    original = optimizer.instantanea
+    monkeypatch.setattr(optimizer, "instantanea", lambda: serializadas.append(1) or original())
+    optimizer.restricciones_validadas["al menos uno por turno"]["activa"] = False
+    optimizer._sincronizar_restricciones()
+    guardar_instantanea_de(db, "p1", optimizer)
+    assert serializadas == [], "Misma clave: ni se serializa ni se escribe."
+
+    optimizer.restricciones_validadas["al menos uno por turno"]["code"] += "\n"
+    guardar_instantanea_de(db, "p1", optimizer)
+    assert serializadas == [1]
+    assert db.instantaneas.files.find_one()["metadata"]["clave"] == optimizer.clave_instantanea()
@@ -0,0 +1,103 @@
+import threading
+
+import config
+from gurobipy import GRB
+from models.shift_optimizer import ShiftOptimizer
+from utils.progress import CanalProgreso, evento_mip
+
+
+class ModeloFalso:
+    """Lo justo de un modelo Gurobi dentro de un callback: cbGet y terminate."""
+
+    def __init__(self, incumbente, cota, nodos=0.0):
+        self.valores = {}
+        self.terminado = False
+        self.fijar(incumbente, cota, nodos)
+
+    def fijar(self, incumbente, cota, nodos=0.0):
+        self.valores = {
+            GRB.Callback.MIP_OBJBST: incumbente, GRB.Callback.MIP_OBJBND: cota, GRB.Callback.MIP_NODCNT: nodos,
+            GRB.Callback.MIPSOL_OBJBST: incumbente, GRB.Callback.MIPSOL_OBJBND: cota,
+            GRB.Callback.MIPSOL_NODCNT: nodos,
+        }
+
+    def cbGet(self, que):
+        return self.valores[que]
+
+    def terminate(self):
+        self.terminado = True
+
+
+def _callback(canal):
+    # el callback no usa el estado del optimizador
+    return ShiftOptimizer._callback_progreso(None, canal)
+
+
+def test_evento_mip_calcula_gap():
+    evento = evento_mip(ModeloFalso(100.0, 90.0, 7), GRB.Callback.MIP, 0.0)
+    assert evento["incumbente"] == 100.0 and evento["cota"] == 90.0 and evento["nodos"] == 7
+    assert abs(evento["gap"] - 0.1) < 1e-12
+    sin_incumbente = evento_mip(ModeloFalso(GRB.INFINITY, 90.0), GRB.Callback.MIP, 0.0)
+    assert sin_incumbente["incumbente"] is None and sin_incumbente["gap"] is None
+    assert evento_mip(ModeloFalso(1.0, 1.0), GRB.Callback.PRESOLVE, 0.0) is None
+
+
+def test_publica_eventos_con_limite_de_frecuencia(monkeypatch):
+    monkeypatch.setattr(config, "PROGRESS_INTERVAL", 60)
+    canal = CanalProgreso()
+    publicados = []
+    canal.publicar = publicados.append
+    modelo = ModeloFalso(100.0, 50.0)
+    callback = _callback(canal)
+    callback(modelo, GRB.Callback.MIP)
+    callback(modelo, GRB.Callback.MIP)  # dentro del intervalo: no se publica
+    modelo.fijar(80.0, 50.0)
+    callback(modelo, GRB.Callback.MIPSOL)  # nueva incumbente: siempre se publica
+    callback(modelo, GRB.Callback.PRESOLVE)
+    assert [e["incumbente"] for e in publicados] == [100.0, 80.0]
+    assert not modelo.terminado
+
+
+def test_parada_al_alcanzar_el_gap():
+    canal = CanalProgreso()
+    canal.detener(gap=0.1)
+    modelo = ModeloFalso(100.0, 50.0)
+    callback = _callback(canal)
+    callback(modelo, GRB.Callback.MIP)
+    assert not modelo.terminado, "Con gap 0.5 aún no debía parar."
+    modelo.fijar(100.0, 95.0)
+    callback(modelo, GRB.Callback.MIP)
+    assert modelo.terminado
+
+
+def test_parada_inmediata():
+    canal = CanalProgreso()
+    modelo = ModeloFalso(GRB.INFINITY, 50.0)
+    callback = _callback(canal)
+    callback(modelo, GRB.Callback.MIP)
+    assert not modelo.terminado
+    canal.detener()
+    callback(modelo, GRB.Callback.MIP)
+    assert modelo.terminado, "detener() sin gap para aunque no haya incumbente."
+
+
+def test_escuchar_recibe_eventos_de_otro_hilo():
+    canal = CanalProgreso()
+    canal.publicar({"n": 0})
+    recibidos, escuchando = [], threading.Event()
+
+    def escuchar():
+        for evento in canal.escuchar(latido=0.05):
+            recibidos.append(evento)
+            escuchando.set()
+
+    oyente = threading.Thread(target=escuchar)
+    oyente.start()
+    assert escuchando.wait(5)
+    for n in range(1, 4):
+        canal.publicar({"n": n})
+    canal.cerrar()
+    oyente.join(5)
+    assert not oyente.is_alive()
+    eventos = [e["n"] for e in recibidos if e is not None]
+    assert eventos == [0, 1, 2, 3], "Se empieza por el último evento ya emitido y no se pierde ninguno."
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from utils import constraint_translator, prompt_builder
+from utils.cache import CacheLRU
+from utils.constraint_translator import huella_specs, translate_constraint_to_code
+from utils.prompt_builder import construir_prompt, estimar_tokens, mencionados, resumen_specs
+
+
+@pytest.fixture
+def specs():
+    return {
+        "variables": {"dias": 7, "franjas": 3, "horarios": ["mañana", "tarde", "noche"],
+                      "lista_enfermeras": [f"Enfermera {i}" for i in range(40)],
+                      "lista_plantas": ["A", "B"]},
+        "resources": {"enfermeras": 40},
+        "decision_variables": (
+            "self.x_enfermeras = {(e, p, d, f): model.addVar(vtype=GRB.BINARY, name=f'x_{e}_{p}_{d}_{f}')\n"
+            "    for e in variables['lista_enfermeras'] for p in variables['lista_plantas']\n"
+            "    for d in range(variables['dias']) for f in range(variables['franjas'])}"
+        ),
+    }
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "resumen_cache", CacheLRU("prueba", max_entradas=10, ttl=60))
+
+
+def test_resumen_compacto_con_orden_de_indices(specs):
+    resumen = resumen_specs(specs, huella_specs(specs))
+    assert "lista_enfermeras: lista de 40" in resumen
+    assert "Enfermera 39" not in resumen, "No debe enviarse la lista completa."
+    assert "x_enfermeras[(e, p, d, f)]" in resumen and "d ∈ range(dias)" in resumen
+    assert estimar_tokens(resumen) < estimar_tokens(json.dumps(specs, indent=2)) / 2
+
+
+def test_presupuesto_reduce_el_detalle(specs):
+    huella = huella_specs(specs)
+    completo = resumen_specs(specs, huella)
+    ajustado = resumen_specs(specs, huella, presupuesto=estimar_tokens(completo) - 1)
+    assert len(ajustado) < len(completo)
+    assert "x_enfermeras[(e, p, d, f)]" in ajustado, "El orden de índices se envía siempre."
+    # sin sitio para nada se envía el nivel mínimo
+    assert resumen_specs(specs, huella, presupuesto=0) == prompt_builder.niveles_resumen(specs, huella)[-1]
+
+
+def test_codigo_no_reconocido_se_incluye_si_cabe(specs):
+    specs["decision_variables"] = "self.x_raro = {k: model.addVar() for k in claves_especiales()}"
+    huella = huella_specs(specs)
+    assert "claves_especiales()" in resumen_specs(specs, huella)
+    assert "x_raro[k]" in resumen_specs(specs, huella, presupuesto=1)
+
+
+def test_resumen_cacheado_por_huella(specs):
+    huella = huella_specs(specs)
+    resumen_specs(specs, huella)
+    resumen_specs(specs, huella, presupuesto=50)
+    assert prompt_builder.resumen_cache.stats()["aciertos_memoria"] == 1
+    prompt = construir_prompt("cabecera\n", "cola", specs, huella, presupuesto=10_000)
+    assert prompt.startswith("cabecera\nVariables") and prompt.endswith("\ncola")
+
+
+def test_prompt_de_traduccion_usa_el_resumen(specs, monkeypatch):
+    monkeypatch.setattr(constraint_translator, "translation_cache", CacheLRU("prueba", max_entradas=10, ttl=60))
+    prompts = []
+
+    def _completar(prompt, timeout=None, parar=None):
+        prompts.append(prompt)
+        return "pass"
+    monkeypatch.setattr(constraint_translator, "_completar", _completar)
+
+    assert translate_constraint_to_code("las plantas A y B nunca quedan vacías de noche", specs) == "pass"
+    assert "lista_enfermeras: lista de 40" in prompts[0]
+    assert "Enfermera 39" not in prompts[0]
+
+
+def test_elementos_mencionados_van_siempre(specs):
+    frase = "La enfermera 17 no trabaja el lunes y Enfermera 3 tampoco en la planta B"
+    assert mencionados(specs, frase) == (
+        "Mencionados en la restricción (valores exactos):\n"
+        '- lista_enfermeras ⊇ ["Enfermera 3", "Enfermera 17"]\n'
+        '- lista_plantas ⊇ ["B"]'
+    )
+    assert "Enfermera 1\"" not in mencionados(specs, "Enfermera 12 libra"), "Solo palabras completas."
+    assert mencionados(specs, "nadie concreto") == ""
+
+    huella = huella_specs(specs)
+    prompt = construir_prompt("cabecera\n", "cola", specs, huella, presupuesto=0, frase=frase)
+    assert '"Enfermera 17"' in prompt and prompt.endswith("\ncola")
+    assert "Enfermera 17" not in construir_prompt("cabecera\n", "cola", specs, huella, presupuesto=0)
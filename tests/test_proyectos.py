@@ -0,0 +1,96 @@
+import pytest
+
+from data.proyectos import (eliminar_restriccion, guardar_activas, guardar_manual, guardar_restriccion, listar_resumen,
+                            obtener_detalle)
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def coleccion():
+    col = mongomock.MongoClient().db.projects
+    col.insert_many([
+        {"id": f"p{i}", "name": f"Proyecto {i}", "variables": {"dias": 7}, "gurobiState": {"vars": []}}
+        for i in range(120)
+    ])
+    return col
+
+
+def test_paginacion_por_cursor(coleccion):
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        proyectos, cursor = listar_resumen(coleccion, cursor, limite=50)
+        vistos += proyectos
+        paginas += 1
+        if cursor is None:
+            break
+    assert paginas == 3
+    assert [p["id"] for p in vistos] == [f"p{i}" for i in reversed(range(120))], "Del más reciente al más antiguo."
+    assert set(vistos[0]) == {"id", "name", "createdAt"}, "El resumen no debe traer specs ni estado."
+    indices = coleccion.index_information()
+    assert "id_unico" in indices and "modificado" not in indices, "Solo se indexa lo que se consulta."
+
+    with pytest.raises(ValueError):
+        listar_resumen(coleccion, "no-es-un-cursor")
+
+
+def test_detalle_con_campos(coleccion):
+    assert obtener_detalle(coleccion, "p3", ["variables"]) == {"id": "p3", "variables": {"dias": 7}}
+    assert obtener_detalle(coleccion, "p3")["gurobiState"] == {"vars": []}
+    assert obtener_detalle(coleccion, "nada") is None
+    with pytest.raises(ValueError):
+        obtener_detalle(coleccion, "p3", ["$where"])
+
+
+def test_restricciones_por_deltas_con_version(coleccion):
+    assert guardar_restriccion(coleccion, "p1", "a", "code a", True) == 1
+    assert guardar_restriccion(coleccion, "p1", "b", "code b", True, version=0) == 1
+    assert guardar_restriccion(coleccion, "p1", "b", "otra", True, version=0) is None, "Ya existía."
+    assert guardar_restriccion(coleccion, "p1", "a", "code a2", False, version=1) == 2
+    assert guardar_restriccion(coleccion, "p1", "a", "code a3", True, version=1) is None, "Versión obsoleta."
+    guardar_manual(coleccion, "p1", "a")
+    guardar_manual(coleccion, "p1", "a")
+
+    doc = coleccion.find_one({"id": "p1"})
+    assert doc["validatedConstraints"] == [
+        {"texto": "a", "code": "code a2", "activa": False, "version": 2},
+        {"texto": "b", "code": "code b", "activa": True, "version": 1},
+    ]
+    assert doc["manualConstraints"] == [{"texto": "a", "activa": True}]
+
+    assert not eliminar_restriccion(coleccion, "p1", "a", version=1)
+    assert eliminar_restriccion(coleccion, "p1", "a")
+    doc = coleccion.find_one({"id": "p1"})
+    assert [e["texto"] for e in doc["validatedConstraints"]] == ["b"] and doc["manualConstraints"] == []
+    assert guardar_restriccion(coleccion, "no-existe", "a", "code", True) is None
+
+
+class _ConBulkWrite:
+    """mongomock no acepta los UpdateOne de pymongo recientes: se aplican uno a uno."""
+
+    def __init__(self, coleccion):
+        self.coleccion = coleccion
+        self.operaciones = []
+
+    def bulk_write(self, operaciones, ordered=True):
+        self.operaciones.append(len(operaciones))
+        for op in operaciones:
+            self.coleccion.update_one(op._filter, op._doc)
+
+
+def test_guardar_activas_no_cambia_la_version(coleccion):
+    assert guardar_restriccion(coleccion, "p1", "a", "code a", True) == 1
+    assert guardar_restriccion(coleccion, "p1", "b", "code b", True) == 1
+    antes = coleccion.find_one({"id": "p1"})["updatedAt"]
+
+    bulk = _ConBulkWrite(coleccion)
+    guardar_activas(bulk, "p1", {"a": False, "b": True, "no-existe": True})
+    doc = coleccion.find_one({"id": "p1"})
+    assert [(e["texto"], e["activa"], e["version"]) for e in doc["validatedConstraints"]] == [
+        ("a", False, 1), ("b", True, 1)]
+    assert doc["updatedAt"] >= antes
+    guardar_activas(bulk, "p1", {})
+    assert bulk.operaciones == [3], "Una sola ida y vuelta, y ninguna si no hay cambios."
+
+    # la versión que conoce el optimizador vivo sigue valiendo tras alternar
+    assert guardar_restriccion(coleccion, "p1", "a", "code a2", False, version=1) == 2
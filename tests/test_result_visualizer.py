@@ -0,0 +1,37 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from utils.result_visualizer import DESCANSO, _cuadricula, exportar_resultados, tabla_asignaciones
+
+
+def _datos():
+    medicos = ["M1", "M2", "M3"]
+    decision_vars = {(m, d, f): None for m in medicos for d in range(2) for f in range(2)}
+    activos = {("M1", 0, 0), ("M2", 0, 0), ("M3", 1, 1)}
+    valores = np.array([1.0 if k in activos else 0.0 for k in decision_vars])
+    specs = {"variables": {"dias": 2, "franjas": 2, "horarios": ["Mañana", "Noche"],
+                           "nombres_dias": ["Lunes", "Martes"]}}
+    return decision_vars, valores, specs
+
+
+def test_cuadricula_agrupa_por_celda():
+    decision_vars, valores, specs = _datos()
+    df = tabla_asignaciones(decision_vars, valores, specs["variables"])
+    grid = _cuadricula(df["franja_idx"], df["dia_idx"], df["Elementos"], 2, 2)
+    assert grid.tolist() == [["M1 / M2", DESCANSO], [DESCANSO, "M3"]]
+
+
+def test_exportar_xlsx_y_csv(tmp_path):
+    decision_vars, valores, specs = _datos()
+
+    xlsx = exportar_resultados(None, decision_vars, specs, str(tmp_path / "r.xlsx"), valores=valores)
+    hojas = [n for n in zipfile.ZipFile(xlsx).namelist() if n.startswith("xl/worksheets/sheet")]
+    assert len(hojas) == 4, "Resumen, Por elemento y una hoja por día."
+
+    csv = exportar_resultados(None, decision_vars, specs, str(tmp_path / "r.csv"), valores=valores, formato="csv")
+    df = pd.read_csv(csv)
+    assert df[["Día", "Turno", "Elementos"]].values.tolist() == [
+        ["Lunes", "Mañana", "M1"], ["Lunes", "Mañana", "M2"], ["Martes", "Noche", "M3"],
+    ]
@@ -0,0 +1,179 @@
+import pytest
+import gurobipy as gp
+from models.shift_optimizer import ShiftOptimizer
+from tests.restricciones_retenes import MAXIMO, MINIMO
+
+
+def _validar(opt, nl, code):
+    opt.restricciones_validadas[nl] = {"code": code, "activa": True}
+    assert opt.agregar_restriccion(nl), f"No se pudo agregar '{nl}'."
+
+
+def test_toggle_sin_reconstruir(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    _validar(opt, "máximo 1 por turno", MAXIMO)
+    modelo = opt.model
+
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = False
+    opt.optimizar()
+    assert opt.model is modelo, "El modelo persistente no debía reconstruirse."
+    assert opt.model.status == gp.GRB.OPTIMAL
+    assert opt.model.NumConstrs == 16, "Las filas desactivadas deben seguir en el modelo."
+
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = True
+    opt.restricciones_validadas["mínimo 2 por turno"]["activa"] = False
+    opt.optimizar()
+    assert opt.model is modelo
+    assert opt.model.status == gp.GRB.OPTIMAL
+
+
+def test_eliminar_restriccion_quita_filas(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    assert opt.model.NumConstrs == 8
+    assert opt.eliminar_restriccion("mínimo 2 por turno")
+    assert opt.model.NumConstrs == 0
+    assert "min_0_0" not in opt.name_to_nl
+
+
+def test_relajacion_reconstruye_en_siguiente_solve(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    _validar(opt, "máximo 1 por turno", MAXIMO)
+    modelo = opt.model
+    info = opt.optimizar()
+    assert info and info["relaxed_constraints"], "Se esperaban restricciones relajadas."
+
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = False
+    opt.optimizar()
+    assert opt.model is not modelo, "Tras feasRelaxS el modelo debía reconstruirse."
+    assert opt.model.status == gp.GRB.OPTIMAL
+    assert opt.model.NumConstrs == 8, "Tras reconstruir sólo se inyectan las activas."
+
+
+def test_relajacion_mapea_holguras_por_fila_sin_nombres(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO.replace(", name=f'min_{d}_{f}'", ""))
+    _validar(opt, "máximo 1 por turno", MAXIMO.replace(", name=f'max_{d}_{f}'", ""))
+    info = opt.optimizar()
+    assert info["relaxed_constraints"]
+    assert set(info["relaxed_constraints"]) <= {"mínimo 2 por turno", "máximo 1 por turno"}, \
+        "Las filas sin nombre también deben llevar a su frase."
+
+
+def test_arranque_en_caliente_repara_filas_violadas(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    opt.optimizar()
+    assert opt._ultima_solucion, "Tras un solve óptimo debía guardarse la incumbente."
+
+    # R1 nunca trabaja: la incumbente anterior puede violarlo y se repara
+    nunca = "for d in range(dias):\n    for f in range(franjas):\n        model.addConstr(x_retenes[('R1', d, f)] == 0)\n"
+    _validar(opt, "R1 descansa", nunca)
+    opt._cargar_inicio()
+    starts = opt.model.getAttr("Start", [opt.decision_vars[("R1", d, f)] for d in range(4) for f in range(2)])
+    assert all(s in (0.0, gp.GRB.UNDEFINED) for s in starts), "Las filas violadas debían liberarse."
+
+    opt.optimizar()
+    assert opt.model.status == gp.GRB.OPTIMAL
+    assert all(opt.decision_vars[("R1", d, f)].X < 0.5 for d in range(4) for f in range(2))
+
+
+def test_clave_y_restauracion_de_resultado(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    _validar(opt, "máximo 1 por turno", MAXIMO)
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = False
+    clave = opt.clave_resultado()
+    assert clave == opt.clave_resultado(), "La clave debe ser estable."
+    assert clave != opt.clave_resultado("legacy"), "El perfil forma parte de la clave."
+
+    opt.optimizar()
+    guardado = opt.resultado_para_cache()
+    esperado = opt.solucion.copy()
+
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = True
+    assert opt.clave_resultado() != clave, "Cambiar las restricciones activas cambia la clave."
+    opt.solucion = None
+    assert opt.restaurar_resultado(guardado)
+    assert (opt.solucion == esperado).all()
+    assert not opt.restaurar_resultado({**guardado, "n": guardado["n"] + 1})
+
+
+def test_instantanea_ida_y_vuelta(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    _validar(opt, "máximo 1 por turno", MAXIMO)
+    opt.restricciones_validadas["máximo 1 por turno"]["activa"] = False
+    opt.optimizar()
+    datos = opt.instantanea()
+    assert datos is not None, "Un modelo lineal con nombres únicos debe poder guardarse."
+
+    copia = ShiftOptimizer(specs_retenes, persistente=True, instantanea=datos)
+    copia.restricciones_validadas = {nl: dict(info) for nl, info in opt.restricciones_validadas.items()}
+    assert copia.model.NumConstrs == 16
+    assert set(copia.decision_vars) == set(opt.decision_vars)
+    assert copia.clave_instantanea() == opt.clave_instantanea()
+
+    copia.optimizar()
+    assert copia.model.status == gp.GRB.OPTIMAL
+    assert copia.model.ObjVal == pytest.approx(opt.model.ObjVal)
+
+    copia.restricciones_validadas["máximo 1 por turno"]["activa"] = True
+    copia.restricciones_validadas["mínimo 2 por turno"]["activa"] = False
+    copia.optimizar()
+    assert copia.model.status == gp.GRB.OPTIMAL
+    assert copia.model.NumConstrs == 16, "Las filas restauradas se reutilizan al alternar."
+
+
+def test_instantanea_conserva_nombres_con_espacios(specs_retenes):
+    specs_retenes["variables"]["lista_retenes"] = ["Retén 1", "Retén 2", "Retén 3"]
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "cobertura", MINIMO.replace("name=f'min_{d}_{f}'", "name=f'cobertura {d} {f}'"))
+    copia = ShiftOptimizer(specs_retenes, persistente=True, instantanea=opt.instantanea())
+    assert copia.decision_vars[("Retén 1", 0, 1)].VarName == "x_Retén 1_0_1"
+    assert copia.model.getConstrs()[0].ConstrName == "cobertura 0 0"
+    nombres = set(copia.model.getAttr("ConstrName", copia.model.getConstrs()))
+    assert set(copia.nl_to_constr_names["cobertura"]) == nombres, "El mapeo frase → filas debe seguir valiendo."
+
+
+def test_registro_de_filas_por_rango(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    _validar(opt, "máximo 1 por turno", MAXIMO)
+    assert opt.nl_de_fila(0) == "mínimo 2 por turno"
+    assert opt.nl_de_fila(8) == "máximo 1 por turno"
+    assert opt.nl_to_constr_names["máximo 1 por turno"][0] == "max_0_0"
+
+    # al eliminar el primer grupo las filas del segundo pasan a empezar en 0
+    assert opt.eliminar_restriccion("mínimo 2 por turno")
+    assert opt.nl_de_fila(0) == "máximo 1 por turno"
+    assert opt.nl_de_fila(8) is None
+    assert opt.model.getConstrs()[0].ConstrName == "max_0_0"
+
+
+def test_grupo_que_cambia_bounds_reconstruye_al_desactivar(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "maximizar turnos", "model.setObjective(quicksum(x_retenes.values()), GRB.MAXIMIZE)\n")
+    _validar(opt, "R1 descansa", "for k in x_retenes:\n    if k[0] == 'R1':\n        x_retenes[k].UB = 0\n")
+    assert not opt._grupos["R1 descansa"]["relajable"]
+    opt.optimizar()
+    assert opt.model.ObjVal == pytest.approx(32)
+
+    modelo = opt.model
+    opt.restricciones_validadas["R1 descansa"]["activa"] = False
+    opt.optimizar()
+    assert opt.model is not modelo, "El cambio de bounds no se deshace relajando el RHS."
+    assert opt.model.ObjVal == pytest.approx(40)
+    assert "R1 descansa" not in opt._grupos
+
+
+def test_codigo_que_falla_a_medias_no_deja_filas(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes, persistente=True)
+    _validar(opt, "mínimo 2 por turno", MINIMO)
+    roto = MAXIMO + "raise ValueError('a medias')\n"
+    opt.restricciones_validadas["roto"] = {"code": roto, "activa": True}
+    assert not opt.agregar_restriccion("roto")
+    assert opt.model.NumConstrs == 8, "Las filas creadas antes del error deben quitarse."
+    assert "roto" not in opt._grupos and opt.nl_de_fila(8) is None
@@ -0,0 +1,54 @@
+import gurobipy as gp
+import pytest
+import config
+from models.solver_profiles import resolver_perfil, aplicar_perfil
+
+
+@pytest.fixture
+def modelo():
+    m = gp.Model("perfiles")
+    m.Params.OutputFlag = 0
+    yield m
+    m.dispose()
+
+
+@pytest.mark.parametrize("nombre", sorted(config.SOLVER_PROFILES))
+def test_cada_perfil_se_aplica_al_modelo(nombre, modelo):
+    perfil = resolver_perfil(nombre)
+    assert perfil == {"nombre": nombre, "params": config.SOLVER_PROFILES[nombre]}
+    aplicar_perfil(modelo, perfil)
+    for parametro, valor in config.SOLVER_PROFILES[nombre].items():
+        assert modelo.getParamInfo(parametro)[2] == pytest.approx(valor), parametro
+
+
+def test_perfil_por_defecto_y_copia_de_parametros():
+    perfil = resolver_perfil()
+    assert perfil["nombre"] == config.DEFAULT_SOLVER_PROFILE
+    perfil["params"]["TimeLimit"] = 1
+    assert config.SOLVER_PROFILES[config.DEFAULT_SOLVER_PROFILE]["TimeLimit"] != 1, \
+        "Modificar el perfil resuelto no debe tocar config."
+
+
+def test_perfil_personalizado_sobreescribe_la_base(modelo):
+    perfil = resolver_perfil({"name": "fast-feasible", "params": {"TimeLimit": 5, "Seed": 7}})
+    assert perfil["nombre"] == "fast-feasible+custom"
+    assert perfil["params"]["TimeLimit"] == 5 and perfil["params"]["MIPFocus"] == 1
+    aplicar_perfil(modelo, perfil)
+    assert modelo.Params.TimeLimit == 5 and modelo.Params.Seed == 7
+    assert resolver_perfil({"nombre": "legacy"})["nombre"] == "legacy", "Sin params no es personalizado."
+
+
+def test_aplicar_restablece_parametros_del_perfil_anterior(modelo):
+    aplicar_perfil(modelo, resolver_perfil("prove-optimal"))
+    assert modelo.Params.Presolve == 2
+    aplicar_perfil(modelo, resolver_perfil("legacy"))
+    assert modelo.Params.Presolve == 0 and modelo.Params.Threads == 1
+    assert modelo.Params.MIPFocus == 0, "Lo que no fija el perfil vuelve al valor por defecto."
+    _, _, valor, _, _, defecto = modelo.getParamInfo("TimeLimit")
+    assert valor == defecto
+
+
+@pytest.mark.parametrize("perfil", ["turbo", 3, {"name": "no-existe"}])
+def test_perfiles_no_validos(perfil):
+    with pytest.raises(ValueError):
+        resolver_perfil(perfil)
@@ -0,0 +1,152 @@
+import pytest
+from utils.cache import CacheLRU, AlmacenDisco, AlmacenMongo
+from utils import constraint_translator
+from utils.constraint_translator import clave_traduccion, translate_constraint_to_code
+
+
+@pytest.fixture
+def specs():
+    return {
+        "variables": {"dias": 6, "franjas": 2, "horarios": ["diurno", "nocturno"],
+                      "lista_retenes": ["R1", "R2"]},
+        "resources": {"retenes": 2},
+        "decision_variables": "self.x_retenes = {}",
+        "detected_constraints": ["algo"],
+    }
+
+
+def test_lru_expulsa_la_menos_usada():
+    cache = CacheLRU("prueba", max_entradas=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None, "'b' era la menos usada y debía expulsarse."
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["aciertos_memoria"] == 3 and stats["fallos"] == 1
+
+
+def test_ttl_caduca_entradas():
+    cache = CacheLRU("prueba", max_entradas=10, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_nivel_disco_sobrevive_a_la_memoria(tmp_path):
+    disco = AlmacenDisco(str(tmp_path), max_entradas=2, ttl=60)
+    cache = CacheLRU("prueba", max_entradas=1, ttl=60, persistente=disco)
+    cache.set("a", "codigo a")
+    cache.set("b", "codigo b")
+    assert cache.get("a") == "codigo a"
+    assert cache.stats()["aciertos_persistente"] == 1
+    cache.set("c", "codigo c")
+    assert len(list(tmp_path.glob("*.json"))) == 2, "El disco no debe superar max_entradas."
+
+
+def test_nivel_mongo():
+    mongomock = pytest.importorskip("mongomock")
+    coleccion = mongomock.MongoClient().db.translation_cache
+    cache = CacheLRU("prueba", max_entradas=1, ttl=60,
+                     persistente=AlmacenMongo(coleccion, max_entradas=5, ttl=60))
+    cache.set("a", {"error": "no aplica"})
+    cache.set("b", "pass")
+    assert cache.get("a") == {"error": "no aplica"}
+    cache.invalidar("a")
+    assert cache.get("a") is None
+
+
+def test_clave_ignora_espacios_y_campos_irrelevantes(specs):
+    otra = dict(specs, detected_constraints=[])
+    assert clave_traduccion("mínimo 6  y máximo 8 retenes", specs) == \
+        clave_traduccion(" mínimo 6 y máximo 8 retenes ", otra)
+    assert clave_traduccion("mínimo 6 retenes", specs) != clave_traduccion("máximo 8 retenes", specs)
+
+
+def test_traduccion_cacheada_no_llama_a_openai(specs, monkeypatch):
+    cache = CacheLRU("prueba", max_entradas=10, ttl=60)
+    monkeypatch.setattr(constraint_translator, "translation_cache", cache)
+    cache.set(clave_traduccion("un turno por día", specs), "pass")
+
+    def _sin_red():
+        raise AssertionError("No debía llamarse a OpenAI.")
+    monkeypatch.setattr(constraint_translator, "get_openai_client", _sin_red)
+
+    assert translate_constraint_to_code("un turno por día", specs) == "pass"
+
+
+def test_traducir_lote_en_paralelo(specs, monkeypatch):
+    import time
+
+    def traduccion_lenta(nl, specs):
+        time.sleep(0.2)
+        if nl == "mala":
+            raise RuntimeError("sin respuesta")
+        return f"# {nl}"
+
+    monkeypatch.setattr(constraint_translator, "translate_constraint_to_code", traduccion_lenta)
+    inicio = time.time()
+    resultados = dict(constraint_translator.traducir_lote([f"r{i}" for i in range(7)] + ["mala"], specs, max_workers=8))
+    assert time.time() - inicio < 0.8, "Las traducciones debían solaparse."
+    assert resultados["r3"] == "# r3"
+    assert isinstance(resultados["mala"], RuntimeError)
+
+
+def test_cerrar_el_lote_no_espera_las_traducciones_en_curso(specs, monkeypatch):
+    import threading
+    liberar, terminadas = threading.Event(), []
+
+    def traduccion(nl, specs):
+        if nl != "rapida":
+            liberar.wait(5)
+            terminadas.append(nl)
+        return f"# {nl}"
+
+    monkeypatch.setattr(constraint_translator, "translate_constraint_to_code", traduccion)
+    lote = constraint_translator.traducir_lote(["lenta", "rapida", "otra"], specs, max_workers=2)
+    assert next(lote) == ("rapida", "# rapida")
+    lote.close()  # p. ej. el cliente cierra la respuesta NDJSON
+    assert terminadas == [], "Cerrar el generador no debe esperar a las que siguen en curso."
+    liberar.set()
+
+
+def test_candidatos_abandonados_no_se_cachean(specs, monkeypatch):
+    import threading
+    cache = CacheLRU("prueba", max_entradas=10, ttl=60)
+    monkeypatch.setattr(constraint_translator, "translation_cache", cache)
+    liberar, llamadas, terminados = threading.Event(), [], []
+    cerrojo = threading.Lock()
+
+    def completar(prompt, timeout=None, parar=None):
+        with cerrojo:
+            n = len(llamadas)
+            llamadas.append(n)
+        if n:
+            liberar.wait(5)
+            terminados.append(n)
+            return "y = 2"
+        return "x = 1"
+
+    monkeypatch.setattr(constraint_translator, "_completar", completar)
+    candidatos = constraint_translator.traducir_candidatos("frase sin patrón", specs, 3)
+    assert next(candidatos) == "x = 1"
+    candidatos.close()
+    liberar.set()
+    # los que ya estaban en curso terminan su llamada; los pendientes se cancelan
+    for hilo in [h for h in threading.enumerate() if h.name.startswith("candidato")]:
+        hilo.join(5)
+    assert terminados, "Algún candidato debía seguir en curso al cerrar la ronda."
+    assert cache.get(clave_traduccion("frase sin patrón", specs)) == "x = 1", \
+        "Los candidatos que llegan tras cerrar la ronda no deben pisar la caché."
+
+
+def test_respuestas_de_error_no_se_cachean(specs, monkeypatch):
+    cache = CacheLRU("prueba", max_entradas=10, ttl=60)
+    monkeypatch.setattr(constraint_translator, "translation_cache", cache)
+    respuestas = iter(['{ "error": "La restricción no aplica al contexto proporcionado." }', "pass"])
+    monkeypatch.setattr(constraint_translator, "_completar", lambda prompt, timeout=None, parar=None: next(respuestas))
+
+    assert translate_constraint_to_code("los retenes vuelan", specs) == {
+        "error": "La restricción no aplica al contexto proporcionado."}
+    assert cache.get(clave_traduccion("los retenes vuelan", specs)) is None
+    assert translate_constraint_to_code("los retenes vuelan", specs) == "pass", "La negativa debía volver a preguntarse."
@@ -0,0 +1,91 @@
+import pytest
+from models.shift_optimizer import ShiftOptimizer
+
+
+@pytest.fixture
+def specs_retenes():
+    """Especificación mínima de retenes, sin pasar por la API de OpenAI."""
+    return {
+        "variables": {
+            "dias": 3,
+            "franjas": 2,
+            "horarios": ["08:00–20:00", "20:00–08:00"],
+            "lista_retenes": ["R1", "R2", "R3"],
+        },
+        "resources": {"retenes": 3},
+        "decision_variables": (
+            "self.x_retenes = { (r, d, f): model.addVar(vtype=GRB.BINARY, name=f\"x_{r}_{d}_{f}\")\n"
+            "    for r in variables['lista_retenes']\n"
+            "    for d in range(variables['dias'])\n"
+            "    for f in range(variables['franjas']) }"
+        ),
+    }
+
+
+UN_TURNO = (
+    "for r in lista_retenes:\n"
+    "    for d in range(dias):\n"
+    "        model.addConstr(quicksum(x_retenes[(r, d, f)] for f in range(franjas)) <= 1, name=f'un_turno_{r}_{d}')\n"
+)
+
+
+def test_validacion_reutiliza_plantilla(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes)
+    assert opt.validar_restriccion("un turno por día", UN_TURNO), "La restricción debía validarse."
+    plantilla = opt._plantilla
+    assert plantilla["model"].NumConstrs == 0, "La plantilla no debe recibir restricciones."
+    assert len(opt.nl_to_constr_names["un turno por día"]) == 9
+
+    assert opt.validar_restriccion("otra vez", UN_TURNO)
+    assert opt._plantilla is plantilla, "La plantilla no debía reconstruirse con las mismas specs."
+
+
+def test_plantilla_se_invalida_al_cambiar_specs(specs_retenes):
+    opt = ShiftOptimizer(specs_retenes)
+    opt.validar_restriccion("un turno por día", UN_TURNO)
+    plantilla = opt._plantilla
+
+    specs_retenes["variables"]["lista_retenes"].append("R4")
+    assert opt.validar_restriccion("un turno por día", UN_TURNO)
+    assert opt._plantilla is not plantilla
+    assert opt._plantilla["model"].NumVars == 24
+
+
+def test_validacion_especulativa_toma_el_primer_candidato_valido(specs_retenes, monkeypatch):
+    import threading
+    from utils import constraint_translator
+
+    monkeypatch.setattr(constraint_translator.translation_cache, "persistente", None)
+    # cada petición espera a que lleguen las otras dos: si se hicieran de una
+    # en una la barrera se rompería y ningún candidato validaría
+    juntas, cerrojo = threading.Barrier(3, timeout=5), threading.Lock()
+    pedidas = []
+
+    def traduccion(nl, specs, usar_cache=True, parar=None):
+        with cerrojo:
+            n = len(pedidas)
+            pedidas.append(nl)
+        juntas.wait()
+        # solo el segundo candidato de la primera ronda es correcto
+        return UN_TURNO if n == 1 else "model.addConstr(no_existe >= 1)"
+
+    monkeypatch.setattr(constraint_translator, "translate_constraint_to_code", traduccion)
+    opt = ShiftOptimizer(specs_retenes)
+    assert opt.validar_restriccion("un turno por día", "codigo roto(", candidatos=3)
+    assert len(pedidas) == 3 and len(set(pedidas)) == 1, "Una sola ronda con los tres candidatos a la vez."
+    assert pedidas[0].startswith("un turno por día\nError: ")
+    assert opt.restricciones_validadas["un turno por día"]["code"] == UN_TURNO
+    clave = constraint_translator.clave_traduccion("un turno por día", specs_retenes)
+    assert constraint_translator.translation_cache.get(clave) == UN_TURNO
+
+
+def test_validacion_especulativa_agota_el_presupuesto(specs_retenes, monkeypatch):
+    from utils import constraint_translator
+
+    monkeypatch.setattr(constraint_translator.translation_cache, "persistente", None)
+    pedidas = []
+    monkeypatch.setattr(constraint_translator, "translate_constraint_to_code",
+                        lambda nl, specs, usar_cache=True, parar=None: pedidas.append(nl) or "model.addConstr(no_existe >= 1)")
+    opt = ShiftOptimizer(specs_retenes)
+    assert not opt.validar_restriccion("imposible", "roto(", max_attempts=6, candidatos=3)
+    assert len(pedidas) == 5, "Una traducción inicial más cinco correcciones como máximo."
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+import uuid
+
+import numpy as np
+
+from models.indices import IndiceVariables
+from utils.result_visualizer import FORMATOS, exportar_resultados
+from utils.specs_hash import hash_specs
+
+_ID_VALIDO = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _segura(texto: str) -> str:
+    """Nombre de directorio seguro para una clave de proyecto."""
+    return re.sub(r"[^\w.-]", "_", str(texto)) or "_"
+
+
+class AlmacenArtefactos:
+    """
+    Resultados de cada ejecución en `directorio/<proyecto>/<solve_id>/`.
+
+    Al terminar un solve solo se guardan las posiciones y valores no nulos de
+    la solución (posiciones.npy, valores.npy) y un meta.json pequeño. Las
+    claves de las variables y las specs, que son lo voluminoso, se escriben
+    una sola vez por huella de specs en `directorio/_indices/<huella>.json` y
+    todas las ejecuciones con esas specs las comparten. Los ficheros
+    descargables (xlsx, csv, parquet) se generan la primera vez que se piden y
+    se quedan en el mismo directorio para las descargas siguientes.
+
+    Retención: como mucho `max_por_proyecto` ejecuciones por proyecto y
+    ninguna más antigua que `ttl` segundos.
+    """
+
+    def __init__(self, directorio: str, max_por_proyecto: int, ttl: float):
+        self.directorio = directorio
+        self.max_por_proyecto = max_por_proyecto
+        self.ttl = ttl
+        self._bloqueo = threading.Lock()
+        self._renderizando = {}
+
+    # ─────────────────────────────── escritura ───────────────────────────
+    def guardar(self, proyecto: str, claves, valores, variables: dict) -> str:
+        """Guarda la solución de una ejecución y devuelve su solve_id."""
+        valores = np.asarray(valores, dtype=float)
+        huella = self._guardar_indice(claves, variables)
+        solve_id = uuid.uuid4().hex
+        ruta = os.path.join(self.directorio, _segura(proyecto), solve_id)
+        tmp = ruta + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        posiciones = np.flatnonzero(valores)
+        np.save(os.path.join(tmp, "posiciones.npy"), posiciones.astype(np.min_scalar_type(len(valores))))
+        np.save(os.path.join(tmp, "valores.npy"), valores[posiciones])
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "proyecto": proyecto,
+                "creado": time.time(),
+                "indice": huella,
+                "n": len(valores),
+            }, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+        self._expulsar(os.path.dirname(ruta))
+        return solve_id
+
+    def _ruta_indice(self, huella: str) -> str:
+        return os.path.join(self.directorio, "_indices", f"{huella}.json")
+
+    def _guardar_indice(self, claves, variables: dict) -> str:
+        """
+        Escribe claves y specs de la ejecución si aún no hay un índice con su
+        huella (specs + número de variables) y devuelve la huella. Si ya
+        existe solo se renueva su fecha, para que la retención no lo borre.
+        """
+        huella = f"{hash_specs(variables)[:32]}_{len(claves)}"
+        ruta = self._ruta_indice(huella)
+        try:
+            os.utime(ruta)
+            return huella
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        if isinstance(claves, IndiceVariables):
+            listas = claves.como_listas()
+        else:
+            listas = [list(k) if isinstance(k, tuple) else [k] for k in claves]
+        # json.dumps usa el codificador en C; json.dump sobre el fichero va por trozos en Python
+        texto = json.dumps({"claves": listas, "variables": variables}, ensure_ascii=False, default=str)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(tmp, ruta)
+        return huella
+
+    # ─────────────────────────────── lectura ─────────────────────────────
+    def localizar(self, solve_id: str, proyecto: str | None = None):
+        """
+        Directorio de la ejecución, o None si no existe o ha caducado. Con
+        `proyecto` solo se busca entre las ejecuciones de ese proyecto.
+        """
+        if not _ID_VALIDO.match(solve_id or ""):
+            return None
+        if proyecto is not None:
+            directorios = [os.path.join(self.directorio, _segura(proyecto))]
+        else:
+            try:
+                directorios = [p.path for p in os.scandir(self.directorio)]
+            except OSError:
+                return None
+        for directorio in directorios:
+            ruta = os.path.join(directorio, solve_id)
+            if os.path.isfile(os.path.join(ruta, "meta.json")):
+                if time.time() - os.path.getmtime(os.path.join(ruta, "meta.json")) > self.ttl:
+                    shutil.rmtree(ruta, ignore_errors=True)
+                    return None
+                return ruta
+        return None
+
+    def ultimo(self, proyecto: str):
+        """solve_id de la ejecución más reciente del proyecto, o None."""
+        ejecuciones = self._ejecuciones(os.path.join(self.directorio, _segura(proyecto)))
+        return ejecuciones[-1][1].name if ejecuciones else None
+
+    def archivo(self, proyecto: str, solve_id: str, formato: str = "xlsx"):
+        """
+        Ruta del fichero de resultados en `formato`, generándolo si es la
+        primera vez que se pide. None si la ejecución no existe o no es de
+        `proyecto`.
+        """
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportación desconocido: {formato!r}. Opciones: {', '.join(FORMATOS)}")
+        ruta = self.localizar(solve_id, proyecto)
+        if ruta is None:
+            return None
+        destino = os.path.join(ruta, f"resultados_turnos.{formato}")
+        if os.path.exists(destino):
+            return destino
+
+        # un solo render por fichero aunque lleguen varias descargas a la vez
+        with self._bloqueo:
+            bloqueo = self._renderizando.setdefault(destino, threading.Lock())
+        with bloqueo:
+            if not os.path.exists(destino):
+                claves, valores, variables = self._leer(ruta)
+                tmp = destino + ".tmp"
+                try:
+                    exportar_resultados(None, claves, variables, tmp, valores=valores, formato=formato)
+                    os.replace(tmp, destino)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+        with self._bloqueo:
+            self._renderizando.pop(destino, None)
+        return destino
+
+    def _leer(self, ruta: str):
+        """(claves como dict ordenado, vector de solución completo, specs) de una ejecución."""
+        with open(os.path.join(ruta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(self._ruta_indice(meta["indice"]), encoding="utf-8") as f:
+            indice = json.load(f)
+        valores = np.zeros(meta["n"])
+        valores[np.load(os.path.join(ruta, "posiciones.npy"))] = np.load(os.path.join(ruta, "valores.npy"))
+        claves = dict.fromkeys(tuple(k) for k in indice["claves"])
+        return claves, valores, indice["variables"]
+
+    # ─────────────────────────────── retención ───────────────────────────
+    @staticmethod
+    def _creado(entrada) -> float:
+        """
+        Momento en que se guardó la ejecución: el mtime de su meta.json, que
+        no se vuelve a escribir. El del directorio no sirve porque cambia al
+        generar un fichero en la primera descarga.
+        """
+        try:
+            return os.stat(os.path.join(entrada.path, "meta.json")).st_mtime
+        except OSError:
+            return 0.0
+
+    def _ejecuciones(self, directorio_proyecto: str):
+        """Ejecuciones del proyecto como (creado, entrada), de la más antigua a la más reciente."""
+        try:
+            entradas = [e for e in os.scandir(directorio_proyecto)
+                        if e.is_dir() and _ID_VALIDO.match(e.name)]
+        except OSError:
+            return []
+        return sorted(((self._creado(e), e) for e in entradas), key=lambda t: t[0])
+
+    def _expulsar(self, directorio_proyecto: str):
+        ahora = time.time()
+        ejecuciones = self._ejecuciones(directorio_proyecto)
+        sobrantes = len(ejecuciones) - self.max_por_proyecto
+        for i, (creado, e) in enumerate(ejecuciones):
+            if i < sobrantes or ahora - creado > self.ttl:
+                shutil.rmtree(e.path, ignore_errors=True)
+        # índices que ninguna ejecución ha usado dentro del TTL
+        try:
+            indices = list(os.scandir(os.path.join(self.directorio, "_indices")))
+        except OSError:
+            return
+        for e in indices:
+            try:
+                if ahora - e.stat().st_mtime > self.ttl:
+                    os.remove(e.path)
+            except OSError:
+                pass
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class AlmacenDisco:
+    """
+    Nivel persistente en disco: un fichero JSON por clave dentro de `directorio`.
+    Expulsa las entradas más antiguas cuando se supera `max_entradas`.
+    """
+
+    def __init__(self, directorio: str, max_entradas: int, ttl: float):
+        self.directorio = directorio
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def get(self, clave: str):
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entrada["ts"] > self.ttl:
+            self.delete(clave)
+            return None
+        return entrada["valor"]
+
+    def set(self, clave: str, valor):
+        os.makedirs(self.directorio, exist_ok=True)
+        tmp = self._ruta(clave) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ts": time.time(), "valor": valor}, f, ensure_ascii=False)
+        os.replace(tmp, self._ruta(clave))
+        self._expulsar()
+
+    def delete(self, clave: str):
+        try:
+            os.remove(self._ruta(clave))
+        except OSError:
+            pass
+
+    def _expulsar(self):
+        ficheros = [e for e in os.scandir(self.directorio) if e.name.endswith(".json")]
+        if len(ficheros) <= self.max_entradas:
+            return
+        ficheros.sort(key=lambda e: e.stat().st_mtime)
+        for e in ficheros[:len(ficheros) - self.max_entradas]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+class AlmacenMongo:
+    """
+    Nivel persistente en una colección MongoDB. La caducidad la gestiona un
+    índice TTL sobre `creado`; el tamaño se recorta borrando las más antiguas.
+    """
+
+    def __init__(self, coleccion, max_entradas: int, ttl: float):
+        self.coleccion = coleccion
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._indice_creado = False
+
+    def get(self, clave: str):
+        doc = self.coleccion.find_one({"_id": clave}, {"valor": 1, "creado": 1})
+        if not doc:
+            return None
+        creado = doc["creado"].replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - creado).total_seconds() > self.ttl:
+            self.delete(clave)
+            return None
+        return doc["valor"]
+
+    def set(self, clave: str, valor):
+        if not self._indice_creado:
+            self.coleccion.create_index("creado", expireAfterSeconds=int(self.ttl))
+            self._indice_creado = True
+        self.coleccion.replace_one(
+            {"_id": clave},
+            {"_id": clave, "valor": valor, "creado": datetime.now(timezone.utc)},
+            upsert=True
+        )
+        sobrantes = self.coleccion.estimated_document_count() - self.max_entradas
+        if sobrantes > 0:
+            viejas = self.coleccion.find({}, {"_id": 1}).sort("creado", 1).limit(sobrantes)
+            self.coleccion.delete_many({"_id": {"$in": [d["_id"] for d in viejas]}})
+
+    def delete(self, clave: str):
+        self.coleccion.delete_one({"_id": clave})
+
+
+class CacheLRU:
+    """
+    Caché de dos niveles: LRU en memoria con TTL delante de un almacén
+    persistente opcional (AlmacenDisco o AlmacenMongo). Lleva contadores de
+    aciertos por nivel y de fallos.
+    """
+
+    def __init__(self, nombre: str, max_entradas: int, ttl: float, persistente=None):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.persistente = persistente
+        self._memoria: OrderedDict = OrderedDict()  # clave -> (ts, valor)
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_persistente = 0
+        self.fallos = 0
+
+    def get(self, clave: str):
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if time.time() - entrada[0] <= self.ttl:
+                    self._memoria.move_to_end(clave)
+                    self.aciertos_memoria += 1
+                    return entrada[1]
+                del self._memoria[clave]
+
+        valor = None
+        if self.persistente is not None:
+            try:
+                valor = self.persistente.get(clave)
+            except Exception as e:
+                print(f"⚠️  Caché '{self.nombre}': error leyendo nivel persistente: {e}")
+        with self._lock:
+            if valor is None:
+                self.fallos += 1
+                return None
+            self.aciertos_persistente += 1
+            self._guardar_memoria(clave, valor)
+        return valor
+
+    def set(self, clave: str, valor):
+        with self._lock:
+            self._guardar_memoria(clave, valor)
+        if self.persistente is not None:
+            try:
+                self.persistente.set(clave, valor)
+            except Exception as e:
+                print(f"⚠️  Caché '{self.nombre}': error escribiendo nivel persistente: {e}")
+
+    def invalidar(self, clave: str):
+        with self._lock:
+            self._memoria.pop(clave, None)
+        if self.persistente is not None:
+            try:
+                self.persistente.delete(clave)
+            except Exception as e:
+                print(f"⚠️  Caché '{self.nombre}': error invalidando nivel persistente: {e}")
+
+    def _guardar_memoria(self, clave: str, valor):
+        self._memoria[clave] = (time.time(), valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.aciertos_memoria + self.aciertos_persistente + self.fallos
+            return {
+                "nombre": self.nombre,
+                "entradas_memoria": len(self._memoria),
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_persistente": self.aciertos_persistente,
+                "fallos": self.fallos,
+                "ratio_aciertos": (self.aciertos_memoria + self.aciertos_persistente) / total if total else 0.0,
+            }
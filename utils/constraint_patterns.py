@@ -0,0 +1,209 @@
+"""
+Reconocedor local de restricciones frecuentes.
+
+Antes de llamar al LLM, translate_constraint_to_code prueba si la frase es
+una de las formas habituales (cobertura mínima/máxima por turno, días
+seguidos, turnos por día, descanso entre turnos, reparto equitativo) y, si
+lo es, genera directamente el código con los helpers de
+models/helpers_restricciones. Sólo se reconocen frases completas: cualquier
+matiz adicional ("…salvo los domingos") no encaja y va al LLM.
+"""
+import re
+import unicodedata
+
+from models.decision_spec import desde_codigo
+
+NUMEROS = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
+}
+# palabras que se refieren a "cualquier entidad": válidas si sólo hay una familia
+GENERICAS = {"persona", "personas", "trabajador", "trabajadores", "empleado", "empleados",
+             "miembro", "miembros", "recurso", "recursos"}
+
+_N = r"(\d+|" + "|".join(NUMEROS) + r")"
+_ENT = r"([a-z]+)"
+_TURNO = r"(?:turno|franja|franja horaria)"
+# sujeto opcional al principio: "cada médico", "los conductores"
+_SUJETO = rf"(?:(?:cada|un|una|el|la|los|las|todos los|todas las) {_ENT} |)"
+# "no puede… más de N" limita; "puede… más de N" no, así que "más de" exige negación
+_NIEGA = r"no (?:puede|pueden|debe|deben|podra|podran) "
+_TOPE = r"(?:como maximo|maximo|a lo sumo|un maximo de|hasta|solo|solamente)"
+_HASTA = (rf"(?:{_NIEGA}(?:trabajar|hacer|cubrir) mas de"
+          rf"|(?:solo|solamente) (?:puede|pueden|debe|deben) (?:trabajar|hacer|cubrir)"
+          rf"|(?:(?:puede|pueden|debe|deben) )?(?:trabajar|hacer|cubrir) {_TOPE})")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes, espacios simples y sin punto final."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().rstrip(".")
+
+
+def _sujeto_negativo(texto: str) -> str:
+    """"ningún retén puede…" → "cada reten no puede…"; "nadie puede…" → "no puede…"."""
+    texto = re.sub(r"^(?:ningun|ninguna) ([a-z]+) (puede|debe|podra)\b", r"cada \1 no \2", texto)
+    return re.sub(r"^nadie (puede|debe|podra)\b", r"no \1", texto)
+
+
+def _numero(texto: str) -> int:
+    return int(texto) if texto.isdigit() else NUMEROS[texto]
+
+
+def _singulares(palabra: str) -> set[str]:
+    formas = {palabra}
+    if palabra.endswith("es"):
+        formas.add(palabra[:-2])
+    if palabra.endswith("s"):
+        formas.add(palabra[:-1])
+    return formas
+
+
+def familias(specs: dict) -> list[str]:
+    """Nombres x_* de las familias de variables de decisión de las specs."""
+    dv = specs.get("decision_variables")
+    if isinstance(dv, dict):
+        return [k for k in dv if k.startswith("x_")]
+    if isinstance(dv, str):
+        return list(dict.fromkeys(re.findall(r"(?:self\.)?(x_\w+)\s*=", dv)))
+    return []
+
+
+def dimensiones(specs: dict) -> dict[str, list]:
+    """
+    Familia x_* → nombres de sus índices de entidad (los anteriores a día y
+    franja), p. ej. ["lista_enfermeras", "lista_plantas"]. Lista vacía si el
+    código no sigue el patrón reconocible (ver models/decision_spec).
+    """
+    dv = specs.get("decision_variables")
+    estructura = dv if isinstance(dv, dict) else desde_codigo(dv) if isinstance(dv, str) else None
+    return {f: list((estructura or {}).get(f, {}).get("indices", []))[:-2] for f in familias(specs)}
+
+
+def _por(entidades: list, posicion: int) -> str:
+    """Argumento `por` de los helpers: con varias entidades en la clave se agrupa por la elegida."""
+    return f", por=({posicion},)" if len(entidades) > 1 else ""
+
+
+def _familia(entidad: str | None, specs: dict) -> tuple[str, str] | None:
+    """
+    (familia, argumento por) a la que se refiere `entidad` (singular o
+    plural), o None si no queda claro. La entidad se busca entre los índices
+    de entidad de cada familia (y, si no, en su nombre); las palabras
+    genéricas se refieren al primero de la única familia.
+    """
+    dims = dimensiones(specs)
+    if entidad is None or entidad in GENERICAS:
+        if len(dims) != 1:
+            return None
+        (familia, entidades), = dims.items()
+        return familia, _por(entidades, 0)
+    buscadas = _singulares(normalizar(entidad))
+    coinciden = []
+    for familia, entidades in dims.items():
+        posicion = next((j for j, e in enumerate(entidades)
+                         if _singulares(normalizar(str(e).removeprefix("lista_"))) & buscadas), None)
+        if posicion is None and _singulares(normalizar(familia[2:])) & buscadas:
+            posicion = 0
+        if posicion is not None:
+            coinciden.append((familia, _por(entidades, posicion)))
+    return coinciden[0] if len(coinciden) == 1 else None
+
+
+def _nombre(nl: str) -> str:
+    """Nombre de restricción en snake_case derivado de la propia frase."""
+    return re.sub(r"[^a-z0-9]+", "_", normalizar(nl)).strip("_")[:48] or "restriccion"
+
+
+# (patrón, constructor). Cada constructor recibe los grupos del patrón y
+# devuelve (entidad o None, plantilla de código con {x}, {nombre} y, en las
+# reglas por entidad, {por}).
+def _cobertura_min(n, ent):
+    return ent, f"cobertura(model, {{x}}, minimo={_numero(n)}, nombre={{nombre}})"
+
+
+def _cobertura_max(n, ent):
+    return ent, f"cobertura(model, {{x}}, maximo={_numero(n)}, nombre={{nombre}})"
+
+
+def _cobertura_entre(a, b, ent):
+    return ent, f"cobertura(model, {{x}}, minimo={_numero(a)}, maximo={_numero(b)}, nombre={{nombre}})"
+
+
+def _dias_seguidos(ent, n):
+    n = _numero(n)
+    return ent, f"ventana_maxima(model, {{x}}, {n + 1}, {n}, dias_trabajados={{varias_franjas}}{{por}}, nombre={{nombre}})"
+
+
+def _turnos_por_dia(ent, n):
+    return ent, f"ventana_maxima(model, {{x}}, 1, {_numero(n)}{{por}}, nombre={{nombre}})"
+
+
+def _turnos_por_dia_sujeto_final(n, ent):
+    return _turnos_por_dia(ent, n)
+
+
+def _descanso(ent, n):
+    return ent, f"descanso_entre_turnos(model, {{x}}, {_numero(n)}{{por}}, nombre={{nombre}})"
+
+
+def _descanso_sin_sujeto(n, ent=None):
+    return _descanso(ent, n)
+
+
+def _sin_turnos_seguidos(ent):
+    return _descanso(ent, "1")
+
+
+def _equidad(ent, n):
+    return ent, f"banda_equidad(model, {{x}}, {_numero(n) if n else 1}{{por}}, nombre={{nombre}})"
+
+
+_POR_TURNO = rf"(?:por|en cada|cada) {_TURNO}"
+PATRONES = [
+    (rf"(?:debe haber |tiene que haber |hay que tener |se necesitan? )?"
+     rf"(?:al menos|como minimo|minimo(?: de)?|un minimo de) {_N} {_ENT} {_POR_TURNO}", _cobertura_min),
+    (rf"(?:debe haber |puede haber )?(?:como maximo|maximo(?: de)?|un maximo de|no mas de|a lo sumo|hasta) "
+     rf"{_N} {_ENT} {_POR_TURNO}", _cobertura_max),
+    (rf"(?:debe haber )?entre {_N} y {_N} {_ENT} {_POR_TURNO}", _cobertura_entre),
+    (rf"{_SUJETO}{_HASTA} {_N} dias (?:seguidos|consecutivos)", _dias_seguidos),
+    (rf"{_SUJETO}{_HASTA} {_N} turnos? (?:al|por|cada) dia", _turnos_por_dia),
+    (rf"(?:como maximo|a lo sumo|maximo|solo) {_N} turnos? (?:al|por) dia por {_ENT}", _turnos_por_dia_sujeto_final),
+    (rf"{_SUJETO}(?:debe |deben )?(?:tener|descansar) (?:al menos|como minimo|minimo) {_N} (?:turnos?|franjas?) "
+     rf"(?:de descanso )?entre turnos", _descanso),
+    (rf"(?:al menos|como minimo|minimo(?: de)?) {_N} (?:turnos?|franjas?) de descanso entre turnos(?: por {_ENT})?",
+     _descanso_sin_sujeto),
+    (rf"{_SUJETO}{_NIEGA}trabajar dos turnos (?:seguidos|consecutivos)", _sin_turnos_seguidos),
+    (rf"(?:reparto|distribucion|carga de trabajo|carga|asignacion)(?: de (?:turnos|trabajo))? "
+     rf"(?:equitativ[oa]|equilibrad[oa]|justa?)(?: de (?:turnos|trabajo))?(?: entre (?:los |las )?{_ENT})?"
+     rf"(?: con una diferencia (?:maxima )?de (?:como maximo )?{_N} turnos?)?", _equidad),
+]
+_COMPILADOS = [(re.compile(p), f) for p, f in PATRONES]
+
+
+def reconocer(nl: str, specs: dict) -> str | None:
+    """
+    Código para la frase `nl` si es una de las formas conocidas y su entidad
+    se resuelve sin ambigüedad contra las familias de `specs`; None si no.
+    """
+    if "\n" in nl:
+        return None  # frases con contexto añadido (p. ej. reintentos con el error): al LLM
+    texto = _sujeto_negativo(normalizar(nl))
+    for patron, constructor in _COMPILADOS:
+        m = patron.fullmatch(texto)
+        if m is None:
+            continue
+        entidad, plantilla = constructor(*m.groups())
+        resuelta = _familia(entidad, specs)
+        if resuelta is None:
+            return None
+        familia, por = resuelta
+        variables = specs.get("variables", {})
+        return plantilla.format(
+            x=familia,
+            por=por,
+            nombre=repr(_nombre(nl)),
+            varias_franjas=int(variables.get("franjas", 1) or 1) > 1,
+        )
+    return None
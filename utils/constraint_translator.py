@@ -1,16 +1,142 @@
 import os
+import re
 import json
 import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
 import config
-from openai import OpenAI
+from openai import (OpenAI, DefaultHttpxClient, Timeout, APIConnectionError, APITimeoutError,
+                    InternalServerError, RateLimitError)
+from utils.cache import CacheLRU, AlmacenDisco
+from utils.specs_hash import hash_specs
+from utils.constraint_patterns import reconocer
+from utils.prompt_builder import construir_prompt
+
+# Se incrementa cada vez que cambia el prompt de traducción, para que las
+# entradas de la caché generadas con un prompt anterior dejen de usarse.
+PROMPT_VERSION = "5"
+
+# Caché de traducciones NL → código. El nivel persistente por defecto es disco;
+# main.py lo sustituye por una colección MongoDB.
+translation_cache = CacheLRU(
+    "traducciones",
+    config.TRANSLATION_CACHE_SIZE,
+    config.TRANSLATION_CACHE_TTL,
+    AlmacenDisco(config.TRANSLATION_CACHE_DIR, config.TRANSLATION_CACHE_MAX_PERSISTENT,
+                 config.TRANSLATION_CACHE_TTL)
+)
+
+
+_client = None
+_client_lock = threading.Lock()
 
 
 def get_openai_client():
-    """Inicializa y devuelve un cliente OpenAI."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("⚠️ La variable de entorno OPENAI_API_KEY no está configurada.")
-    return OpenAI(api_key=api_key)
+    """
+    Devuelve el cliente OpenAI del proceso. Se crea una única vez, con un pool
+    HTTP compartido y timeouts configurables. Si OPENAI_BASE_URL apunta a un
+    endpoint local (p. ej. utils.llm_stub) no hace falta una clave real.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            base_url = os.getenv("OPENAI_BASE_URL") or config.LLM_BASE_URL
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                if not base_url:
+                    raise ValueError("⚠️ La variable de entorno OPENAI_API_KEY no está configurada.")
+                api_key = "stub"
+            timeout = Timeout(config.LLM_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT)
+            # un único cliente HTTP con keep-alive: las conexiones se reutilizan entre llamadas
+            http_client = DefaultHttpxClient(timeout=timeout)
+            # los reintentos los gestiona _completar para poder aplicar backoff con jitter
+            _client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                             timeout=timeout, max_retries=0)
+    return _client
+
+
+def _espera_sugerida(error) -> float | None:
+    """Segundos de espera que indica el servidor en las cabeceras de rate limit."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        valor = headers["retry-after"]
+        try:
+            return float(valor)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset-tokens")
+    if reset:
+        # formato "1s", "6m0s", "250ms"
+        total = 0.0
+        for cantidad, unidad in re.findall(r"([\d.]+)(ms|s|m|h)", reset):
+            total += float(cantidad) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unidad]
+        return total
+    return None
+
+
+class TraduccionAbandonada(RuntimeError):
+    """Quien pidió la traducción ya no la quiere (p. ej. otro candidato ganó la ronda)."""
+
+
+def _esperar(segundos: float, parar: threading.Event | None):
+    """Duerme `segundos`; si se activa `parar` entretanto, despierta y abandona."""
+    if parar is None:
+        time.sleep(segundos)
+    elif parar.wait(segundos):
+        raise TraduccionAbandonada()
+
+
+def _comprobar(parar: threading.Event | None):
+    if parar is not None and parar.is_set():
+        raise TraduccionAbandonada()
+
+
+def _backoff(intento: int) -> float:
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** intento))
+
+
+def _completar(prompt: str, timeout: float | None = None, parar: threading.Event | None = None) -> str:
+    """
+    Lanza el prompt contra el LLM y devuelve el texto de la respuesta.
+    Reintenta los fallos transitorios (timeouts, conexión, 429, 5xx) respetando
+    las cabeceras de rate limit o, si no las hay, con backoff exponencial.
+    Si se activa `parar` no se hacen más intentos (TraduccionAbandonada).
+    """
+    client = get_openai_client()
+    for intento in range(config.LLM_MAX_RETRIES + 1):
+        _comprobar(parar)
+        try:
+            resp = client.chat.completions.create(
+                model=config.LLM_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout or config.LLM_TIMEOUT,
+            )
+            return resp.choices[0].message.content.strip()
+        except (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError) as e:
+            if intento == config.LLM_MAX_RETRIES:
+                raise
+            espera = _espera_sugerida(e)
+            if espera is None:
+                espera = _backoff(intento)
+            print(f"⏳ LLM no disponible ({type(e).__name__}), reintento en {espera:.2f}s")
+            _esperar(min(espera, config.LLM_BACKOFF_MAX), parar)
 
 
 def extract_variables_from_context(context: str) -> dict:
@@ -25,8 +151,6 @@ def extract_variables_from_context(context: str) -> dict:
       4) "detected_constraints": [<str>, ...]  ← **NUEVO**: restricciones detectadas en el texto de entrada
     ***Importante***: Devuelve **solo** el JSON resultado, sin explicaciones, comentarios o formato Markdown.
     """
-    client = get_openai_client()
-
     prompt = (
         "Eres un ingeniero experto en modelos de programación lineal con Gurobi.\n"
         "Recibirás un texto que describe un problema de planificación de turnos o asignaciones"
@@ -75,11 +199,7 @@ def extract_variables_from_context(context: str) -> dict:
     )
 
     try:
-        resp = client.chat.completions.create(
-            model="o3-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        content = resp.choices[0].message.content.strip()
+        content = _completar(prompt)
         data = json.loads(content)
 
         if "error" in data:
@@ -106,7 +226,60 @@ def extract_variables_from_context(context: str) -> dict:
 
 
 
-def translate_constraint_to_code(nl_constraint: str, specs: dict) -> str:
+def _specs_normalizadas(specs: dict) -> dict:
+    """Se queda sólo con lo que influye en la traducción (sin detected_constraints, etc.)."""
+    if "variables" in specs:
+        return {k: specs.get(k) for k in ("variables", "resources", "decision_variables")}
+    return specs
+
+
+def huella_specs(specs: dict) -> str:
+    """Hash de las specs normalizadas: clave del resumen de esquema y parte de la de traducción."""
+    return hash_specs(_specs_normalizadas(specs))
+
+
+def clave_traduccion(nl_constraint: str, specs: dict, huella: str | None = None) -> str:
+    """Clave de caché: hash de (frase NL normalizada, specs normalizadas, versión del prompt)."""
+    nl = re.sub(r"\s+", " ", nl_constraint).strip()
+    base = json.dumps([PROMPT_VERSION, nl, huella or huella_specs(specs)], ensure_ascii=False)
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+def invalidar_traduccion(nl_constraint: str, specs: dict):
+    """Olvida la traducción cacheada (p. ej. si el código no pasó la validación)."""
+    translation_cache.invalidar(clave_traduccion(nl_constraint, specs))
+
+
+def recordar_traduccion(nl_constraint: str, specs: dict, code: str):
+    """Guarda `code` como traducción de la frase (p. ej. el candidato que validó)."""
+    translation_cache.set(clave_traduccion(nl_constraint, specs), code)
+
+
+# Helpers vectorizados disponibles en el contexto de ejecución (models/helpers_restricciones).
+# Crean todas las filas de una regla de una vez; el código generado debe preferirlos.
+AYUDA_HELPERS = (
+    "- Si la restricción encaja con alguno de estos helpers (ya disponibles, no los importes), "
+    "úsalo en lugar de bucles con addConstr; crean todas las filas de una vez. "
+    "x es la familia (p. ej. x_retenes), con claves (entidad…, día, franja); "
+    "por=None agrupa por entidad, por=() suma todas las entidades:\n"
+    "    cobertura(model, x, minimo=None, maximo=None, por=(), nombre='cobertura')  "
+    "# asignaciones por (día, franja); minimo/maximo número o dict {(día, franja): valor}\n"
+    "    ventana_maxima(model, x, ventana, maximo, por=None, por_franja=False, dias_trabajados=False, nombre='ventana')  "
+    "# en cualquier tramo de `ventana` días (o franjas) seguidos, como mucho `maximo` asignaciones "
+    "(con dias_trabajados=True cuenta días con algún turno)\n"
+    "    descanso_entre_turnos(model, x, franjas_descanso=1, por=None, nombre='descanso')  "
+    "# franjas libres tras cada turno (la noche y la mañana siguiente son consecutivas)\n"
+    "    banda_equidad(model, x, margen, por=None, nombre='equidad')  "
+    "# el total de cada entidad difiere como mucho `margen` del resto\n"
+    "    prohibir_patron(model, x, patron, por=None, nombre='patron')  "
+    "# patron = [(desplazamiento_días, franja), …] que no puede darse completo\n"
+    "  Ejemplo: 'nadie trabaja más de dos días seguidos' ⇒ "
+    "ventana_maxima(model, x_retenes, 3, 2, dias_trabajados=True, nombre='max_dos_dias_seguidos')\n"
+)
+
+
+def translate_constraint_to_code(nl_constraint: str, specs: dict, usar_cache: bool = True,
+                                 parar: threading.Event | None = None) -> str:
     """
     Traduce una restricción en lenguaje natural a código Python Gurobi:
       - specs es el JSON producido por extract_variables_from_context,
@@ -116,22 +289,31 @@ def translate_constraint_to_code(nl_constraint: str, specs: dict) -> str:
       - Nombra cada restricción con 'name=' en snake_case derivado de la propia restricción.
       - Refierete siempre a las variables de decisión usando 'x[(...)]' en el orden de índices definido.
     Devuelve sólo el bloque de código ejecutable, sin explicaciones ni formato adicional.
+    Las traducciones se cachean por (frase, specs, versión del prompt); las
+    respuestas de error no.
+    Las formas habituales (ver utils/constraint_patterns) se traducen en
+    local, sin caché ni LLM. Si se activa `parar` se deja de reintentar y no
+    se guarda nada en la caché (TraduccionAbandonada).
     """
-    client = get_openai_client()
-    prompt = (
+    codigo = reconocer(nl_constraint, specs)
+    if codigo is not None:
+        print(f"⚡ Restricción reconocida sin LLM: {codigo}")
+        return codigo
+
+    huella = huella_specs(specs)
+    clave = clave_traduccion(nl_constraint, specs, huella)
+    if usar_cache:
+        cacheada = translation_cache.get(clave)
+        # las negativas guardadas por versiones anteriores se vuelven a preguntar
+        if cacheada is not None and not isinstance(cacheada, dict):
+            return cacheada
+
+    # el esquema va resumido (ver utils/prompt_builder), no como JSON completo
+    cabecera = (
         "Eres un experto en optimización con Gurobi.\n"
-        "Tienes disponible un JSON 'specs' con las claves 'variables' y 'resources':\n"
-        f"{json.dumps(specs, indent=2)}\n"
-        "Ten en cuenta que el JSON se estrcutura de esta manera:\n"
-        "1) \"variables\"  ⇒ diccionario que contenga SIEMPRE:\n"
-        "      - \"dias\"      : <int>,\n"
-        "      - \"franjas\"   : <int>,\n"
-        "      - \"horarios\"  : [<str>, ...]\n"
-        "   además de una lista por cada entidad detectada, con nombre "
-        "      'lista_<entidad_plural>' (p. ej. 'lista_retenes', 'lista_medicos').\n"
-        "2) \"resources\"  ⇒ diccionario con la cantidad disponible de cada recurso "
-        "(p. ej. {\"ambulancias\": 3, \"medicos\": 5, \"conductores\": 6}).\n"
-        "3) \"decision_variables\"  ⇒ bloque de código Python **válido**, con una instrucción x_<nombre_recurso> por cada tipo de entidad (retenes, ambulancias, profesores, etc.)."
+        "El problema se describe con estas specs ('variables', 'resources' y las familias de decisión x_*):\n"
+    )
+    cola = (
         f"Genera el código Python válido que implemente la siguiente restricción:\n{nl_constraint}\n"
         "Requisitos:\n"
         "- Usa model.addConstr().\n"
@@ -139,31 +321,81 @@ def translate_constraint_to_code(nl_constraint: str, specs: dict) -> str:
         "- Usa quicksum para sumas.\n"
         "- Nombra cada restricción con name=''.\n"
         "- Accede a las variables a través de 'specs[\"variables\"]', por ejemplo: specs['variables']['dias'], y usa los nombres adecuados como 'x_retenes' o 'x_conductores'.\n"
-        "- Refierete a las variables de decisión usando los nombres separados por tipo, como 'x_retenes[(r, d, f)]', 'x_conductores[(r, d, f)]', etc., según el tipo de recurso correspondiente.\n"
+        "- Refierete a las variables de decisión usando los nombres separados por tipo y con las claves en el orden indicado, como 'x_retenes[(r, d, f)]'.\n"
+        f"{AYUDA_HELPERS}"
         "\n\n⚠️ IMPORTANTE: Si la restricción en lenguaje natural no se corresponde con ninguna variable o recurso "
-       "del problema, responde SÓLO con:\n"
-       '{ "error": "La restricción no aplica al contexto proporcionado." }\n'
-       "Sin explicaciones ni Markdown, sólo ese JSON."
+        "del problema, responde SÓLO con:\n"
+        '{ "error": "La restricción no aplica al contexto proporcionado." }\n'
+        "Sin explicaciones ni Markdown, sólo ese JSON."
         "Devuelve SOLO el código, sin explicaciones ni Markdown."
     )
+    prompt = construir_prompt(cabecera, cola, specs, huella, frase=nl_constraint)
     for attempt in range(config.MAX_ATTEMPTS):
         try:
-            resp = client.chat.completions.create(
-                model="o3-mini",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            content = resp.choices[0].message.content.strip()
+            content = _completar(prompt, parar=parar)
 
-            # Si es JSON de error, lo devolvemos como dict
+            # Si es JSON de error, lo devolvemos como dict. No se cachea: una
+            # negativa espuria del LLM no debe repetirse durante todo el TTL
             if content.startswith('{') and '"error"' in content:
                 return json.loads(content)
 
             # Si no, asumimos que es código
             compile(content, '<string>', 'exec')  # valida el código
+            # una traducción abandonada no se guarda
+            _comprobar(parar)
+            translation_cache.set(clave, content)
             return content
 
+        except TraduccionAbandonada:
+            raise
         except Exception as e:
             print(f"⚠️ Error traducción intento {attempt + 1}: {e}")
-            time.sleep(1)
+            _esperar(_backoff(attempt), parar)
+
+    raise RuntimeError("❌ No se pudo traducir la restricción tras múltiples intentos.")
+
 
-    raise RuntimeError("❌ No se pudo traducir la restricción tras múltiples intentos.")
\ No newline at end of file
+def traducir_lote(nl_constraints: list[str], specs: dict, max_workers: int = config.TRANSLATION_CONCURRENCY):
+    """
+    Traduce varias restricciones a la vez (como mucho max_workers peticiones
+    simultáneas al LLM) y va devolviendo (frase, resultado) según terminan,
+    no en el orden de entrada. El resultado es el código, el dict de error
+    de translate_constraint_to_code o la excepción si no se pudo traducir.
+    """
+    if not nl_constraints:
+        return
+    # sin `with`: si el cliente se desconecta y se cierra el generador, no se
+    # espera a las traducciones en curso y las pendientes se cancelan
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(nl_constraints))),
+                              thread_name_prefix="traduccion")
+    try:
+        futuros = {pool.submit(translate_constraint_to_code, nl, specs): nl for nl in nl_constraints}
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultado = e
+            yield futuros[futuro], resultado
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def traducir_candidatos(nl_constraint: str, specs: dict, k: int):
+    """
+    Pide k traducciones independientes de la misma frase a la vez (sin leer
+    la caché) y las va devolviendo según llegan. Si quien consume se queda con
+    una y cierra el generador, las que faltan no se esperan: las pendientes se
+    cancelan y las que están en curso dejan de reintentar y no se cachean.
+    """
+    parar = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, k), thread_name_prefix="candidato")
+    try:
+        futuros = [pool.submit(translate_constraint_to_code, nl_constraint, specs, False, parar) for _ in range(k)]
+        for futuro in as_completed(futuros):
+            try:
+                yield futuro.result()
+            except Exception as e:
+                yield e
+    finally:
+        parar.set()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,145 @@
+import json
+import threading
+from uuid import uuid4
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from utils.progress import CanalProgreso
+
+# Estados de un trabajo
+EN_COLA = "queued"
+EJECUTANDO = "running"
+TERMINADO = "done"
+FALLIDO = "error"
+CANCELADO = "cancelled"
+
+
+class Trabajo:
+    """
+    Lo que recibe la función de un trabajo: su id, un evento de cancelación,
+    un canal de progreso y la posibilidad de registrar callbacks que se
+    llamarán al cancelar (p. ej. model.terminate() de Gurobi).
+    """
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.cancelado = threading.Event()
+        self.canal = CanalProgreso()
+        self._al_cancelar = []
+
+    def al_cancelar(self, callback):
+        self._al_cancelar.append(callback)
+        if self.cancelado.is_set():
+            callback()
+
+    def cancelar(self):
+        self.cancelado.set()
+        for callback in self._al_cancelar:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️  Error cancelando trabajo {self.id}: {e}")
+
+
+class JobManager:
+    """
+    Ejecuta trabajos largos (optimizaciones) en un pool de hilos y guarda su
+    estado y resultado en una colección MongoDB, de modo que las peticiones
+    HTTP sólo encolan y consultan.
+    """
+
+    def __init__(self, coleccion, max_workers: int):
+        self.coleccion = coleccion
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._futuros = {}
+        self._trabajos: dict[str, Trabajo] = {}
+        self._lock = threading.Lock()
+
+    def _actualizar(self, job_id: str, **campos):
+        campos["actualizado"] = datetime.now(timezone.utc)
+        self.coleccion.update_one({"id": job_id}, {"$set": campos})
+
+    def submit(self, tipo: str, funcion, *args, project_id: str | None = None) -> str:
+        """Encola funcion(trabajo, *args) y devuelve el id del trabajo."""
+        job_id = str(uuid4())
+        ahora = datetime.now(timezone.utc)
+        self.coleccion.insert_one({
+            "id": job_id,
+            "tipo": tipo,
+            "project_id": project_id,
+            "estado": EN_COLA,
+            "creado": ahora,
+            "actualizado": ahora,
+        })
+        trabajo = Trabajo(job_id)
+        with self._lock:
+            self._trabajos[job_id] = trabajo
+            self._futuros[job_id] = self._pool.submit(self._ejecutar, trabajo, funcion, args)
+        return job_id
+
+    def _ejecutar(self, trabajo: Trabajo, funcion, args):
+        if trabajo.cancelado.is_set():
+            self._actualizar(trabajo.id, estado=CANCELADO)
+            trabajo.canal.cerrar()
+            return
+        self._actualizar(trabajo.id, estado=EJECUTANDO)
+        estado = FALLIDO
+        try:
+            resultado = funcion(trabajo, *args)
+            estado = CANCELADO if trabajo.cancelado.is_set() else TERMINADO
+            # el resultado se guarda serializado: las claves de la solución
+            # pueden contener caracteres no válidos como nombres de campo Mongo
+            self._actualizar(trabajo.id, estado=estado,
+                             resultado=json.dumps(resultado, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"❌ Trabajo {trabajo.id} fallido: {e}")
+            self._actualizar(trabajo.id, estado=FALLIDO, error=str(e))
+        finally:
+            trabajo.canal.publicar({"fin": True, "estado": estado})
+            trabajo.canal.cerrar()
+            with self._lock:
+                self._futuros.pop(trabajo.id, None)
+                self._trabajos.pop(trabajo.id, None)
+
+    def canal(self, job_id: str) -> CanalProgreso | None:
+        """Canal de progreso de un trabajo en curso (None si ya terminó)."""
+        with self._lock:
+            trabajo = self._trabajos.get(job_id)
+        return trabajo.canal if trabajo else None
+
+    def status(self, job_id: str) -> dict | None:
+        return self.coleccion.find_one({"id": job_id}, {"_id": 0, "resultado": 0})
+
+    def result(self, job_id: str):
+        """
+        Devuelve (estado, resultado); resultado es None si aún no ha terminado.
+        Un trabajo cancelado antes de producir resultado devuelve un error.
+        """
+        doc = self.coleccion.find_one({"id": job_id}, {"_id": 0, "estado": 1, "resultado": 1, "error": 1})
+        if not doc:
+            return None, None
+        if doc.get("resultado") is not None:
+            return doc["estado"], json.loads(doc["resultado"])
+        if doc["estado"] == FALLIDO:
+            return doc["estado"], {"error": doc.get("error")}
+        if doc["estado"] == CANCELADO:
+            return doc["estado"], {"error": "El trabajo se canceló antes de terminar."}
+        return doc["estado"], None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela un trabajo en cola o en ejecución. False si ya había terminado."""
+        with self._lock:
+            futuro = self._futuros.get(job_id)
+            trabajo = self._trabajos.get(job_id)
+        if futuro is None:
+            return False
+        if futuro.cancel():
+            with self._lock:
+                self._futuros.pop(job_id, None)
+                self._trabajos.pop(job_id, None)
+            self._actualizar(job_id, estado=CANCELADO)
+            # nunca llegará a ejecutarse: se avisa a quien escuche el canal
+            trabajo.canal.publicar({"fin": True, "estado": CANCELADO})
+            trabajo.canal.cerrar()
+            return True
+        trabajo.cancelar()
+        return True
@@ -0,0 +1,90 @@
+"""
+Endpoint local compatible con /v1/chat/completions de OpenAI para probar
+(y someter a carga) todo el flujo sin red ni coste. Uso:
+
+    python -m utils.llm_stub --port 8001 --latencia 0.5 --tasa-429 0.1
+    OPENAI_BASE_URL=http://localhost:8001/v1 python main.py
+"""
+import json
+import time
+import random
+import argparse
+from uuid import uuid4
+from flask import Flask, jsonify, request
+
+# Specs de ejemplo devueltas a las peticiones de extracción de variables
+SPECS_STUB = {
+    "variables": {
+        "dias": 6,
+        "franjas": 2,
+        "horarios": ["08:00–20:00", "20:00–08:00"],
+        "lista_retenes": [f"Retén {i}" for i in range(1, 23)],
+    },
+    "resources": {"retenes": 22},
+    "decision_variables": (
+        "self.x_retenes = { (r, d, f): model.addVar(vtype=GRB.BINARY, name=f\"x_{r}_{d}_{f}\")\n"
+        "    for r in variables['lista_retenes']\n"
+        "    for d in range(variables['dias'])\n"
+        "    for f in range(variables['franjas']) }"
+    ),
+    "detected_constraints": [],
+}
+
+# Código de ejemplo devuelto a las peticiones de traducción: válido para
+# cualquier specs porque sólo usa el diccionario combinado 'x'.
+CODIGO_STUB = (
+    "for i, (k, v) in enumerate(x.items()):\n"
+    "    if i >= 5:\n"
+    "        break\n"
+    "    model.addConstr(v <= 1, name=f'stub_{i}')\n"
+)
+
+
+def crear_app(latencia: float = 0.0, tasa_429: float = 0.0, tasa_500: float = 0.0) -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        data = request.get_json() or {}
+        prompt = " ".join(m.get("content", "") for m in data.get("messages", []))
+
+        azar = random.random()
+        if azar < tasa_429:
+            return jsonify({"error": {"message": "Rate limit (stub)", "type": "requests"}}), 429, \
+                {"retry-after-ms": "200"}
+        if azar < tasa_429 + tasa_500:
+            return jsonify({"error": {"message": "Error interno (stub)"}}), 500
+
+        if latencia:
+            time.sleep(random.uniform(0.5 * latencia, 1.5 * latencia))
+
+        if "TEXTO DE ENTRADA" in prompt:
+            content = json.dumps(SPECS_STUB, ensure_ascii=False)
+        else:
+            content = CODIGO_STUB
+
+        return jsonify({
+            "id": f"chatcmpl-{uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local del endpoint de OpenAI")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos medios por respuesta")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="fracción de respuestas 429")
+    parser.add_argument("--tasa-500", type=float, default=0.0, help="fracción de respuestas 500")
+    args = parser.parse_args()
+    crear_app(args.latencia, args.tasa_429, args.tasa_500).run(port=args.port, threaded=True)
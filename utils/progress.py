@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import deque
+from gurobipy import GRB
+
+
+class CanalProgreso:
+    """
+    Canal de progreso de un solve: el callback de Gurobi publica eventos y los
+    clientes (SSE) los escuchan. También transporta la orden de parada
+    anticipada: inmediata (`parar`) o al alcanzar un gap aceptable.
+    """
+
+    def __init__(self, max_eventos: int = 500):
+        self._cond = threading.Condition()
+        self._eventos = deque(maxlen=max_eventos)  # (secuencia, evento)
+        self._secuencia = 0
+        self.cerrado = False
+        self.parar = threading.Event()
+        self.gap_aceptable: float | None = None
+
+    def publicar(self, evento: dict):
+        with self._cond:
+            self._secuencia += 1
+            self._eventos.append((self._secuencia, evento))
+            self._cond.notify_all()
+
+    def cerrar(self):
+        with self._cond:
+            self.cerrado = True
+            self._cond.notify_all()
+
+    def detener(self, gap: float | None = None):
+        """Sin gap: parar ya. Con gap: parar en cuanto el gap sea <= gap."""
+        if gap is None:
+            self.parar.set()
+        else:
+            self.gap_aceptable = gap
+
+    def debe_parar(self, gap: float | None) -> bool:
+        if self.parar.is_set():
+            return True
+        return self.gap_aceptable is not None and gap is not None and gap <= self.gap_aceptable
+
+    def escuchar(self, latido: float = 15.0):
+        """
+        Generador con los eventos publicados (empezando por el último ya
+        emitido) hasta que se cierre el canal. Produce None cada `latido`
+        segundos sin eventos, para mantener viva la conexión.
+        """
+        with self._cond:
+            visto = self._eventos[-1][0] - 1 if self._eventos else 0
+        while True:
+            with self._cond:
+                nuevos = [(s, e) for s, e in self._eventos if s > visto]
+                if not nuevos and not self.cerrado:
+                    self._cond.wait(latido)
+                    nuevos = [(s, e) for s, e in self._eventos if s > visto]
+                cerrado = self.cerrado
+            if not nuevos:
+                if cerrado:
+                    return
+                yield None
+                continue
+            for s, e in nuevos:
+                visto = s
+                yield e
+
+
+def evento_mip(model, where, inicio: float) -> dict | None:
+    """Extrae el estado del branch-and-bound dentro de un callback de Gurobi."""
+    if where == GRB.Callback.MIP:
+        objbst = model.cbGet(GRB.Callback.MIP_OBJBST)
+        objbnd = model.cbGet(GRB.Callback.MIP_OBJBND)
+        nodos = model.cbGet(GRB.Callback.MIP_NODCNT)
+    elif where == GRB.Callback.MIPSOL:
+        objbst = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+        objbnd = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+        nodos = model.cbGet(GRB.Callback.MIPSOL_NODCNT)
+    else:
+        return None
+    hay_incumbente = abs(objbst) < GRB.INFINITY
+    gap = None
+    if hay_incumbente:
+        gap = abs(objbst - objbnd) / max(abs(objbst), 1e-10)
+    return {
+        "incumbente": objbst if hay_incumbente else None,
+        "cota": objbnd if abs(objbnd) < GRB.INFINITY else None,
+        "gap": gap,
+        "nodos": nodos,
+        "tiempo": round(time.time() - inicio, 3),
+    }
@@ -0,0 +1,175 @@
+"""
+Construcción compacta del prompt de traducción de restricciones.
+
+En lugar de volcar las specs completas (todas las listas de entidades y el
+código de decision_variables) en cada petición, el prompt lleva un resumen
+del esquema: cada lista con su tamaño y unas pocas muestras, los recursos y
+el orden de índices de cada familia x_*. El resumen depende sólo de las
+specs, así que se calcula una vez por huella de specs y se reutiliza en
+todas las frases y reintentos del proyecto.
+
+El prompt completo tiene un presupuesto de tokens (PROMPT_TOKEN_BUDGET): si
+el resumen no cabe se va reduciendo el detalle (menos muestras, sin código)
+hasta el nivel mínimo, que siempre se envía. Los elementos de las listas que
+se nombran en la frase ("Juan no trabaja el lunes") se añaden aparte, con su
+valor exacto, aunque no estén entre las muestras.
+"""
+import json
+import math
+import re
+
+import config
+from models.decision_spec import desde_codigo
+from utils.cache import CacheLRU
+
+# Resúmenes de esquema por huella de specs (sólo en memoria: son baratos de rehacer)
+resumen_cache = CacheLRU("resumen_specs", config.PROMPT_SUMMARY_CACHE_SIZE, config.TRANSLATION_CACHE_TTL)
+
+# Niveles de detalle, de más a menos: (muestras por lista, incluir código no reconocido)
+NIVELES = [(config.PROMPT_SAMPLES, True), (1, True), (0, True), (0, False)]
+_TIPOS = {"B": "binaria", "I": "entera", "C": "continua"}
+# Letras para los índices de las familias: la inicial de la lista si no está usada
+_LETRAS_TIEMPO = {"dias": "d", "franjas": "f"}
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token), sin tokenizador."""
+    return math.ceil(len(texto) / 4)
+
+
+def _json(valor) -> str:
+    return json.dumps(valor, ensure_ascii=False)
+
+
+def _lista(nombre: str, valores: list, muestras: int) -> str:
+    if 0 < len(valores) <= muestras:
+        return f"- {nombre}: {_json(valores)}"
+    texto = f"- {nombre}: lista de {len(valores)}"
+    if muestras:
+        texto += f", p. ej. {', '.join(_json(v) for v in valores[:muestras])}, …"
+    return texto
+
+
+def _letra(indice, usadas: set) -> str:
+    base = _LETRAS_TIEMPO.get(indice) if isinstance(indice, str) else None
+    if base is None:
+        palabra = str(indice).removeprefix("lista_") if isinstance(indice, str) else "i"
+        base = palabra[:1] or "i"
+    letra, n = base, 2
+    while letra in usadas:
+        letra, n = f"{base}{n}", n + 1
+    usadas.add(letra)
+    return letra
+
+
+def _familias(decision_variables, conjuntos: dict) -> tuple[list[str], str | None]:
+    """
+    Líneas con el orden de índices de cada familia x_* y, si el código no
+    sigue el patrón reconocible, el propio código (para los niveles que lo
+    admiten).
+    """
+    estructura = decision_variables if isinstance(decision_variables, dict) else None
+    codigo = None
+    if isinstance(decision_variables, str):
+        estructura = desde_codigo(decision_variables)
+        if estructura is None:
+            codigo = decision_variables.strip()
+    lineas = []
+    for nombre, familia in (estructura or {}).items():
+        usadas: set = set()
+        letras = [_letra(i, usadas) for i in familia["indices"]]
+        # los índices enteros (p. ej. dias) se recorren con range, las listas directamente
+        dominios = "; ".join(
+            f"{l} ∈ range({i})" if isinstance(conjuntos.get(i, i) if isinstance(i, str) else i, int) else f"{l} ∈ {i}"
+            for l, i in zip(letras, familia["indices"])
+        )
+        clave = letras[0] if len(letras) == 1 else f"({', '.join(letras)})"
+        tipo = _TIPOS.get(str(familia.get("vtype", "C")).upper()[:1], "continua")
+        lineas.append(f"- {nombre}[{clave}]  {dominios}  ({tipo})")
+    if codigo is not None and not lineas:
+        # sin estructura reconocible: al menos los nombres y claves de las familias
+        for nombre, clave in re.findall(r"(?:self\.)?(x_\w+)\s*=\s*\{\s*(\([^)]*\)|\w+)\s*:", codigo):
+            lineas.append(f"- {nombre}[{clave}]")
+    return lineas, codigo
+
+
+def _render(specs: dict, muestras: int, con_codigo: bool) -> str:
+    variables = specs.get("variables") or {}
+    partes = ["Variables (también accesibles directamente por su nombre):"]
+    for nombre, valor in variables.items():
+        if isinstance(valor, list):
+            partes.append(_lista(nombre, valor, muestras))
+        else:
+            partes.append(f"- {nombre}: {_json(valor)}")
+    recursos = specs.get("resources") or {}
+    if recursos:
+        partes.append(f"Recursos: {_json(recursos)}")
+    lineas, codigo = _familias(specs.get("decision_variables"), {**recursos, **variables})
+    if lineas:
+        partes.append("Variables de decisión (claves en este orden):")
+        partes.extend(lineas)
+    if codigo is not None and con_codigo:
+        partes.append(f"Código de decision_variables:\n{codigo}")
+    return "\n".join(partes)
+
+
+def niveles_resumen(specs: dict, huella: str) -> list[str]:
+    """
+    Resúmenes del esquema de `specs` de más a menos detallado (sin
+    repetidos). Se cachean por `huella` (hash de las specs normalizadas).
+    """
+    niveles = resumen_cache.get(huella)
+    if niveles is None:
+        niveles = list(dict.fromkeys(_render(specs, m, c) for m, c in NIVELES))
+        resumen_cache.set(huella, niveles)
+    return niveles
+
+
+def resumen_specs(specs: dict, huella: str, presupuesto: int | None = None) -> str:
+    """El resumen más detallado que cabe en `presupuesto` tokens (el mínimo si ninguno cabe)."""
+    niveles = niveles_resumen(specs, huella)
+    if presupuesto is None:
+        return niveles[0]
+    for texto in niveles:
+        if estimar_tokens(texto) <= presupuesto:
+            return texto
+    return niveles[-1]
+
+
+def mencionados(specs: dict, frase: str) -> str:
+    """
+    Líneas con los elementos de cada lista de specs["variables"] que aparecen
+    en `frase` como palabra completa (sin distinguir mayúsculas), o "" si no
+    hay ninguno. Depende de la frase, así que no se cachea con el resumen.
+    """
+    texto = frase.casefold()
+    lineas = []
+    for nombre, valores in (specs.get("variables") or {}).items():
+        if not isinstance(valores, list):
+            continue
+        # primero la búsqueda barata de subcadena; la expresión regular solo confirma
+        hallados = [
+            v for v in valores
+            if isinstance(v, str) and v.strip() and v.casefold() in texto
+            and re.search(rf"(?<!\w){re.escape(v.casefold())}(?!\w)", texto)
+        ]
+        if hallados:
+            lineas.append(f"- {nombre} ⊇ {_json(hallados)}")
+    if not lineas:
+        return ""
+    return "\n".join(["Mencionados en la restricción (valores exactos):", *lineas])
+
+
+def construir_prompt(cabecera: str, cola: str, specs: dict, huella: str,
+                     presupuesto: int = config.PROMPT_TOKEN_BUDGET, frase: str | None = None) -> str:
+    """
+    cabecera + resumen del esquema + cola, con el resumen más detallado que
+    deja el prompt dentro de `presupuesto` tokens. Si se da `frase`, tras el
+    resumen van siempre los elementos de las listas que menciona.
+    """
+    extra = mencionados(specs, frase) if frase else ""
+    resto = presupuesto - estimar_tokens(cabecera) - estimar_tokens(cola) - estimar_tokens(extra)
+    resumen = resumen_specs(specs, huella, resto)
+    if extra:
+        resumen = f"{resumen}\n{extra}"
+    return f"{cabecera}{resumen}\n{cola}"
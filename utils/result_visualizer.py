@@ -1,68 +1,169 @@
-import pandas as pd
 import os
+import re
 
+import numpy as np
+import pandas as pd
+import xlsxwriter
 
-def exportar_resultados(model, decision_vars, variables, archivo_salida=None):
-    if archivo_salida is None:
-        archivo_salida = os.path.join(os.getcwd(), "resultados_turnos.xlsx")
+DESCANSO = "Descanso"
+FORMATOS = ("xlsx", "csv", "parquet")
 
-    params = variables["variables"]
+
+def _etiquetas(params):
+    """Nombres legibles de días y turnos a partir de las specs."""
     horarios = params.get("horarios", [])
     nombres_dias = params.get("nombres_dias", [])
-    dias = params.get("dias", 0)
-
-    reverse_map = {}
-    for nombre_lista, lista in params.items():
-        if nombre_lista.startswith("lista_") and isinstance(lista, list):
-            for item in lista:
-                reverse_map[item] = nombre_lista.replace("lista_", "")
-
-    filas = []
-    # CAMBIO AQUÍ: iterar sobre (key, var) directamente
-    for key, var in decision_vars.items():
-        if var.X > 0.5:
-            *entidades, dia_idx, franja_idx = key
-            dia_hum = nombres_dias[dia_idx] if dia_idx < len(nombres_dias) else f"Día {dia_idx + 1}"
-            turno = horarios[franja_idx] if franja_idx < len(horarios) else f"Turno {franja_idx}"
-            elementos = []
-            for valor in entidades:
-                elementos.append(valor)
-            filas.append({
-                "Día": dia_hum,
-                "Turno": turno,
-                "Elementos": " / ".join(sorted(elementos))
-            })
-
-    df = pd.DataFrame(filas)
 
+    def dia(i):
+        return nombres_dias[i] if i < len(nombres_dias) else f"Día {i + 1}"
+
+    def turno(i):
+        return horarios[i] if i < len(horarios) else f"Turno {i}"
+
+    return dia, turno
+
+
+def tabla_asignaciones(decision_vars, valores, params, umbral=0.5):
+    """
+    Convierte el vector de solución en una tabla larga, una fila por asignación:
+    dia_idx, franja_idx, Día, Turno, Elementos. Solo se recorren las posiciones
+    activas (np.flatnonzero), nunca el total de variables.
+    """
+    valores = np.asarray(valores, dtype=float)
+    claves = list(decision_vars.keys())
+    activos = np.flatnonzero(valores > umbral)
+    dia, turno = _etiquetas(params)
+
+    seleccion = [claves[i] for i in activos]
+    df = pd.DataFrame({
+        "dia_idx": np.fromiter((k[-2] for k in seleccion), dtype=int, count=len(seleccion)),
+        "franja_idx": np.fromiter((k[-1] for k in seleccion), dtype=int, count=len(seleccion)),
+        "Elementos": [" / ".join(sorted(map(str, k[:-2]))) for k in seleccion],
+    })
+    # etiquetas por categoría: se calculan una vez por día/turno distinto, no por fila
+    df["Día"] = df["dia_idx"].map({i: dia(i) for i in df["dia_idx"].unique()})
+    df["Turno"] = df["franja_idx"].map({i: turno(i) for i in df["franja_idx"].unique()})
+    df = df.sort_values(["dia_idx", "franja_idx", "Elementos"], kind="stable", ignore_index=True)
+    return df[["dia_idx", "franja_idx", "Día", "Turno", "Elementos"]]
+
+
+def _dimensiones(df, params):
+    n_dias = max(int(params.get("dias", 0) or 0), len(params.get("nombres_dias", [])))
+    n_franjas = max(int(params.get("franjas", 0) or 0), len(params.get("horarios", [])))
     if not df.empty:
-        df_resumen = df.groupby(["Turno", "Día"])["Elementos"] \
-                       .apply(lambda x: " / ".join(x)) \
-                       .unstack(fill_value="Descanso")
-    else:
-        df_resumen = pd.DataFrame()
+        n_dias = max(n_dias, int(df["dia_idx"].max()) + 1)
+        n_franjas = max(n_franjas, int(df["franja_idx"].max()) + 1)
+    return n_dias, n_franjas
+
+
+def _cuadricula(filas, columnas, textos, n_filas, n_columnas):
+    """
+    Matriz (n_filas × n_columnas) con los textos de cada celda unidos por " / "
+    y DESCANSO donde no hay asignación. Se ordena por celda con NumPy y solo se
+    hace un join por celda ocupada.
+    """
+    grid = np.full((n_filas, n_columnas), DESCANSO, dtype=object)
+    if len(textos) == 0:
+        return grid
+    celda = np.asarray(filas, dtype=np.int64) * n_columnas + np.asarray(columnas, dtype=np.int64)
+    orden = np.argsort(celda, kind="stable")
+    celda = celda[orden]
+    textos = np.asarray(textos, dtype=object)[orden]
+    inicios = np.flatnonzero(np.r_[True, celda[1:] != celda[:-1]])
+    limites = np.r_[inicios[1:], len(celda)]
+    grid.flat[celda[inicios]] = [" / ".join(textos[a:b]) for a, b in zip(inicios, limites)]
+    return grid
 
-    with pd.ExcelWriter(archivo_salida, engine="xlsxwriter") as writer:
-        df_resumen.to_excel(writer, sheet_name="Resumen")
 
-        workbook = writer.book
-        header_format = workbook.add_format({"bold": True, "bg_color": "#D9EAD3", "border": 1})
-        cell_format = workbook.add_format({"border": 1})
-        descanso_format = workbook.add_format({"bg_color": "#F4CCCC", "border": 1})
+def _nombre_hoja(texto, usados):
+    nombre = re.sub(r"[\[\]:*?/\\]", "-", texto)[:31] or "Hoja"
+    base, n = nombre, 2
+    while nombre.lower() in usados:
+        sufijo = f" ({n})"
+        nombre = base[:31 - len(sufijo)] + sufijo
+        n += 1
+    usados.add(nombre.lower())
+    return nombre
 
-        worksheet = writer.sheets["Resumen"]
 
-        for col_num, value in enumerate(df_resumen.columns.values):
-            worksheet.write(0, col_num + 1, value, header_format)
-            worksheet.set_column(col_num + 1, col_num + 1, 40)
+def _escribir_hoja(workbook, nombre, cabecera, etiquetas_fila, grid, formatos, ancho=40):
+    """Escribe fila a fila (compatible con constant_memory) y colorea los descansos."""
+    ws = workbook.add_worksheet(nombre)
+    ws.set_column(0, 0, 20)
+    if grid.shape[1]:
+        ws.set_column(1, grid.shape[1], ancho)
+    ws.write_row(0, 0, cabecera, formatos["cabecera"])
+    for r, etiqueta in enumerate(etiquetas_fila, start=1):
+        ws.write(r, 0, etiqueta, formatos["cabecera"])
+        ws.write_row(r, 1, grid[r - 1].tolist(), formatos["celda"])
+    if grid.size:
+        ws.conditional_format(1, 1, grid.shape[0], grid.shape[1], {
+            "type": "cell", "criteria": "==", "value": f'"{DESCANSO}"', "format": formatos["descanso"],
+        })
+    ws.freeze_panes(1, 1)
+    return ws
 
-        for row_num, value in enumerate(df_resumen.index.values):
-            worksheet.write(row_num + 1, 0, value, header_format)
 
-        for row in range(df_resumen.shape[0]):
-            for col in range(df_resumen.shape[1]):
-                cell_value = df_resumen.iloc[row, col]
-                fmt = cell_format if cell_value != "Descanso" else descanso_format
-                worksheet.write(row + 1, col + 1, cell_value, fmt)
+def _escribir_xlsx(df, decision_vars, params, archivo_salida):
+    dia, turno = _etiquetas(params)
+    n_dias, n_franjas = _dimensiones(df, params)
+    dias = [dia(i) for i in range(n_dias)]
+    turnos = [turno(i) for i in range(n_franjas)]
+
+    workbook = xlsxwriter.Workbook(archivo_salida, {"constant_memory": True})
+    formatos = {
+        "cabecera": workbook.add_format({"bold": True, "bg_color": "#D9EAD3", "border": 1}),
+        "celda": workbook.add_format({"border": 1}),
+        "descanso": workbook.add_format({"bg_color": "#F4CCCC", "border": 1}),
+    }
+    usados = set()
+
+    # Resumen: turnos en filas, días en columnas
+    resumen = _cuadricula(df["franja_idx"], df["dia_idx"], df["Elementos"], n_franjas, n_dias)
+    _escribir_hoja(workbook, _nombre_hoja("Resumen", usados), ["Turno"] + dias, turnos, resumen, formatos)
+
+    # Por elemento: una fila por entidad (también las que no trabajan), días en columnas
+    entidades = sorted({" / ".join(sorted(map(str, k[:-2]))) for k in decision_vars.keys()})
+    pos = {e: i for i, e in enumerate(entidades)}
+    grid = _cuadricula(df["Elementos"].map(pos), df["dia_idx"], df["Turno"], len(entidades), n_dias)
+    _escribir_hoja(workbook, _nombre_hoja("Por elemento", usados), ["Elemento"] + dias, entidades, grid,
+                   formatos, ancho=18)
+
+    # Una hoja por día: es la columna correspondiente del resumen
+    for d in range(n_dias):
+        nombre = _nombre_hoja(f"{d + 1:02d} {dias[d]}", usados)
+        _escribir_hoja(workbook, nombre, ["Turno", dias[d]], turnos, resumen[:, d:d + 1], formatos)
+
+    workbook.close()
+
+
+def exportar_resultados(model, decision_vars, variables, archivo_salida=None, valores=None, formato="xlsx"):
+    """
+    Exporta la solución a disco y devuelve la ruta escrita.
+
+    valores: vector de solución alineado con decision_vars (ShiftOptimizer.solucion).
+    Si no se pasa, se lee de una vez con model.getAttr("X", ...).
+    formato: "xlsx" (Resumen, Por elemento y una hoja por día, escrito en modo
+    constant_memory), "csv" o "parquet" (tabla larga de asignaciones, pensada
+    para horizontes grandes; parquet necesita pyarrow).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación desconocido: {formato!r}. Opciones: {', '.join(FORMATOS)}")
+    if valores is None:
+        valores = model.getAttr("X", list(decision_vars.values()))
+
+    if archivo_salida is None:
+        archivo_salida = os.path.join(os.getcwd(), f"resultados_turnos.{formato}")
+
+    params = variables["variables"]
+    df = tabla_asignaciones(decision_vars, valores, params)
+
+    if formato == "xlsx":
+        _escribir_xlsx(df, decision_vars, params, archivo_salida)
+    elif formato == "csv":
+        df.to_csv(archivo_salida, index=False)
+    else:
+        df.to_parquet(archivo_salida, index=False)
 
     print(f"✅ Resultados exportados a: {archivo_salida}")
+    return archivo_salida
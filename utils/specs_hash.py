@@ -0,0 +1,11 @@
+import hashlib
+import json
+
+
+def hash_specs(specs: dict) -> str:
+    """
+    Huella estable (sha256) de un JSON de specs. El orden de claves no
+    influye, así que dos specs equivalentes producen la misma huella.
+    """
+    texto = json.dumps(specs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
@@ -1,14 +1,44 @@
-from flask import Blueprint, jsonify, request, render_template, session, send_file, current_app
+from flask import (Blueprint, jsonify, request, render_template, session, send_file, current_app,
+                   Response, stream_with_context)
 from uuid import uuid4
-from utils.constraint_translator import extract_variables_from_context, translate_constraint_to_code
-from models.shift_optimizer import ShiftOptimizer
+from utils.constraint_translator import (extract_variables_from_context, translate_constraint_to_code, translation_cache,
+                                         traducir_lote)
+from models.shift_optimizer import ShiftOptimizer, solve_cache
+from models.optimizer_registry import optimizador_desde_proyecto, guardar_instantanea_de
+from data.instantaneas import borrar_instantanea
+from models.solver_profiles import resolver_perfil
+from models.escenarios import resolver_escenarios
+import config
+from utils.specs_hash import hash_specs
+from data.proyectos import (ahora, asegurar_indices, listar_resumen, obtener_detalle, guardar_restriccion,
+                            eliminar_restriccion, guardar_manual, guardar_activas)
 import gurobipy as gp
-from utils.result_visualizer import exportar_resultados
-import os
+from utils.result_visualizer import FORMATOS
+import json
 
 routes = Blueprint('routes', __name__, template_folder='../web/templates')
 
 
+def _clave_optimizador() -> str:
+    """Proyecto actual de la sesión o, si aún no se ha guardado, un borrador propio."""
+    pid = session.get('current_project_id')
+    if pid:
+        return pid
+    if 'borrador_id' not in session:
+        session['borrador_id'] = f"borrador-{uuid4()}"
+    return session['borrador_id']
+
+
+def _optimizador() -> ShiftOptimizer | None:
+    """Optimizador de la sesión solo para lectura; para modificarlo, _optimizador_bloqueado()."""
+    return current_app.optimizers.get(_clave_optimizador())
+
+
+def _optimizador_bloqueado():
+    """Cerrojo del proyecto de la sesión con su optimizador obtenido ya dentro."""
+    return current_app.optimizers.bloqueado(_clave_optimizador())
+
+
 @routes.route('/')
 def index():
     return render_template('index.html')
@@ -20,8 +50,18 @@ def index():
 
 @routes.route('/api/projects', methods=['GET'])
 def list_projects():
-    projects = list(current_app.mongo.db.projects.find({}, {"_id": 0}))
-    return jsonify({"projects": projects})
+    """
+    Resumen paginado de proyectos (id, nombre y fechas), del más reciente al
+    más antiguo. ?cursor= es el next_cursor de la página anterior; ?limit=
+    el tamaño de página; ?name= filtra por nombre exacto.
+    """
+    try:
+        limite = min(max(int(request.args.get('limit', config.PROJECTS_PAGE_SIZE)), 1), config.PROJECTS_PAGE_MAX)
+        projects, siguiente = listar_resumen(current_app.mongo.db.projects, request.args.get('cursor'), limite,
+                                             request.args.get('name'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"projects": projects, "next_cursor": siguiente})
 
 
 @routes.route('/api/projects', methods=['POST'])
@@ -35,15 +75,18 @@ def create_project():
         }
     manual = session.get('restricciones', [])
 
-    # Tomamos el shift_store si existe, sino lista vacía
-    shift = getattr(current_app, "shift_store", None)
+    # Tomamos el optimizador de la sesión si existe, sino lista vacía
+    clave = _clave_optimizador()
+    shift = current_app.optimizers.get(clave, rehidratar=False)
     vc_list = []
     if shift:
         for texto, info in shift.restricciones_validadas.items():
+            info["version"] = 1
             vc_list.append({
                 "texto": texto,
                 "code": info["code"],
-                "activa": info["activa"]
+                "activa": info["activa"],
+                "version": 1
             })
 
     project = {
@@ -54,11 +97,16 @@ def create_project():
         "manualConstraints": manual,
         "variables": specs,
         "validatedConstraints": vc_list,
-        "gurobiState": data.get("gurobiState", {"vars": [], "cons": [], "objective": "0", "sense": 1})
-
+        "gurobiState": data.get("gurobiState", {"vars": [], "cons": [], "objective": "0", "sense": 1}),
+        "createdAt": ahora(),
+        "updatedAt": ahora(),
     }
 
+    asegurar_indices(current_app.mongo.db.projects)
     current_app.mongo.db.projects.insert_one(project)
+    # el optimizador del borrador pasa a ser el del proyecto
+    current_app.optimizers.renombrar(clave, pid)
+    session['current_project_id'] = pid
     print(f"[DEBUG CREATE] Proyecto creado id={pid}, name={project['name']}, validated={vc_list}")
     return jsonify({"id": pid, "name": project["name"]}), 201
 
@@ -70,15 +118,6 @@ def load_project(pid):
     if not project:
         return jsonify({"error": "Proyecto no encontrado"}), 404
 
-    specs = project.get('variables', {}) or {}
-    if not isinstance(specs.get("decision_variables"), str):
-        specs["decision_variables"] = ""
-    try:
-        current_app.shift_store = ShiftOptimizer(specs)
-    except Exception as e:
-        current_app.logger.warning(f"No inicializar ShiftOptimizer: {e}")
-        current_app.shift_store = None
-
     # Debug de lo que llega
     print(f"[DEBUG LOAD] Proyecto id={pid} name={project.get('name')}")
     print(f"  Variables: {project.get('variables')}")
@@ -88,27 +127,41 @@ def load_project(pid):
     # Restaurar sesión
     session['variables'] = project.get('variables', {})
     session['restricciones'] = project.get('manualConstraints', [])
+    session['current_project_id'] = pid
     session.modified = True
 
-    # Reconstruir modelo en backend
-    specs = project.get('variables', {})
-    current_app.shift_store = ShiftOptimizer(specs)
-    print(f"[DEBUG LOAD] Modelo reseteado con {len(current_app.shift_store.decision_vars)} vars")
-
-    # Aplicar cada validación guardada
-    for entry in project.get('validatedConstraints', []):
-        nl = entry["texto"]
-        current_app.shift_store.restricciones_validadas[nl] = {
-            "code": entry["code"],
-            "activa": entry["activa"]
-        }
-        print(f"[DEBUG LOAD] Restaurando '{nl}' activa={entry['activa']}")
-        if entry["activa"]:
-            ok = current_app.shift_store.agregar_restriccion(nl)
-            print(f"[DEBUG LOAD] Agregada '{nl}': {ok}")
+    # Reutilizar el optimizador vivo o reconstruirlo en backend
+    registry = current_app.optimizers
+    with registry.bloqueo(pid):
+        optimizer = registry.get(pid, rehidratar=False)
+        if optimizer is None:
+            try:
+                optimizer = optimizador_desde_proyecto(project, current_app.mongo.db)
+            except Exception as e:
+                current_app.logger.warning(f"No inicializar ShiftOptimizer: {e}")
+                optimizer = None
+            if optimizer is not None:
+                registry.put(pid, optimizer)
+
+    if optimizer is not None:
+        print(f"[DEBUG LOAD] Modelo final: {optimizer.model.NumVars} vars, "
+              f"{optimizer.model.NumConstrs} constrs")
+    return jsonify(project)
 
-    print(f"[DEBUG LOAD] Modelo final: {len(current_app.shift_store.model.getVars())} vars, "
-          f"{len(current_app.shift_store.model.getConstrs())} constrs")
+
+@routes.route('/api/projects/<pid>/detail', methods=['GET'])
+def project_detail(pid):
+    """
+    Documento del proyecto sin tocar la sesión ni el optimizador (a diferencia
+    de GET /api/projects/<pid>, que además lo abre). ?fields=a,b limita los campos.
+    """
+    campos = [c for c in request.args.get('fields', '').split(',') if c.strip()]
+    try:
+        project = obtener_detalle(current_app.mongo.db.projects, pid, [c.strip() for c in campos])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not project:
+        return jsonify({"error": "Proyecto no encontrado"}), 404
     return jsonify(project)
 
 
@@ -116,12 +169,16 @@ def load_project(pid):
 def update_project(pid):
     data = request.get_json() or {}
 
-    # Reconstruir la lista para almacenar
-    vc_list = [
-        {"texto": t, "code": info["code"], "activa": info["activa"]}
-        for t, info in current_app.shift_store.restricciones_validadas.items()
-    ]
-    print(f"[DEBUG UPDATE] Antes de grabar validatedConstraints={vc_list}")
+    # validatedConstraints ya se guarda entrada a entrada al validar/borrar;
+    # aquí solo se sincroniza qué restricciones están activas
+    activas = {}
+    with current_app.optimizers.bloqueado(pid, rehidratar=False) as optimizer:
+        if optimizer is not None:
+            activas = {t: info["activa"] for t, info in optimizer.restricciones_validadas.items()}
+            # si cambian las specs el optimizador vivo ya no sirve
+            if data.get("variables") and hash_specs(data["variables"]) != hash_specs(optimizer.specs):
+                current_app.optimizers.discard(pid)
+    print(f"[DEBUG UPDATE] Activas a sincronizar={activas}")
 
     update = {
         "name": data.get("name"),
@@ -129,12 +186,26 @@ def update_project(pid):
         "detectedConstraints": data.get("detectedConstraints"),
         "manualConstraints": data.get("manualConstraints"),
         "variables": data.get("variables"),
-        "validatedConstraints": vc_list,
-        "gurobiState": data.get("gurobiState")
+        "gurobiState": data.get("gurobiState"),
+        "updatedAt": ahora()
     }
+    if "solverProfile" in data:
+        try:
+            resolver_perfil(data["solverProfile"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        update["solverProfile"] = data["solverProfile"]
+        with current_app.optimizers.bloqueado(pid, rehidratar=False) as optimizer:
+            if optimizer is not None:
+                optimizer.perfil_solver = data["solverProfile"]
     result = current_app.mongo.db.projects.update_one({"id": pid}, {"$set": update})
     if result.matched_count == 0:
         return jsonify({"error": "Proyecto no encontrado"}), 404
+    guardar_activas(current_app.mongo.db.projects, pid, activas)
+    # se refresca la instantánea del modelo compilado si su clave ha cambiado
+    with current_app.optimizers.bloqueado(pid, rehidratar=False) as optimizer:
+        if optimizer is not None:
+            guardar_instantanea_de(current_app.mongo.db, pid, optimizer)
 
     print(f"[DEBUG UPDATE] Proyecto id={pid} actualizado")
     return jsonify({"success": True})
@@ -145,6 +216,8 @@ def delete_project(pid):
     result = current_app.mongo.db.projects.delete_one({"id": pid})
     if result.deleted_count == 0:
         return jsonify({"error": "Proyecto no encontrado"}), 404
+    current_app.optimizers.discard(pid)
+    borrar_instantanea(current_app.mongo.db, pid)
 
     print(f"[DEBUG DELETE] Proyecto id={pid} eliminado")
     return jsonify({"success": True})
@@ -179,9 +252,11 @@ def translate():
     if pid:
         current_app.mongo.db.projects.update_one(
             {"id": pid},
-            {"$set": {"manualConstraints": detected}}
+            {"$set": {"manualConstraints": detected, "updatedAt": ahora()}}
         )
-    current_app.shift_store = ShiftOptimizer(variables)
+    clave = _clave_optimizador()
+    with current_app.optimizers.bloqueo(clave):
+        current_app.optimizers.put(clave, ShiftOptimizer(variables))
     return jsonify({"result": variables}), 200
 
 
@@ -192,11 +267,20 @@ def edit_constraint():
     old_nl = data["old_nl"]
     new_nl = data["new_nl"]
 
-    if not hasattr(current_app, 'shift_store'):
-        return jsonify(success=False, error="No se ha inicializado el modelo"), 400
-
-    optimizer: ShiftOptimizer = current_app.shift_store
-    ok = optimizer.editar_restriccion(old_nl, new_nl)
+    with _optimizador_bloqueado() as optimizer:
+        if optimizer is None:
+            return jsonify(success=False, error="No se ha inicializado el modelo"), 400
+        version_antigua = _version_previa(optimizer, old_nl)
+        version_nueva = version_antigua if new_nl == old_nl else _version_previa(optimizer, new_nl)
+        ok = optimizer.editar_restriccion(old_nl, new_nl)
+        pid = session.get('current_project_id')
+        if ok and pid:
+            # la frase antigua sale y entra la nueva, sin reescribir el resto
+            db = current_app.mongo.db
+            if ((new_nl != old_nl and not _eliminar_validada(db, pid, old_nl, version_antigua))
+                    or not _guardar_validada(db, optimizer, pid, new_nl, version_nueva)):
+                current_app.optimizers.discard(pid)
+                return jsonify(success=False, error=CONFLICTO_RESTRICCION), 409
     if ok:
         return jsonify(success=True)
     else:
@@ -209,33 +293,24 @@ def delete_constraint():
 
     if not nl:
         return jsonify(success=False, error="No se especificó la restricción."), 400
-    if not hasattr(current_app, 'shift_store'):
-        return jsonify(success=False, error="No se ha inicializado el modelo"), 400
-
-    optimizer: ShiftOptimizer = current_app.shift_store
-    if nl in optimizer.restricciones_validadas:
-        # 1) Eliminar de memoria
-        del optimizer.restricciones_validadas[nl]
-
-        # 2) Persistir en MongoDB
+    # 1) Eliminar de memoria (y sus filas del modelo)
+    with _optimizador_bloqueado() as optimizer:
+        if optimizer is None:
+            return jsonify(success=False, error="No se ha inicializado el modelo"), 400
+        encontrada = nl in optimizer.restricciones_validadas
+        if encontrada:
+            version = _version_previa(optimizer, nl)
+            optimizer.eliminar_restriccion(nl)
+
+    if encontrada:
+        # 2) Persistir en MongoDB: se retiran solo sus entradas
         pid = session.get('current_project_id')
         if pid:
-            # 2a) validatedConstraints
-            vc_list = [
-                {"texto": t, "code": info["code"], "activa": info["activa"]}
-                for t, info in optimizer.restricciones_validadas.items()
-            ]
-            # 2b) manualConstraints
+            if not _eliminar_validada(current_app.mongo.db, pid, nl, version):
+                current_app.optimizers.discard(pid)
+                return jsonify(success=False, error=CONFLICTO_RESTRICCION), 409
             manual = session.get('restricciones', [])
             manual = [m for m in manual if m["texto"] != nl]
-
-            current_app.mongo.db.projects.update_one(
-                {"id": pid},
-                {"$set": {
-                    "validatedConstraints": vc_list,
-                    "manualConstraints": manual
-                }}
-            )
             # mantener en sesión
             session['restricciones'] = manual
 
@@ -253,10 +328,10 @@ def view_constraint():
     if not nl:
         return jsonify(success=False, error="No se especificó la restricción."), 400
 
-    if not hasattr(current_app, 'shift_store'):
+    optimizer = _optimizador()
+    if optimizer is None:
         return jsonify(success=False, error="No se ha inicializado el modelo"), 400
 
-    optimizer: ShiftOptimizer = current_app.shift_store
     restr = optimizer.restricciones_validadas.get(nl)
 
     if restr:
@@ -264,6 +339,43 @@ def view_constraint():
     else:
         return jsonify(success=False, error="Restricción no encontrada."), 404
 
+CONFLICTO_RESTRICCION = "La restricción ha cambiado en otra sesión; recarga el proyecto."
+
+
+def _guardar_validada(db, optimizer: ShiftOptimizer, pid: str, nl: str, version_previa) -> bool:
+    """
+    Persiste solo la entrada `nl` de validatedConstraints. version_previa es
+    la versión que tenía el optimizador antes del cambio (0 = aún no la
+    tenía, None = sin comprobación; ver _version_previa). Devuelve False si
+    otra sesión la modificó entretanto.
+    """
+    info = optimizer.restricciones_validadas[nl]
+    version = guardar_restriccion(db.projects, pid, nl, info["code"], info["activa"], version_previa)
+    if version is None:
+        return False
+    info["version"] = version
+    return True
+
+
+def _version_previa(optimizer: ShiftOptimizer, nl: str):
+    """
+    Versión de `nl` que conoce el optimizador, para guardar con comprobación:
+    0 si aún no la tiene (solo se inserta si nadie la ha creado entretanto).
+    """
+    info = optimizer.restricciones_validadas.get(nl)
+    return 0 if info is None else info.get("version")
+
+
+def _eliminar_validada(db, pid: str, nl: str, version) -> bool:
+    """
+    Retira la entrada `nl` si sigue en la versión que conoce el optimizador.
+    False si otra sesión la modificó entretanto; que ya no esté no es conflicto.
+    """
+    if eliminar_restriccion(db.projects, pid, nl, version):
+        return True
+    return not db.projects.count_documents({"id": pid, "validatedConstraints.texto": nl}, limit=1)
+
+
 @routes.route('/api/convert', methods=['POST'])
 def convert():
     data = request.get_json() or {}
@@ -286,33 +398,33 @@ def convert():
         code = result
 
         valid = False
-        if hasattr(current_app, 'shift_store'):
-            # 4) Validar en memoria (esto llenará ShiftOptimizer.name_to_nl)
-            valid = current_app.shift_store.validar_restriccion(nl, code)
-            # 4.1) Inyectar en el modelo real para que name_to_nl se consolide
-            if valid:
-                current_app.shift_store.agregar_restriccion(nl)
-
-            # 5) Persistir estado en MongoDB
+        mapping = {}
+        clave = _clave_optimizador()
+        with current_app.optimizers.bloqueado(clave) as optimizer:
+            if optimizer is not None:
+                version_previa = _version_previa(optimizer, nl)
+                # 4) Validar en memoria (esto llenará ShiftOptimizer.name_to_nl)
+                valid = optimizer.validar_restriccion(nl, code)
+                # 4.1) Inyectar en el modelo real para que name_to_nl se consolide
+                if valid:
+                    optimizer.agregar_restriccion(nl)
+                mapping = dict(optimizer.name_to_nl)
+        if optimizer is not None:
+            current_app.optimizers.actualizar_memoria(clave)
+
+            # 5) Persistir en MongoDB solo lo que ha cambiado
             pid = session.get('current_project_id')
             if pid:
-                # 5a) validatedConstraints
-                vc_list = [
-                    {"texto": t, "code": info["code"], "activa": info["activa"]}
-                    for t, info in current_app.shift_store.restricciones_validadas.items()
-                ]
+                db = current_app.mongo.db
+                # 5a) la entrada de validatedConstraints de esta frase
+                if valid and not _guardar_validada(db, optimizer, pid, nl, version_previa):
+                    current_app.optimizers.discard(pid)
+                    return jsonify({"message": CONFLICTO_RESTRICCION}), 409
                 # 5b) manualConstraints (añadir si es nuevo)
+                guardar_manual(db.projects, pid, nl)
                 manual = session.get('restricciones', [])
                 if not any(m['texto'] == nl for m in manual):
                     manual.append({"texto": nl, "activa": True})
-                # actualización conjunta
-                current_app.mongo.db.projects.update_one(
-                    {"id": pid},
-                    {"$set": {
-                        "validatedConstraints": vc_list,
-                        "manualConstraints": manual
-                    }}
-                )
                 # mantener en sesión
                 session['restricciones'] = manual
 
@@ -321,7 +433,7 @@ def convert():
             "code": code,
             "valid": valid,
             # <— añadimos aquí el mapeo nombre Gurobi → frase NL
-            "mapping": current_app.shift_store.name_to_nl
+            "mapping": mapping
         }), 200
 
     except ValueError as e:
@@ -331,60 +443,360 @@ def convert():
         return jsonify({"message": f"Error interno: {e}"}), 500
 
 
+@routes.route('/api/convert_batch', methods=['POST'])
+def convert_batch():
+    """
+    Traduce y valida varias restricciones de una vez (p. ej. las
+    detected_constraints del contexto). Las traducciones van en paralelo y cada
+    una se valida en cuanto llega; la respuesta es NDJSON, una línea por
+    restricción en orden de llegada y una línea final con el mapeo.
+    """
+    data = request.get_json() or {}
+    frases = data.get('constraints') or []
+    if not isinstance(frases, list):
+        return jsonify({"message": "'constraints' debe ser una lista de frases."}), 400
+    # sin vacías ni duplicadas, conservando el orden
+    frases = list(dict.fromkeys(f.strip() for f in frases if isinstance(f, str) and f.strip()))
+    if not frases:
+        return jsonify({"message": "No se especificó ninguna restricción."}), 400
+
+    translate_vars = session.get('variables')
+    if not translate_vars:
+        return jsonify({"message": "No hay variables en sesión. Sube un contexto primero."}), 400
+
+    clave = _clave_optimizador()
+    registro = current_app.optimizers
+    # solo para decidir qué se persiste: cada frase vuelve a obtenerlo con el cerrojo
+    hay_modelo = registro.get(clave) is not None
+    db = current_app.mongo.db
+    pid = session.get('current_project_id')
+
+    # la sesión no se puede modificar una vez empezada la respuesta: se actualiza antes
+    manual = session.get('restricciones', [])
+    if pid and hay_modelo:
+        for nl in frases:
+            if not any(m['texto'] == nl for m in manual):
+                manual.append({"texto": nl, "activa": True})
+        session['restricciones'] = manual
+
+    def generar():
+        validadas = 0
+        for nl, resultado in traducir_lote(frases, translate_vars):
+            linea = {"constraint": nl, "valid": False}
+            if isinstance(resultado, Exception):
+                linea["message"] = str(resultado)
+            elif isinstance(resultado, dict) and resultado.get("error"):
+                linea["message"] = resultado["error"]
+            else:
+                linea["code"] = resultado
+                with registro.bloqueado(clave) as optimizer:
+                    if optimizer is not None:
+                        try:
+                            version_previa = _version_previa(optimizer, nl)
+                            valido = optimizer.validar_restriccion(nl, resultado)
+                            if valido:
+                                optimizer.agregar_restriccion(nl)
+                                linea["code"] = optimizer.restricciones_validadas[nl]["code"]
+                            linea["valid"] = bool(valido)
+                        except Exception as e:
+                            linea["message"] = str(e)
+                        if pid and linea["valid"]:
+                            if not _guardar_validada(db, optimizer, pid, nl, version_previa):
+                                linea["valid"] = False
+                                linea["message"] = CONFLICTO_RESTRICCION
+                validadas += linea["valid"]
+            if pid and hay_modelo:
+                guardar_manual(db.projects, pid, nl)
+            yield json.dumps(linea, ensure_ascii=False) + "\n"
+
+        mapping = {}
+        with registro.bloqueado(clave) as optimizer:
+            if optimizer is not None:
+                mapping = dict(optimizer.name_to_nl)
+        if optimizer is not None:
+            registro.actualizar_memoria(clave)
+        yield json.dumps({"fin": True, "validadas": validadas, "total": len(frases), "mapping": mapping},
+                         ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+SIN_MODELO = "No se encontró ningún modelo."
+
+
+def _ejecutar_optimizacion(registro, proyecto: str, active_list: list, variables: dict,
+                           trabajo=None, perfil=None, artefactos=None, usar_cache=True) -> dict:
+    """
+    Activa las restricciones seleccionadas, optimiza y guarda la solución como
+    artefacto de la ejecución bajo el cerrojo del proyecto; el optimizador se
+    obtiene del registro ya con el cerrojo tomado. El Excel no se
+    genera aquí sino en la primera descarga. Si la misma combinación de specs,
+    restricciones activas y perfil ya se resolvió, se devuelve de solve_cache
+    sin llamar a Gurobi. Se usa tanto desde /api/optimize (síncrono) como
+    desde los trabajos en segundo plano.
+    """
+    with registro.bloqueado(proyecto) as optimizer:
+        if optimizer is None:
+            raise LookupError(SIN_MODELO)
+        if trabajo is not None:
+            # cancelar el trabajo interrumpe el solve en curso
+            trabajo.al_cancelar(lambda: optimizer.model.terminate())
+
+        # Desactivar todas las restricciones
+        for nl, info in optimizer.restricciones_validadas.items():
+            info["activa"] = False
+
+        # Activar solo las seleccionadas
+        for nl in active_list:
+            if nl in optimizer.restricciones_validadas:
+                optimizer.restricciones_validadas[nl]["activa"] = True
+
+        clave = optimizer.clave_resultado(perfil)
+        cacheado = solve_cache.get(clave) if usar_cache else None
+        if cacheado is not None and optimizer.restaurar_resultado(cacheado["solucion"]):
+            status = cacheado["status"]
+            objective = cacheado["objective"]
+            relaxed = cacheado["relaxed_constraints"]
+            optimizer.ultimo_perfil = cacheado["solver_profile"]
+            solution = optimizer.solucion_activa()
+            print(f"♻️  Resultado reutilizado de la caché (estado {status}, objetivo {objective})")
+        else:
+            cacheado = None
+            # Ejecutar la optimización
+            canal = trabajo.canal if trabajo is not None else None
+            optimization_info = optimizer.optimizar(canal, perfil) or {}
+            relaxed = optimization_info.get("relaxed_constraints", [])
+
+            # Construir la solución (también si se paró antes de probar optimalidad)
+            status = optimizer.model.status
+            objective = optimizer.model.ObjVal if optimizer.model.SolCount > 0 else None
+            parado = status in (gp.GRB.INTERRUPTED, gp.GRB.TIME_LIMIT, gp.GRB.SUBOPTIMAL)
+            if status == gp.GRB.OPTIMAL or (parado and optimizer.model.SolCount > 0):
+                solution = optimizer.solucion_activa()
+            else:
+                solution = "No se encontró una solución óptima."
+
+            # solo se guardan resultados definitivos, no los parados antes de tiempo
+            if status == gp.GRB.OPTIMAL and optimizer.solucion is not None:
+                solve_cache.set(clave, {
+                    "status": status,
+                    "objective": objective,
+                    "relaxed_constraints": relaxed,
+                    "solver_profile": optimizer.ultimo_perfil,
+                    "solucion": optimizer.resultado_para_cache(),
+                })
+
+        # Guardar la solución de esta ejecución (los ficheros se generan al descargar)
+        solve_id = None
+        if optimizer.solucion is not None and artefactos is not None:
+            solve_id = artefactos.guardar(proyecto, optimizer.indice, optimizer.solucion, variables)
+
+        return {
+            "solve_id": solve_id,
+            "solution": solution,
+            "status": status,
+            "objective": objective,
+            "relaxed_constraints": relaxed,
+            # perfil y parámetros exactos usados, para poder reproducir la ejecución
+            "solver_profile": optimizer.ultimo_perfil,
+            "cache_hit": cacheado is not None
+        }
+
+
 @routes.route('/api/optimize', methods=['POST'])
 def optimize():
     """Activa las restricciones seleccionadas y ejecuta la optimización."""
     # Verificar que el optimizador esté inicializado
-    if not hasattr(current_app, 'shift_store'):
-        return jsonify({"error": "No se encontró ningún modelo."}), 400
-    optimizer: ShiftOptimizer = current_app.shift_store
+    if _optimizador() is None:
+        return jsonify({"error": SIN_MODELO}), 400
 
     data = request.get_json() or {}
     active_list = data.get('active_constraints', [])
+    variables = session.get('variables', {})
+    perfil = data.get('profile')
+    try:
+        resolver_perfil(perfil)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Desactivar todas las restricciones
-    for nl, info in optimizer.restricciones_validadas.items():
-        info["activa"] = False
+    try:
+        return jsonify(_ejecutar_optimizacion(current_app.optimizers, _clave_optimizador(), active_list, variables,
+                                              perfil=perfil, artefactos=current_app.artefactos,
+                                              usar_cache=data.get('use_cache', True)))
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Activar solo las seleccionadas
-    for nl in active_list:
-        if nl in optimizer.restricciones_validadas:
-            optimizer.restricciones_validadas[nl]["activa"] = True
 
-    # Ejecutar la optimización
-    optimization_info = optimizer.optimizar() or {}
+# ─────────────────────────────────────────────────────────────────────────────
+# Trabajos de optimización en segundo plano
+# ─────────────────────────────────────────────────────────────────────────────
 
-    # Construir la solución
-    if optimizer.model.status == gp.GRB.OPTIMAL:
-        solution = {
-            str(key): var.X
-            for key, var in optimizer.decision_vars.items()
-            if var.X > 0.5
-        }
-    else:
-        solution = "No se encontró una solución óptima."
+@routes.route('/api/jobs/optimize', methods=['POST'])
+def submit_optimize_job():
+    """Encola la optimización y devuelve inmediatamente el id del trabajo."""
+    if _optimizador() is None:
+        return jsonify({"error": SIN_MODELO}), 400
 
-    # Exportar resultados a Excel
+    data = request.get_json() or {}
+    active_list = list(data.get('active_constraints', []))
+    # la sesión no está disponible dentro del hilo del trabajo
     variables = session.get('variables', {})
-    exportar_resultados(optimizer.model, optimizer.decision_vars, variables)
-
-    return jsonify({
-        "solution": solution,
-        "status": optimizer.model.status,
-        "relaxed_constraints": optimization_info.get("relaxed_constraints", [])
-    })
+    perfil = data.get('profile')
+    try:
+        resolver_perfil(perfil)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    registro, artefactos, proyecto = current_app.optimizers, current_app.artefactos, _clave_optimizador()
+    usar_cache = data.get('use_cache', True)
+    job_id = current_app.jobs.submit(
+        "optimize",
+        lambda trabajo: _ejecutar_optimizacion(registro, proyecto, active_list, variables, trabajo, perfil,
+                                               artefactos, usar_cache),
+        project_id=session.get('current_project_id')
+    )
+    return jsonify({"job_id": job_id}), 202
+
+
+@routes.route('/api/jobs/scenarios', methods=['POST'])
+def submit_scenarios_job():
+    """
+    Encola una comparación what-if: cada escenario es un subconjunto de
+    restricciones activas y/o overrides sobre las specs (p. ej. otros recursos).
+    El resultado del trabajo es la tabla comparativa (estado, objetivo, tiempo
+    y restricciones relajadas por escenario).
+    """
+    if _optimizador() is None:
+        return jsonify({"error": SIN_MODELO}), 400
 
+    data = request.get_json() or {}
+    escenarios = data.get('scenarios') or []
+    if not isinstance(escenarios, list) or not all(isinstance(e, dict) for e in escenarios):
+        return jsonify({"error": "'scenarios' debe ser una lista de objetos."}), 400
+    if not escenarios or len(escenarios) > config.SCENARIO_MAX:
+        return jsonify({"error": f"Se necesitan entre 1 y {config.SCENARIO_MAX} escenarios."}), 400
+    perfil = data.get('profile')
+    try:
+        for p in [perfil] + [e.get('profile') for e in escenarios]:
+            resolver_perfil(p)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # foto de specs y restricciones validadas: el proyecto puede seguir editándose
+    with _optimizador_bloqueado() as optimizer:
+        if optimizer is None:
+            return jsonify({"error": SIN_MODELO}), 400
+        specs = json.loads(json.dumps(optimizer.specs, default=str))
+        restricciones = {nl: info["code"] for nl, info in optimizer.restricciones_validadas.items()}
+
+    job_id = current_app.jobs.submit(
+        "scenarios",
+        lambda trabajo: {"scenarios": resolver_escenarios(specs, restricciones, escenarios, perfil, trabajo)},
+        project_id=session.get('current_project_id')
+    )
+    return jsonify({"job_id": job_id}), 202
+
+
+@routes.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    doc = current_app.jobs.status(job_id)
+    if not doc:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(doc)
+
+
+@routes.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    estado, resultado = current_app.jobs.result(job_id)
+    if estado is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if resultado is None:
+        return jsonify({"estado": estado, "error": "El trabajo aún no ha terminado."}), 409
+    return jsonify({"estado": estado, "result": resultado})
+
+
+@routes.route('/api/jobs/<job_id>/progress')
+def job_progress(job_id):
+    """Progreso del solve (incumbente, cota, gap, nodos, tiempo) como Server-Sent Events."""
+    canal = current_app.jobs.canal(job_id)
+    if canal is None:
+        doc = current_app.jobs.status(job_id)
+        if not doc:
+            return jsonify({"error": "Trabajo no encontrado"}), 404
+        fin = json.dumps({"fin": True, "estado": doc["estado"]})
+        return Response(f"data: {fin}\n\n", mimetype="text/event-stream")
+
+    def generar():
+        for evento in canal.escuchar():
+            if evento is None:
+                yield ": latido\n\n"
+            else:
+                yield f"data: {json.dumps(evento)}\n\n"
+
+    return Response(stream_with_context(generar()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@routes.route('/api/jobs/<job_id>/stop', methods=['POST'])
+def stop_job(job_id):
+    """
+    Parada anticipada conservando la mejor solución encontrada: inmediata o,
+    si se indica {"gap": 0.05}, en cuanto el gap baje de ese valor.
+    """
+    canal = current_app.jobs.canal(job_id)
+    if canal is None:
+        return jsonify(success=False, error="El trabajo no está en ejecución."), 409
+    gap = (request.get_json(silent=True) or {}).get("gap")
+    canal.detener(float(gap) if gap is not None else None)
+    return jsonify(success=True)
+
+
+@routes.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if not current_app.jobs.status(job_id):
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if not current_app.jobs.cancel(job_id):
+        return jsonify(success=False, error="El trabajo ya había terminado."), 409
+    return jsonify(success=True)
 
 
 @routes.route('/api/download_excel')
 def download_excel():
-    """Devuelve el archivo de resultados generado tras la optimización."""
-    excel_path = os.path.join(os.getcwd(), 'resultados_turnos.xlsx')
+    """
+    Devuelve los resultados de una ejecución (?solve_id=..., por defecto la
+    última del proyecto actual) en ?format=xlsx|csv|parquet. El fichero se
+    genera en la primera descarga y se reutiliza en las siguientes.
+    """
+    formato = request.args.get('format', 'xlsx')
+    if formato not in FORMATOS:
+        return jsonify({"error": f"Formato no soportado: {formato}"}), 400
+    proyecto = _clave_optimizador()
+    solve_id = request.args.get('solve_id') or current_app.artefactos.ultimo(proyecto)
+    if not solve_id:
+        return jsonify({"error": "Archivo no encontrado"}), 404
 
-    if os.path.exists(excel_path):
-        return send_file(excel_path, as_attachment=True)
-    else:
+    try:
+        # solo ejecuciones del proyecto de la sesión: las de otros dan 404
+        ruta = current_app.artefactos.archivo(proyecto, solve_id, formato)
+    except ImportError as e:
+        # parquet sin pyarrow instalado
+        return jsonify({"error": str(e)}), 501
+    if ruta is None:
         return jsonify({"error": "Archivo no encontrado"}), 404
+    return send_file(ruta, as_attachment=True, download_name=f"resultados_turnos_{solve_id[:8]}.{formato}")
+
+
+@routes.route('/api/solver_profiles')
+def solver_profiles():
+    """Perfiles de solver disponibles y el que se usa por defecto."""
+    return jsonify({"profiles": config.SOLVER_PROFILES, "default": config.DEFAULT_SOLVER_PROFILE})
+
+
+@routes.route('/api/cache_stats')
+def cache_stats():
+    """Contadores de aciertos/fallos de las cachés de traducciones y de resultados."""
+    return jsonify({"traducciones": translation_cache.stats(), "soluciones": solve_cache.stats()})
 
 
 @routes.route('/results')
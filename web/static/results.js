@@ -164,7 +164,8 @@ if (!raw) {
 
   // 8) Botón “Descargar Excel”
   document.getElementById('download-excel-btn').addEventListener('click', () => {
-    window.location.href = '/api/download_excel';
+    const qs = data.solve_id ? `?solve_id=${encodeURIComponent(data.solve_id)}` : '';
+    window.location.href = `/api/download_excel${qs}`;
   });
 }
 
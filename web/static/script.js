@@ -241,10 +241,19 @@ document.addEventListener("DOMContentLoaded", function () {
 
 
   // ——— API calls ———
-  async function listProjects() {
-    const res = await fetch("/api/projects");
-    const { projects } = await res.json();
-    return projects;
+  // Una página de resúmenes (id, nombre, fechas); las siguientes se piden con next_cursor
+  async function listProjects(cursor = null) {
+    const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const res = await fetch(`/api/projects${qs}`);
+    const page = await res.json();
+    return { projects: page.projects || [], nextCursor: page.next_cursor || null };
+  }
+
+  // ¿Existe ya un proyecto con ese nombre? (consulta filtrada, sin recorrer la lista)
+  async function projectNameExists(name) {
+    const res = await fetch(`/api/projects?name=${encodeURIComponent(name)}&limit=1`);
+    const page = await res.json();
+    return (page.projects || []).length > 0;
   }
 
   async function createProject(name) {
@@ -309,8 +318,32 @@ document.addEventListener("DOMContentLoaded", function () {
       detectedPanel.style.display = 'none';
     }
       projectList.innerHTML = "";
-      const projects = await listProjects();
-      projects.forEach(p => {
+      await loadMoreProjects(null);
+    }
+
+  // ——— Carga perezosa de la lista: una página cada vez, con "Cargar más" al final ———
+  async function loadMoreProjects(cursor) {
+    const prevMore = document.getElementById("load-more-projects");
+    if (prevMore) prevMore.remove();
+
+    const { projects, nextCursor } = await listProjects(cursor);
+    projects.forEach(appendProjectItem);
+
+    if (nextCursor) {
+      const more = document.createElement("li");
+      more.id = "load-more-projects";
+      more.classList.add("load-more");
+      more.textContent = "Cargar más…";
+      more.addEventListener("click", async () => {
+        more.textContent = "Cargando…";
+        await loadMoreProjects(nextCursor);
+      });
+      projectList.appendChild(more);
+    }
+  }
+
+  // ——— Añade un proyecto a la lista lateral ———
+  function appendProjectItem(p) {
         const li = document.createElement("li");
         li.textContent = p.name;
         li.dataset.id = p.id;
@@ -324,8 +357,8 @@ document.addEventListener("DOMContentLoaded", function () {
         duplicateBtn.addEventListener("click", async (e) => {
           e.stopPropagation(); // para no disparar el click de carga del proyecto
 
-          // 1) Cargar los datos completos del proyecto original
-          const orig = await loadProject(p.id);
+          // 1) Cargar los datos completos del proyecto original (sin abrirlo)
+          const orig = await (await fetch(`/api/projects/${p.id}/detail`)).json();
           if (orig.error) {
             return showToast("error", "No se pudo cargar el proyecto original.");
           }
@@ -333,9 +366,8 @@ document.addEventListener("DOMContentLoaded", function () {
           // 2) Generar un nombre nuevo con sufijo "1"
           let newName = `${orig.name}1`;
 
-          const allNames = (await listProjects()).map(x => x.name);
           let suffix = 1;
-          while (allNames.includes(newName)) {
+          while (await projectNameExists(newName)) {
             newName = `${orig.name} ${++suffix}`;
           }
 
@@ -469,8 +501,7 @@ document.addEventListener("DOMContentLoaded", function () {
         });
 
         projectList.appendChild(li);
-      });
-    }
+  }
 
   async function autoSaveProject() {
     if (!currentProjectId) return;
@@ -598,6 +629,53 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
 
+    // Muestra el progreso del solve (SSE) y permite pararlo con la mejor solución
+    function seguirProgreso(jobId) {
+      const progreso = document.getElementById("solve-progress");
+      const parar = document.getElementById("stop-solve");
+      const fuente = new EventSource(`/api/jobs/${jobId}/progress`);
+      if (parar) {
+        parar.style.display = "inline-block";
+        parar.onclick = () => fetch(`/api/jobs/${jobId}/stop`, { method: "POST" });
+      }
+      fuente.onmessage = (e) => {
+        const ev = JSON.parse(e.data);
+        if (ev.fin) {
+          fuente.close();
+          if (progreso) progreso.textContent = "";
+          if (parar) parar.style.display = "none";
+          return;
+        }
+        if (progreso) {
+          const gap = ev.gap === null ? "—" : `${(ev.gap * 100).toFixed(2)}%`;
+          const inc = ev.incumbente === null ? "—" : ev.incumbente;
+          progreso.textContent = `Incumbente: ${inc} · Gap: ${gap} · Nodos: ${ev.nodos} · ${ev.tiempo}s`;
+        }
+      };
+      fuente.onerror = () => fuente.close();
+    }
+
+    // Consulta el estado de un trabajo hasta que termina y devuelve su resultado.
+    // Si se ha cancelado lanza un error con `cancelado` para avisar al usuario.
+    async function esperarTrabajo(jobId, intervaloMs = 1000) {
+      seguirProgreso(jobId);
+      while (true) {
+        const res = await fetch(`/api/jobs/${jobId}/result`);
+        if (res.status !== 409) {
+          const { estado, result, error } = await res.json();
+          if (!res.ok) throw new Error(error);
+          if (estado === "error") throw new Error(result.error);
+          if (estado === "cancelled") {
+            const cancelado = new Error("La optimización se ha cancelado.");
+            cancelado.cancelado = true;
+            throw cancelado;
+          }
+          return result;
+        }
+        await new Promise(r => setTimeout(r, intervaloMs));
+      }
+    }
+
     function mostrarPantallaCarga() {
         if (loadingOverlay) loadingOverlay.style.display = "flex";
     }
@@ -682,6 +760,17 @@ document.addEventListener("DOMContentLoaded", function () {
             // 4) Ocultamos el panel de lista porque ya no lo usamos
             detectedPanel.style.display = 'none';
 
+            // 4b) Botón para agregarlas todas a la vez (se traducen en paralelo)
+            let btnTodas = document.getElementById('add-all-detected');
+            if (!btnTodas) {
+              btnTodas = document.createElement('button');
+              btnTodas.type = 'button';
+              btnTodas.id = 'add-all-detected';
+              btnTodas.textContent = 'Agregar todas';
+              contextWarning.appendChild(btnTodas);
+            }
+            btnTodas.onclick = () => agregarDetectadas(btnTodas);
+
             // 5) Hacer cada <mark.clickable> “respondedor” a clicks
             contextInput.querySelectorAll('mark.highlight.clickable').forEach(mark => {
               // 1) Estilos “clicable”
@@ -1061,38 +1150,7 @@ document.addEventListener("DOMContentLoaded", function () {
         }
 
         // 4) ¡La restricción es válida! → añadimos a la lista
-        const lista = document.querySelector(".restricciones-list");
-        if (!lista) return;
-
-        // Evitar duplicados
-        if (
-          Array.from(lista.children).some(
-            li => li.querySelector("label")?.innerText === constraint
-          )
-        ) {
-          return;
-        }
-
-        const li = document.createElement("li");
-        li.classList.add("restriccion-item");
-
-        const checkbox = document.createElement("input");
-        checkbox.type = "checkbox";
-        checkbox.checked = true;
-        checkbox.classList.add("chk-rest");
-        checkbox.addEventListener("change", guardarRestricciones);
-
-        const label = document.createElement("label");
-        label.textContent = constraint;
-        label.style.marginLeft = "8px";
-
-        li.append(checkbox, label);
-        attachInlineEditor(li, label, guardarRestricciones, showToast);
-        lista.appendChild(li);
-
-        guardarRestricciones();
-        updateManualConstraintsInfo()
-        markDirty();
+        if (!anadirRestriccion(constraint)) return;
         showToast("success", "Restricción añadida correctamente.");
 
       } catch (err) {
@@ -1113,6 +1171,139 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
 
+    // Añade a la lista una restricción ya validada; false si no hay lista o ya estaba
+    function anadirRestriccion(constraint) {
+      const lista = document.querySelector(".restricciones-list");
+      if (!lista) return false;
+
+      // Evitar duplicados
+      if (
+        Array.from(lista.children).some(
+          li => li.querySelector("label")?.innerText === constraint
+        )
+      ) {
+        return false;
+      }
+
+      const li = document.createElement("li");
+      li.classList.add("restriccion-item");
+
+      const checkbox = document.createElement("input");
+      checkbox.type = "checkbox";
+      checkbox.checked = true;
+      checkbox.classList.add("chk-rest");
+      checkbox.addEventListener("change", guardarRestricciones);
+
+      const label = document.createElement("label");
+      label.textContent = constraint;
+      label.style.marginLeft = "8px";
+
+      li.append(checkbox, label);
+      attachInlineEditor(li, label, guardarRestricciones, showToast);
+      lista.appendChild(li);
+
+      guardarRestricciones();
+      updateManualConstraintsInfo()
+      markDirty();
+      return true;
+    }
+
+    // Traduce y valida varias restricciones a la vez con /api/convert_batch.
+    // La respuesta es NDJSON: alResultado recibe cada línea según llega (en
+    // orden de llegada) y se devuelve la línea final {fin, validadas, total}.
+    async function convertirLote(constraints, alResultado) {
+      const res = await fetch("/api/convert_batch", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ constraints }),
+      });
+      if (!res.ok) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(data.message ?? `Error HTTP ${res.status}`);
+      }
+
+      const lector = res.body.getReader();
+      const decoder = new TextDecoder();
+      let pendiente = "";
+      let fin = null;
+      while (true) {
+        const { value, done } = await lector.read();
+        pendiente += decoder.decode(value ?? new Uint8Array(), { stream: !done });
+        // la última línea puede llegar a medias: se guarda para la siguiente lectura
+        const lineas = pendiente.split("\n");
+        pendiente = lineas.pop();
+        for (const linea of lineas) {
+          if (!linea.trim()) continue;
+          const dato = JSON.parse(linea);
+          if (dato.fin) fin = dato;
+          else alResultado(dato);
+        }
+        if (done) break;
+      }
+      if (!fin) throw new Error("La conversión se interrumpió antes de terminar.");
+      return fin;
+    }
+
+    // Prepara la barra de progreso para `total` restricciones y devuelve cómo avanzarla
+    function iniciarProgreso(total) {
+      const progressContainer = document.getElementById("progress-container");
+      const progressBar       = document.getElementById("progress-bar");
+      const progressLabel     = document.getElementById("progress-label");
+      progressBar.max   = total;
+      progressBar.value = 0;
+      progressLabel.textContent = `Procesando 0 de ${total}…`;
+      progressContainer.style.display = "block";
+      return {
+        avanzar(n) {
+          progressBar.value = n;
+          progressLabel.textContent = `Procesando ${n} de ${total}…`;
+        },
+        ocultar() { progressContainer.style.display = "none"; },
+      };
+    }
+
+    // Agrega de una vez las restricciones detectadas que siguen marcadas en el contexto
+    async function agregarDetectadas(boton) {
+      const marks = Array.from(contextInput.querySelectorAll("mark.highlight.clickable"));
+      const frases = [...new Set(marks.map(m => m.dataset.nl))];
+      if (!frases.length) {
+        boton.remove();
+        return;
+      }
+      if (!confirm(`¿Agregar las ${frases.length} restricciones detectadas?`)) return;
+
+      const progreso = iniciarProgreso(frases.length);
+      boton.disabled = true;
+      marks.forEach(m => m.classList.add("adding"));
+      let procesadas = 0;
+      try {
+        const fin = await convertirLote(frases, linea => {
+          progreso.avanzar(++procesadas);
+          const suyas = marks.filter(m => m.dataset.nl === linea.constraint);
+          if (linea.valid) {
+            anadirRestriccion(linea.constraint);
+            // el texto queda en el contexto, sin resaltar
+            suyas.forEach(m => m.replaceWith(document.createTextNode(linea.constraint)));
+          } else {
+            suyas.forEach(m => m.classList.remove("adding"));
+            showToast("error", `“${linea.constraint}”: ${linea.message ?? "no se pudo validar."}`);
+          }
+        });
+        sessionStorage.setItem("savedContext", contextInput.innerText);
+        if (fin.validadas) await autoSaveProject();
+        showToast(fin.validadas ? "success" : "warning",
+                  `${fin.validadas} de ${fin.total} restricciones agregadas.`);
+        if (!contextInput.querySelector("mark.highlight.clickable")) boton.remove();
+      } catch (err) {
+        console.error(err);
+        marks.forEach(m => m.classList.remove("adding"));
+        showToast("error", err.message ?? String(err));
+      } finally {
+        boton.disabled = false;
+        progreso.ocultar();
+      }
+    }
+
     if (convertButton) {
       convertButton.addEventListener("click", async () => {
         const inp = document.getElementById("constraint");
@@ -1124,42 +1315,48 @@ document.addEventListener("DOMContentLoaded", function () {
           return;
         }
 
-        // Preparo lista de restricciones
-        const constraints = raw
+        // Preparo lista de restricciones (sin repetidas, como las trata el backend)
+        const constraints = [...new Set(raw
           .split("\n")
           .map((x) => x.trim())
-          .filter(Boolean);
+          .filter(Boolean))];
 
         // Limpio textarea y pongo foco
         inp.value = "";
         inp.focus();
 
         // Mostrar y configurar barra de progreso
-        const progressContainer = document.getElementById("progress-container");
-        const progressBar       = document.getElementById("progress-bar");
-        const progressLabel     = document.getElementById("progress-label");
-        progressBar.max   = constraints.length;
-        progressBar.value = 0;
-        progressLabel.textContent = `Procesando 0 de ${constraints.length}…`;
-        progressContainer.style.display = "block";
+        const progreso = iniciarProgreso(constraints.length);
 
         // Deshabilito botón y marco estado
         procesandoRestricciones = true;
         convertButton.disabled  = true;
 
-        // Itero y actualizo progreso
-        for (let i = 0; i < constraints.length; i++) {
-          const c = constraints[i];
-          await intentarConvertir(c);
-          progressBar.value = i + 1;
-          progressLabel.textContent = `Procesando ${i + 1} de ${constraints.length}…`;
+        try {
+          if (constraints.length === 1) {
+            await intentarConvertir(constraints[0]);
+            progreso.avanzar(1);
+          } else {
+            // varias a la vez: se traducen en paralelo y cada una se añade según llega
+            let procesadas = 0;
+            const fin = await convertirLote(constraints, linea => {
+              progreso.avanzar(++procesadas);
+              if (linea.valid) anadirRestriccion(linea.constraint);
+              else showToast("error", `“${linea.constraint}”: ${linea.message ?? "no se pudo validar."}`);
+            });
+            showToast(fin.validadas ? "success" : "warning",
+                      `${fin.validadas} de ${fin.total} restricciones añadidas.`);
+          }
+        } catch (err) {
+          console.error(err);
+          showToast("error", err.message ?? String(err));
+        } finally {
+          // Restauro estado inicial
+          procesandoRestricciones = false;
+          convertButton.disabled   = false;
+          progreso.ocultar();
         }
 
-        // Restauro estado inicial
-        procesandoRestricciones = false;
-        convertButton.disabled   = false;
-        progressContainer.style.display = "none";
-
       });
     }
 
@@ -1393,12 +1590,14 @@ document.addEventListener("DOMContentLoaded", function () {
           .map(li => li.querySelector('label').innerText);
 
         try {
-          const res = await fetch('/api/optimize', {
+          // Encolamos la optimización y esperamos a que el trabajo termine
+          const res = await fetch('/api/jobs/optimize', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ active_constraints: activeConstraints })
           });
-          const data = await res.json();
+          const { job_id } = await res.json();
+          const data = await esperarTrabajo(job_id);
 
           // 1) Ocultamos overlay
           loadingOverlay.style.display = "none";
@@ -1413,6 +1612,10 @@ document.addEventListener("DOMContentLoaded", function () {
           window.location.href = '/results';
         } catch (error) {
           loadingOverlay.style.display = "none";
+          if (error.cancelado) {
+            showToast("warning", error.message);
+            return;
+          }
           console.error(error);
           showToast("error", "Error al contactar con la API.");
         }